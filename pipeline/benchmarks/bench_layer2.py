@@ -0,0 +1,86 @@
+"""Layer 2 connect-scan throughput against local listener sockets.
+
+Opens ``--listeners`` listening sockets on 127.0.0.1 and scans them together with
+``--closed`` closed ports and ``--filtered`` ports that drop SYNs, once with the old
+sequential ``create_connection`` loop and then with the asyncio engine at each
+``--concurrency`` level. A "filtered" port is a listener whose accept queue is already full,
+so the kernel silently drops new SYNs, like a firewall would. Loopback RTT is near zero, so
+closed/open ports alone mostly measure per-connect overhead; filtered ports are where the
+sequential scan spends its time.
+
+    python benchmarks/bench_layer2.py --listeners 200 --closed 2000 --filtered 20
+"""
+
+import argparse
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from layer2 import scan_ports  # noqa: E402
+
+
+def legacy_scan(host: str, ports: List[int]) -> int:
+    """The pre-asyncio loop: one blocking connect per port, in sequence."""
+    open_ports = 0
+    for port in ports:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                open_ports += 1
+                socket.getservbyport(port, "tcp")
+        except OSError:
+            pass
+    return open_ports
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--listeners", type=int, default=200)
+    ap.add_argument("--closed", type=int, default=2000)
+    ap.add_argument("--filtered", type=int, default=20, help="each costs the sequential scan 1s")
+    ap.add_argument("--concurrency", default="1,10,100,500")
+    ap.add_argument("--per-host", type=int, default=500)
+    args = ap.parse_args()
+
+    listeners = []
+    for _ in range(args.listeners):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        s.listen(128)
+        listeners.append(s)
+    open_ports = [s.getsockname()[1] for s in listeners]
+    filtered, fillers = [], []
+    for _ in range(args.filtered):
+        s = socket.socket()
+        s.bind(("127.0.0.1", 0))
+        s.listen(0)
+        c = socket.create_connection(s.getsockname())  # fills the backlog; later SYNs drop
+        listeners.append(s)
+        fillers.append(c)
+        filtered.append(s.getsockname()[1])
+    taken = set(open_ports) | set(filtered)
+    closed = [p for p in range(20000, 30000) if p not in taken][: args.closed]
+    ports = open_ports + filtered + closed
+    hosts = [{"host": "127.0.0.1", "status": "up"}]
+
+    t0 = time.perf_counter()
+    found = legacy_scan("127.0.0.1", ports)
+    base = len(ports) / (time.perf_counter() - t0)
+    print(f"sequential            {len(ports):>6} ports  {base:>9.0f} ports/s  open={found}")
+
+    for level in [int(x) for x in args.concurrency.split(",") if x]:
+        t0 = time.perf_counter()
+        res = scan_ports(hosts, ports, concurrency=level, per_host=min(level, args.per_host))
+        rate = len(ports) / (time.perf_counter() - t0)
+        found = sum(1 for r in res if r["state"] == "open")
+        print(
+            f"asyncio concurrency={level:<4} {len(ports):>6} ports  {rate:>9.0f} ports/s"
+            f"  open={found}  ({rate / base:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,242 @@
 import argparse
-import json
+import ipaddress
 import logging
+import socket
 import subprocess
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import List, Dict
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Sequence
 
+from records import RecordWriter, add_io_arguments
 
-def discover_hosts(hosts: List[str]) -> List[Dict[str, str]]:
-    """Ping each host and return discovery results.
+DEFAULT_TCP_PORTS = (80, 443, 22)
+
+
+def expand_targets(targets: Iterable[str]) -> Iterator[str]:
+    """Expand hosts and CIDR ranges into individual hosts, lazily.
+
+    Repeated entries (the same host, or the same network however it is written) are dropped.
+    Hosts are not deduplicated across different or overlapping ranges, so memory is bounded by
+    the number of entries rather than the size of the ranges.
+
+    Args:
+        targets: Hostnames, IP addresses or CIDR ranges such as ``10.0.0.0/22``.
+
+    Yields:
+        Hosts in input order.
+    """
+    seen = set()
+    for target in targets:
+        target = target.strip()
+        if not target:
+            continue
+        if "/" in target:
+            try:
+                net = ipaddress.ip_network(target, strict=False)
+            except ValueError:
+                logging.error("Invalid CIDR range %s", target)
+                continue
+            if net in seen:
+                continue
+            seen.add(net)
+            # hosts() skips network/broadcast addresses but is empty for /32 and /128.
+            yield from (str(ip) for ip in (net.hosts() if net.num_addresses > 2 else net))
+        elif target not in seen:
+            seen.add(target)
+            yield target
+
+
+def read_host_file(path: str) -> Iterator[str]:
+    """Yield hosts or CIDR ranges from a file (``"-"`` for stdin), one per line; ``#`` starts
+    a comment."""
+    if path == "-":
+        yield from _host_lines(sys.stdin)
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            yield from _host_lines(f)
+    except OSError as exc:
+        logging.error("Cannot read host file %s: %s", path, exc)
+
+
+def _host_lines(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if line:
+            yield line
+
+
+def ping_alive(host: str, timeout: float = 1.0) -> bool:
+    """Return True if a single ICMP echo to ``host`` is answered."""
+    try:
+        proc = subprocess.run(
+            ["ping", "-c", "1", "-W", str(max(1, round(timeout))), host],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+    except Exception as exc:  # pragma: no cover - network errors not deterministic
+        logging.error("Ping failed for %s: %s", host, exc)
+        return False
+    return proc.returncode == 0
+
+
+def tcp_alive(host: str, ports: Sequence[int] = DEFAULT_TCP_PORTS, timeout: float = 1.0) -> bool:
+    """Return True if any of ``ports`` accepts or actively refuses a TCP connection.
+
+    A refusal (RST) proves the host is up just as well as an accepted connection; only
+    timeouts and unreachable errors count as down. Needs no raw sockets or privileges.
+    """
+    for port in ports:
+        try:
+            with socket.create_connection((host, port), timeout=timeout):
+                return True
+        except ConnectionRefusedError:
+            return True
+        except OSError:
+            continue
+    return False
+
+
+def _record(host: str, up: bool) -> Dict[str, str]:
+    return {
+        "host": host,
+        "status": "up" if up else "down",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+def iter_discovery(
+    hosts: Iterable[str],
+    concurrency: int = 64,
+    method: str = "ping",
+    ports: Sequence[int] = DEFAULT_TCP_PORTS,
+    timeout: float = 1.0,
+) -> Iterator[Dict[str, str]]:
+    """Probe hosts on a bounded worker pool and yield results as they complete.
+
+    Args:
+        hosts: Hosts to probe; consumed lazily, so large ranges are never materialized.
+        concurrency: Number of probes in flight at once.
+        method: ``"ping"`` (ICMP echo via the system ping) or ``"tcp"`` (connect liveness).
+        ports: Ports tried in ``tcp`` mode.
+        timeout: Per-probe timeout in seconds.
+
+    Yields:
+        ``{"host", "status", "timestamp"}`` dictionaries in completion order.
+    """
+    if method == "tcp":
+        probe = partial(tcp_alive, ports=ports, timeout=timeout)
+    elif method == "ping":
+        probe = partial(ping_alive, timeout=timeout)
+    else:
+        raise ValueError(f"Unknown discovery method: {method}")
+    concurrency = max(1, concurrency)
+    it = iter(hosts)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        inflight = {}
+        while True:
+            for host in it:
+                inflight[pool.submit(probe, host)] = host
+                if len(inflight) >= concurrency:
+                    break
+            if not inflight:
+                return
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                host = inflight.pop(fut)
+                try:
+                    up = fut.result()
+                except Exception as exc:  # pragma: no cover - probe helpers catch their own errors
+                    logging.error("Probe failed for %s: %s", host, exc)
+                    up = False
+                yield _record(host, up)
+
+
+def discover_hosts(hosts: List[str], **kwargs) -> List[Dict[str, str]]:
+    """Probe each host and return discovery results.
 
     Args:
         hosts: Iterable of hostnames or IP addresses.
+        **kwargs: Passed to :func:`iter_discovery` (``concurrency``, ``method``, ...).
 
     Returns:
-        List of dictionaries containing host discovery data.
+        List of dictionaries containing host discovery data, in completion order.
     """
-    results: List[Dict[str, str]] = []
-    for host in hosts:
-        try:
-            proc = subprocess.run(
-                ["ping", "-c", "1", "-W", "1", host],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                check=False,
-            )
-            status = "up" if proc.returncode == 0 else "down"
-        except Exception as exc:  # pragma: no cover - network errors not deterministic
-            logging.error("Ping failed for %s: %s", host, exc)
-            status = "down"
-        results.append(
-            {
-                "host": host,
-                "status": status,
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-            }
-        )
-    return results
+    return list(iter_discovery(hosts, **kwargs))
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Layer 1 - Host Discovery")
     parser.add_argument(
         "targets",
-        nargs="+",
-        help="Hosts to probe",
+        nargs="*",
+        help="Hosts or CIDR ranges to probe",
     )
     parser.add_argument(
-        "--output",
-        default="layer1_output.json",
-        help="Output JSON file",
+        "--hosts-file",
+        action="append",
+        default=[],
+        help="File with one host or CIDR range per line, '-' for stdin (repeatable)",
     )
+    parser.add_argument(
+        "--method",
+        choices=["ping", "tcp"],
+        default="ping",
+        help="Liveness check: ICMP ping or TCP connect",
+    )
+    parser.add_argument(
+        "--tcp-ports",
+        default=",".join(str(p) for p in DEFAULT_TCP_PORTS),
+        help="Comma separated ports tried by --method tcp",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=64,
+        help="Number of probes in flight at once",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=1.0,
+        help="Per-probe timeout in seconds",
+    )
+    add_io_arguments(parser, None, "layer1_output.json")
     args = parser.parse_args()
+    if not args.targets and not args.hosts_file:
+        parser.error("give targets and/or --hosts-file")
 
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s - %(levelname)s - %(message)s",
     )
 
-    data = discover_hosts(args.targets)
+    def sources() -> Iterator[str]:
+        yield from args.targets
+        for path in args.hosts_file:
+            yield from read_host_file(path)
+
+    ports = [int(p) for p in args.tcp_ports.split(",") if p]
+    results = iter_discovery(
+        expand_targets(sources()),
+        concurrency=args.concurrency,
+        method=args.method,
+        ports=ports,
+        timeout=args.timeout,
+    )
     try:
-        with open(args.output, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-        logging.info("Layer 1 output written to %s", args.output)
+        # Written as results arrive so memory stays flat on large ranges.
+        up = 0
+        with RecordWriter(args.output, args.format, pretty=False) as out:
+            for rec in results:
+                out.write(rec)
+                if rec["status"] == "up":
+                    up += 1
+                    logging.info("%s is up", rec["host"])
+        logging.info("Layer 1 output written to %s (%d/%d hosts up)", args.output, up, out.count)
     except OSError as exc:  # pragma: no cover - filesystem errors are rare
         logging.error("Failed to write output: %s", exc)
 
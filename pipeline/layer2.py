@@ -1,72 +1,449 @@
 import argparse
-import json
+import asyncio
 import logging
 import socket
+import time
+from collections import deque
 from datetime import datetime
-from typing import List, Dict
+from functools import lru_cache
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from net import grab_banner
+from records import (
+    RecordWriter,
+    add_io_arguments,
+    aiter_blocking,
+    compact_host,
+    iter_records,
+    load_json,
+)
+
+
+# Most commonly open TCP ports, most frequent first (after nmap-services frequencies).
+# fmt: off
+TOP_PORTS = (
+    80, 23, 443, 21, 22, 25, 3389, 110, 445, 139, 143, 53, 135, 3306, 8080, 1723, 111, 995,
+    993, 5900, 1025, 587, 8888, 199, 1720, 465, 548, 113, 81, 6001, 10000, 514, 5060, 179,
+    1026, 2000, 8443, 8000, 32768, 554, 26, 1433, 49152, 2001, 515, 8008, 49154, 1027, 5666,
+    646, 5000, 5631, 631, 49153, 8081, 2049, 88, 79, 5800, 106, 2121, 1110, 49155, 6000, 513,
+    990, 5357, 427, 49156, 543, 544, 5101, 144, 7, 389, 8009, 3128, 444, 9999, 5009, 7070,
+    5190, 3000, 5432, 1900, 3986, 13, 1029, 9, 5051, 6646, 49157, 1028, 873, 1755, 2717,
+    4899, 9100, 119, 37,
+)
+# fmt: on
 
 
 def load_hosts(path: str) -> List[Dict[str, str]]:
     """Load layer1 output."""
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logging.error("Input file %s not found", path)
-    except json.JSONDecodeError as exc:
-        logging.error("Invalid JSON in %s: %s", path, exc)
-    return []
-
-
-def scan_ports(hosts: List[Dict[str, str]], ports: List[int]) -> List[Dict[str, object]]:
-    """Scan ports on hosts that are up."""
-    results: List[Dict[str, object]] = []
-    for entry in hosts:
-        if entry.get("status") != "up":
+    return load_json(path)
+
+
+def parse_ports(spec: str) -> List[int]:
+    """Parse ``"22,80,8000-8100"`` into ports, keeping first-seen order.
+
+    Raises:
+        ValueError: On a malformed item or a port outside 1-65535.
+    """
+    ports: Dict[int, None] = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
             continue
-        host = entry.get("host")
-        for port in ports:
-            state = "closed"
-            service = "unknown"
-            try:
-                with socket.create_connection((host, port), timeout=1) as sock:
-                    state = "open"
-                    try:
-                        service = socket.getservbyport(port, "tcp")
-                    except Exception:
-                        service = "unknown"
-            except Exception:  # pragma: no cover - network conditions vary
-                pass
-            results.append(
-                {
-                    "host": host,
-                    "port": port,
-                    "protocol": "tcp",
-                    "state": state,
-                    "service": service,
-                    "timestamp": datetime.utcnow().isoformat() + "Z",
-                }
+        lo, sep, hi = item.partition("-")
+        start = int(lo)
+        end = int(hi) if sep else start
+        if not 1 <= start <= end <= 65535:
+            raise ValueError(f"Invalid port range: {item}")
+        ports.update(dict.fromkeys(range(start, end + 1)))
+    return list(ports)
+
+
+def top_ports(n: int) -> List[int]:
+    """The ``n`` most commonly open TCP ports (at most ``len(TOP_PORTS)``)."""
+    if n > len(TOP_PORTS):
+        logging.warning("Only %d top ports are known; using all of them", len(TOP_PORTS))
+    return list(TOP_PORTS[: max(0, n)])
+
+
+class RttEstimator:
+    """Smoothed connect RTT for one host (RFC 6298 style) used to size connect timeouts.
+
+    Until the first sample arrives the timeout is ``max_timeout``; after that it is
+    ``srtt + 4 * rttvar`` clamped to ``[min_timeout, max_timeout]``, so filtered ports on a
+    responsive host stop costing the full timeout.
+    """
+
+    __slots__ = ("srtt", "rttvar")
+
+    def __init__(self) -> None:
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+
+    def sample(self, rtt: float) -> None:
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def timeout(self, min_timeout: float, max_timeout: float) -> float:
+        if self.srtt is None:
+            return max_timeout
+        return min(max_timeout, max(min_timeout, self.srtt + 4 * self.rttvar))
+
+
+@lru_cache(maxsize=None)
+def service_name(port: int, proto: str = "tcp") -> str:
+    """Memoized ``getservbyport``; ``"unknown"`` when the services database has no entry."""
+    try:
+        return socket.getservbyport(port, proto)
+    except (OSError, OverflowError):
+        return "unknown"
+
+
+_END = object()
+
+
+def _fd_budget(requested: int) -> int:
+    # Every in-flight connect holds a descriptor; stay under the soft RLIMIT_NOFILE.
+    try:
+        import resource
+
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    except (ImportError, ValueError, OSError):  # pragma: no cover - non-POSIX
+        return requested
+    if soft == resource.RLIM_INFINITY:
+        return requested
+    return max(1, min(requested, soft - 64))
+
+
+async def _connect(
+    addr: Tuple, family: int, timeout: float, banner_timeout: Optional[float] = None
+) -> Tuple[str, Optional[float], Dict[str, object]]:
+    """Return ``(state, rtt, extra)``; ``rtt`` is None when nothing came back.
+
+    With ``banner_timeout``, an open port's banner is read on the same socket and ``extra``
+    holds ``banner`` and ``elapsed_ms`` (connect start to banner read), as layer 3 reports.
+    """
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    start = time.perf_counter()
+    try:
+        async with asyncio.timeout(timeout):
+            await loop.sock_connect(sock, addr)
+        rtt = time.perf_counter() - start
+        if banner_timeout is None:
+            return "open", rtt, {}
+        banner = await grab_banner(sock, banner_timeout)
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        return "open", rtt, {"banner": banner, "elapsed_ms": elapsed_ms}
+    except ConnectionRefusedError:
+        return "closed", time.perf_counter() - start, {}
+    except (OSError, asyncio.TimeoutError):
+        return "filtered", None, {}
+    finally:
+        sock.close()
+
+
+def _record(host: str, port: int, state: str, extra: Dict[str, object]) -> Dict[str, object]:
+    # The per-port schema only distinguishes open from closed.
+    return {
+        "host": host,
+        "port": port,
+        "protocol": "tcp",
+        "state": "open" if state == "open" else "closed",
+        "service": service_name(port) if state == "open" else "unknown",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        **extra,
+    }
+
+
+async def _aiter(items: Iterable) -> AsyncIterator:
+    for item in items:
+        yield item
+
+
+async def iter_probe(
+    hosts: Union[Iterable[str], AsyncIterable[str]],
+    ports: Sequence[int],
+    concurrency: int = 500,
+    per_host: int = 100,
+    min_timeout: float = 0.1,
+    max_timeout: float = 1.0,
+    banner_timeout: Optional[float] = None,
+) -> AsyncIterator[Tuple[str, int, str, Dict[str, object]]]:
+    """Connect-scan every (host, port) pair and yield results as they complete.
+
+    Args:
+        hosts: Hostnames or IP addresses, each resolved once. A sequence is scanned
+            port-major across all hosts; any other (async) iterable is consumed as it
+            yields, keeping enough hosts active to fill ``concurrency``.
+        ports: TCP ports to try on every host.
+        concurrency: Global cap on connects in flight.
+        per_host: Cap on connects in flight against any one host.
+        min_timeout: Lower bound for the RTT-derived connect timeout.
+        max_timeout: Connect timeout before a host has answered anything.
+        banner_timeout: If set, read a banner from each open port on the connection that
+            found it open (layer 3's probe), waiting at most this long.
+
+    Yields:
+        ``(host, port, state, extra)`` in completion order; ``state`` is ``"open"``,
+        ``"closed"`` (refused, or the host did not resolve) or ``"filtered"`` (no answer in
+        time). ``extra`` holds ``banner``/``elapsed_ms`` for open ports when grabbing banners.
+    """
+    loop = asyncio.get_running_loop()
+    concurrency = _fd_budget(max(1, concurrency))
+    if isinstance(hosts, Sequence):
+        window = max(1, len(hosts))
+    else:
+        window = 2 * -(-concurrency // max(1, per_host))
+    source = hosts if hasattr(hosts, "__aiter__") else _aiter(hosts)
+    arrivals: asyncio.Queue = asyncio.Queue(maxsize=window)
+    jobs: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    limits: Dict[str, asyncio.Semaphore] = {}
+    rtts: Dict[str, RttEstimator] = {}
+    addrs: Dict[str, asyncio.Future] = {}
+    unresolved: set = set()
+    results: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+
+    async def resolve(host: str):
+        fut = addrs.get(host)
+        if fut is None:
+            fut = addrs[host] = asyncio.ensure_future(
+                loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
             )
-    return results
+        try:
+            family, _, _, _, sockaddr = (await asyncio.shield(fut))[0]
+        except (OSError, IndexError) as exc:
+            if host not in unresolved:
+                unresolved.add(host)
+                logging.error("Cannot resolve %s: %s", host, exc)
+            return None
+        return family, sockaddr
+
+    async def feed() -> None:
+        try:
+            async for host in source:
+                await arrivals.put(host)
+        finally:
+            await arrivals.put(_END)
+
+    async def schedule() -> None:
+        # Round-robin over a window of active hosts so per-host caps rarely stall workers; with
+        # every host in the window this is port-major order. New hosts join as they arrive.
+        active: Deque[Tuple[str, Iterator[int]]] = deque()
+        exhausted = False
+        while True:
+            while not exhausted and len(active) < window and not (active and arrivals.empty()):
+                host = await arrivals.get()
+                if host is _END:
+                    exhausted = True
+                else:
+                    active.append((host, iter(ports)))
+            if not active:
+                break
+            host, pending = active.popleft()
+            port = next(pending, None)
+            if port is not None:
+                active.append((host, pending))
+                await jobs.put((host, port))
+        for _ in range(concurrency):
+            await jobs.put(None)
+
+    async def worker() -> None:
+        while True:
+            job = await jobs.get()
+            if job is None:
+                return
+            host, port = job
+            resolved = await resolve(host)
+            sem = limits.setdefault(host, asyncio.Semaphore(max(1, per_host)))
+            state, extra = "closed", {}
+            if resolved is not None:
+                family, sockaddr = resolved
+                rtt_est = rtts.setdefault(host, RttEstimator())
+                async with sem:
+                    state, rtt, extra = await _connect(
+                        (sockaddr[0], port, *sockaddr[2:]),
+                        family,
+                        rtt_est.timeout(min_timeout, max_timeout),
+                        banner_timeout,
+                    )
+                if rtt is not None:
+                    rtt_est.sample(rtt)
+            await results.put((host, port, state, extra))
+
+    async def run() -> None:
+        try:
+            await asyncio.gather(feed(), schedule(), *(worker() for _ in range(concurrency)))
+        finally:
+            await results.put(None)
+
+    runner = asyncio.ensure_future(run())
+    try:
+        while True:
+            res = await results.get()
+            if res is None:
+                break
+            yield res
+        await runner
+    finally:
+        runner.cancel()
+
+
+async def iter_scan(
+    hosts: Union[Iterable[str], AsyncIterable[str]], ports: Sequence[int], **kwargs
+) -> AsyncIterator[Dict[str, object]]:
+    """Per-port layer 2 records (``host``, ``port``, ``protocol``, ``state``, ``service``,
+    ``timestamp``) in completion order; ``kwargs`` as for :func:`iter_probe`."""
+    async for host, port, state, extra in iter_probe(hosts, ports, **kwargs):
+        yield _record(host, port, state, extra)
+
+
+async def iter_scan_compact(
+    hosts: Union[Iterable[str], AsyncIterable[str]], ports: Sequence[int], **kwargs
+) -> AsyncIterator[Dict[str, object]]:
+    """One compact record per host (see ``records``), yielded once all its ports are done.
+
+    Only open and filtered ports are kept; closed ports are counted.
+    """
+    remaining: Dict[str, int] = {}
+    found: Dict[str, Tuple[list, list, list]] = {}
+    async for host, port, state, extra in iter_probe(hosts, ports, **kwargs):
+        if host not in found:
+            found[host], remaining[host] = ([], [], [0]), len(ports)
+        open_ports, filtered, closed = found[host]
+        if state == "open":
+            open_ports.append({"port": port, "service": service_name(port), **extra})
+        elif state == "filtered":
+            filtered.append(port)
+        else:
+            closed[0] += 1
+        remaining[host] -= 1
+        if not remaining[host]:
+            del found[host], remaining[host]
+            stamp = datetime.utcnow().isoformat() + "Z"
+            yield compact_host(host, open_ports, filtered, closed[0], stamp)
+
+
+def _up_hosts(hosts: List[Dict[str, str]]) -> List[str]:
+    return list(dict.fromkeys(e.get("host") for e in hosts if e.get("status") == "up"))
+
+
+async def _aiter_up_hosts(records: AsyncIterable[Dict[str, str]]) -> AsyncIterator[str]:
+    seen = set()
+    async for e in records:
+        host = e.get("host")
+        if e.get("status") == "up" and host not in seen:
+            seen.add(host)
+            yield host
+
+
+def scan_ports(hosts: List[Dict[str, str]], ports: List[int], **kwargs) -> List[Dict[str, object]]:
+    """Scan ports on hosts that are up.
+
+    Args:
+        hosts: Layer 1 records; only ``status == "up"`` hosts are scanned.
+        ports: TCP ports to scan.
+        **kwargs: Passed to :func:`iter_scan` (``concurrency``, ``per_host``, timeouts).
+
+    Returns:
+        Layer 2 records ordered by host, then port, as given.
+    """
+    up = _up_hosts(hosts)
+    if not up or not ports:
+        return []
+
+    async def collect() -> List[Dict[str, object]]:
+        return [rec async for rec in iter_scan(up, ports, **kwargs)]
+
+    host_rank = {h: i for i, h in enumerate(up)}
+    port_rank = {p: i for i, p in enumerate(ports)}
+    return sorted(
+        asyncio.run(collect()), key=lambda r: (host_rank[r["host"]], port_rank[r["port"]])
+    )
+
+
+def scan_ports_compact(
+    hosts: List[Dict[str, str]], ports: List[int], **kwargs
+) -> List[Dict[str, object]]:
+    """Like :func:`scan_ports` but one compact record per host, in input host order."""
+    up = _up_hosts(hosts)
+    if not up or not ports:
+        return []
+
+    async def collect() -> List[Dict[str, object]]:
+        return [rec async for rec in iter_scan_compact(up, ports, **kwargs)]
+
+    host_rank = {h: i for i, h in enumerate(up)}
+    return sorted(asyncio.run(collect()), key=lambda r: host_rank[r["host"]])
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Layer 2 - Port Scanning")
     parser.add_argument(
-        "--input",
-        default="layer1_output.json",
-        help="Input JSON from layer 1",
+        "--ports",
+        help="Comma separated ports and ranges to scan, e.g. 22,80,8000-8100 (default 80,443,22)",
+    )
+    parser.add_argument(
+        "--top-ports",
+        type=int,
+        help=f"Also scan the N most common TCP ports (up to {len(TOP_PORTS)})",
     )
     parser.add_argument(
-        "--ports",
-        default="80,443,22",
-        help="Comma separated list of ports to scan",
+        "--banners",
+        action="store_true",
+        help="Read a banner on the connection that finds each port open (layer 3 reuses it)",
+    )
+    parser.add_argument(
+        "--banner-timeout",
+        type=float,
+        default=2.0,
+        help="Seconds to wait for a banner with --banners",
     )
     parser.add_argument(
-        "--output",
-        default="layer2_output.json",
-        help="Output JSON file",
+        "--compact",
+        action="store_true",
+        help="One record per host: open and filtered ports listed, closed ports counted",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=500,
+        help="Connects in flight across all hosts",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=100,
+        help="Connects in flight against any one host",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=1.0,
+        help="Connect timeout until a host's RTT is known (upper bound afterwards)",
+    )
+    parser.add_argument(
+        "--min-timeout",
+        type=float,
+        default=0.1,
+        help="Lower bound for the RTT-derived connect timeout",
+    )
+    add_io_arguments(parser, "layer1_output.json", "layer2_output.json")
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -75,14 +452,33 @@ def main() -> None:
     )
     logging.info("Layer 2 reading input from %s", args.input)
 
-    hosts = load_hosts(args.input)
-    ports = [int(p) for p in args.ports.split(",") if p]
-    results = scan_ports(hosts, ports)
+    try:
+        ports = parse_ports(args.ports or ("" if args.top_ports else "80,443,22"))
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.top_ports:
+        ports = list(dict.fromkeys(top_ports(args.top_ports) + ports))
+    scan = iter_scan_compact if args.compact else iter_scan
+
+    async def run(out: RecordWriter) -> None:
+        # Hosts are scanned as layer 1 records arrive; results are written as they complete.
+        hosts = _aiter_up_hosts(aiter_blocking(iter_records(args.input)))
+        async for rec in scan(
+            hosts,
+            ports,
+            concurrency=args.concurrency,
+            per_host=args.per_host,
+            min_timeout=args.min_timeout,
+            max_timeout=args.timeout,
+            banner_timeout=args.banner_timeout if args.banners else None,
+        ):
+            out.write(rec)
 
     try:
-        with open(args.output, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=2)
-        logging.info("Layer 2 output written to %s", args.output)
+        # Compact records go one host per line, so port lists are not spread over many lines.
+        with RecordWriter(args.output, args.format, pretty=not args.compact) as out:
+            asyncio.run(run(out))
+        logging.info("Layer 2 output written to %s (%d records)", args.output, out.count)
     except OSError as exc:  # pragma: no cover
         logging.error("Failed to write output: %s", exc)
 
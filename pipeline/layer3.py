@@ -1,67 +1,207 @@
 import argparse
-import json
+import asyncio
 import logging
 import socket
+import time
 from datetime import datetime
-from typing import List, Dict
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from net import grab_banner
+from records import (
+    RecordWriter,
+    add_io_arguments,
+    aiter_blocking,
+    iter_port_records,
+    iter_records,
+    load_json,
+)
 
 
 def load_ports(path: str) -> List[Dict[str, object]]:
+    """Load layer 2 output (per-port or compact) as flat per-port records."""
+    return list(iter_port_records(load_json(path)))
+
+
+async def _grab(host: str, port: int, timeout: float) -> Optional[Tuple[str, float]]:
+    """Connect and grab a banner; ``(banner, elapsed_ms)`` or None if the connect failed."""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logging.error("Input file %s not found", path)
-    except json.JSONDecodeError as exc:
-        logging.error("Invalid JSON in %s: %s", path, exc)
-    return []
-
-
-def enumerate_services(entries: List[Dict[str, object]]) -> List[Dict[str, object]]:
-    results: List[Dict[str, object]] = []
-    for e in entries:
-        if e.get("state") != "open":
-            continue
-        host = e.get("host")
-        port = e.get("port")
-        service = e.get("service", "unknown")
-        banner = ""
-        try:
-            with socket.create_connection((host, port), timeout=2) as sock:
-                sock.settimeout(2)
-                try:
-                    sock.sendall(b"\r\n")
-                    data = sock.recv(1024)
-                    banner = data.decode(errors="ignore").strip()
-                except Exception:
-                    banner = ""
-        except Exception:  # pragma: no cover - network dependent
+        async with asyncio.timeout(timeout):
+            infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            family, _, _, _, addr = infos[0]
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            try:
+                await loop.sock_connect(sock, addr)
+            except BaseException:
+                sock.close()
+                raise
+    except (OSError, IndexError, asyncio.TimeoutError):
+        return None
+    with sock:
+        banner = await grab_banner(sock, timeout)
+    return banner, round((time.perf_counter() - start) * 1000, 1)
+
+
+async def _aiter(items: Iterable) -> AsyncIterator:
+    for item in items:
+        yield item
+
+
+async def iter_services(
+    entries: Union[Iterable[Dict[str, object]], AsyncIterable[Dict[str, object]]],
+    concurrency: int = 100,
+    per_host: int = 10,
+    timeout: float = 2.0,
+) -> AsyncIterator[Tuple[int, Dict[str, object]]]:
+    """Grab banners from the open ports in ``entries`` and yield ``(index, record)``.
+
+    ``index`` is the entry's position in ``entries``, for callers that want input order.
+    Entries that already carry a ``banner`` (layer 2 ``--banners``) are passed through
+    without reconnecting. Ports whose connect fails are logged and skipped.
+
+    Args:
+        entries: Flat per-port layer 2 records; an async iterable is consumed as it yields,
+            with at most ``concurrency`` grabs in flight or results waiting to be taken.
+        concurrency: Banner grabs in flight across all hosts.
+        per_host: Banner grabs in flight against any one host.
+        timeout: Connect and read timeout, each, in seconds.
+
+    Yields:
+        ``(index, {"host", "port", "service", "banner", "timestamp", "elapsed_ms"})`` in
+        completion order.
+    """
+    total = asyncio.Semaphore(max(1, concurrency))
+    limits: Dict[object, asyncio.Semaphore] = {}
+
+    def record(e: Dict[str, object], banner: str, elapsed_ms: Optional[float]) -> Dict[str, object]:
+        return {
+            "host": e.get("host"),
+            "port": e.get("port"),
+            "service": e.get("service", "unknown"),
+            "banner": banner,
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "elapsed_ms": elapsed_ms,
+        }
+
+    async def one(i: int, e: Dict[str, object]) -> Optional[Tuple[int, Dict[str, object]]]:
+        host, port = e.get("host"), e.get("port")
+        sem = limits.setdefault(host, asyncio.Semaphore(max(1, per_host)))
+        async with sem:
+            res = await _grab(host, port, timeout)
+        if res is None:  # pragma: no cover - network dependent
             logging.error("Connection failed for %s:%s", host, port)
-            continue
-        results.append(
-            {
-                "host": host,
-                "port": port,
-                "service": service,
-                "banner": banner,
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-            }
-        )
-    return results
+            return None
+        return i, record(e, *res)
+
+    source = entries if hasattr(entries, "__aiter__") else _aiter(entries)
+    results: asyncio.Queue = asyncio.Queue()
+    tasks: Set[asyncio.Future] = set()
+
+    async def run(i: int, e: Dict[str, object]) -> None:
+        res = None
+        try:
+            res = await one(i, e)
+        finally:
+            if res is None:
+                total.release()
+            else:
+                results.put_nowait(res)  # the slot is released once the result is consumed
+
+    async def feed() -> None:
+        try:
+            i = -1
+            async for e in source:
+                i += 1
+                if e.get("state") != "open":
+                    continue
+                # Grabs in flight and results not yet consumed each hold a slot, so input is
+                # read only as fast as the caller takes results.
+                await total.acquire()
+                if "banner" in e:
+                    results.put_nowait((i, record(e, e["banner"], e.get("elapsed_ms"))))
+                    continue
+                task = asyncio.ensure_future(run(i, e))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*list(tasks))
+        finally:
+            results.put_nowait(None)
+
+    feeder = asyncio.ensure_future(feed())
+    try:
+        while True:
+            item = await results.get()
+            if item is None:
+                break
+            total.release()
+            yield item
+        await feeder
+    finally:
+        feeder.cancel()
+        for task in list(tasks):
+            task.cancel()
+
+
+def enumerate_services(entries: List[Dict[str, object]], **kwargs) -> List[Dict[str, object]]:
+    """Grab banners from every open port concurrently.
+
+    Args:
+        entries: Flat per-port layer 2 records.
+        **kwargs: Passed to :func:`iter_services` (``concurrency``, ``per_host``, ``timeout``).
+
+    Returns:
+        One record per reachable open port, in input order, with ``elapsed_ms`` timing.
+    """
+
+    async def collect() -> List[Tuple[int, Dict[str, object]]]:
+        return [r async for r in iter_services(entries, **kwargs)]
+
+    return [rec for _, rec in sorted(asyncio.run(collect()), key=lambda r: r[0])]
+
+
+def timing_stats(elapsed_ms: Iterable[Optional[float]]) -> Dict[str, float]:
+    """Count plus p50/p95/max of ``elapsed_ms`` values, ignoring missing ones."""
+    times = sorted(t for t in elapsed_ms if t is not None)
+    if not times:
+        return {"count": 0}
+    pick = lambda q: times[min(len(times) - 1, int(q * len(times)))]  # noqa: E731
+    return {"count": len(times), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": times[-1]}
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Layer 3 - Service Enumeration")
     parser.add_argument(
-        "--input",
-        default="layer2_output.json",
-        help="Input JSON from layer 2",
+        "--concurrency",
+        type=int,
+        default=100,
+        help="Banner grabs in flight across all hosts",
     )
     parser.add_argument(
-        "--output",
-        default="layer3_output.json",
-        help="Output JSON file",
+        "--per-host",
+        type=int,
+        default=10,
+        help="Banner grabs in flight against any one host",
     )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=2.0,
+        help="Connect and read timeout in seconds",
+    )
+    add_io_arguments(parser, "layer2_output.json", "layer3_output.json")
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -70,15 +210,30 @@ def main() -> None:
     )
     logging.info("Layer 3 reading input from %s", args.input)
 
-    entries = load_ports(args.input)
-    results = enumerate_services(entries)
+    elapsed: List[Optional[float]] = []
 
+    async def run(out: RecordWriter) -> None:
+        # Open ports are grabbed as layer 2 records arrive; results are written as they complete.
+        entries = aiter_blocking(iter_port_records(iter_records(args.input)))
+        async for _, rec in iter_services(
+            entries, concurrency=args.concurrency, per_host=args.per_host, timeout=args.timeout
+        ):
+            out.write(rec)
+            elapsed.append(rec["elapsed_ms"])
+
+    start = time.perf_counter()
     try:
-        with open(args.output, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=2)
+        with RecordWriter(args.output, args.format) as out:
+            asyncio.run(run(out))
         logging.info("Layer 3 output written to %s", args.output)
     except OSError as exc:  # pragma: no cover
         logging.error("Failed to write output: %s", exc)
+    logging.info(
+        "Layer 3 grabbed %d banners in %.2fs: %s",
+        len(elapsed),
+        time.perf_counter() - start,
+        timing_stats(elapsed),
+    )
 
 
 if __name__ == "__main__":
@@ -1,70 +1,68 @@
 import argparse
-import json
 import logging
 from datetime import datetime
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List, Optional
 
-
-KNOWN_VULNS = [
-    {
-        "pattern": "Apache/2.4.49",
-        "vulnerability": "CVE-2021-41773",
-        "severity": "high",
-        "description": "Path traversal in Apache httpd 2.4.49",
-    },
-    {
-        "pattern": "OpenSSH_7.2",
-        "vulnerability": "CVE-2016-0777",
-        "severity": "medium",
-        "description": "OpenSSH roaming issue",
-    },
-]
+from records import RecordWriter, add_io_arguments, iter_port_records, iter_records, load_json
+from signatures import DEFAULT_SIGNATURES, SignatureMatcher, load_signatures
 
 
 def load_services(path: str) -> List[Dict[str, object]]:
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logging.error("Input file %s not found", path)
-    except json.JSONDecodeError as exc:
-        logging.error("Invalid JSON in %s: %s", path, exc)
-    return []
+    """Load layer 3 output; compact layer 2 files are expanded to per-port records."""
+    return list(iter_port_records(load_json(path)))
+
+
+_default_matcher: Optional[SignatureMatcher] = None
 
 
-def scan_vulnerabilities(entries: List[Dict[str, object]]) -> List[Dict[str, object]]:
-    results: List[Dict[str, object]] = []
+def default_matcher() -> SignatureMatcher:
+    """Matcher over ``signatures.json`` next to this script, built on first use."""
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = SignatureMatcher(load_signatures(DEFAULT_SIGNATURES))
+    return _default_matcher
+
+
+def iter_vulnerabilities(
+    entries: Iterable[Dict[str, object]], matcher: Optional[SignatureMatcher] = None
+) -> Iterator[Dict[str, object]]:
+    """Yield one record per (entry, matching signature) as entries are read."""
+    matcher = matcher or default_matcher()
     for e in entries:
-        banner = e.get("banner", "")
-        host = e.get("host")
-        port = e.get("port")
-        for vuln in KNOWN_VULNS:
-            if vuln["pattern"] in banner:
-                results.append(
-                    {
-                        "host": host,
-                        "port": port,
-                        "vulnerability": vuln["vulnerability"],
-                        "severity": vuln["severity"],
-                        "description": vuln["description"],
-                        "timestamp": datetime.utcnow().isoformat() + "Z",
-                    }
-                )
-    return results
+        for sig in matcher.match(e.get("banner") or ""):
+            yield {
+                "host": e.get("host"),
+                "port": e.get("port"),
+                "vulnerability": sig.fields.get("vulnerability"),
+                "severity": sig.fields.get("severity", "info"),
+                "description": sig.fields.get("description", ""),
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+            }
+
+
+def scan_vulnerabilities(
+    entries: List[Dict[str, object]], matcher: Optional[SignatureMatcher] = None
+) -> List[Dict[str, object]]:
+    """Match every banner against all signatures in one pass per banner.
+
+    Args:
+        entries: Layer 3 records (anything with ``host``, ``port`` and ``banner``).
+        matcher: Compiled signatures; defaults to :func:`default_matcher`.
+
+    Returns:
+        One record per (entry, matching signature).
+    """
+    return list(iter_vulnerabilities(entries, matcher))
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Layer 4 - Vulnerability Scan")
     parser.add_argument(
-        "--input",
-        default="layer3_output.json",
-        help="Input JSON from layer 3",
-    )
-    parser.add_argument(
-        "--output",
-        default="layer4_output.json",
-        help="Output JSON file",
+        "--signatures",
+        default=str(DEFAULT_SIGNATURES),
+        help="Signature file (JSON array or NDJSON)",
     )
+    add_io_arguments(parser, "layer3_output.json", "layer4_output.json")
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -73,13 +71,19 @@ def main() -> None:
     )
     logging.info("Layer 4 reading input from %s", args.input)
 
-    services = load_services(args.input)
-    results = scan_vulnerabilities(services)
+    try:
+        signatures = load_signatures(args.signatures)
+    except (OSError, ValueError) as exc:
+        logging.error("Cannot load signatures from %s: %s", args.signatures, exc)
+        return
+    logging.info("Loaded %d signatures", len(signatures))
+    services = iter_port_records(iter_records(args.input))
 
     try:
-        with open(args.output, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=2)
-        logging.info("Layer 4 output written to %s", args.output)
+        with RecordWriter(args.output, args.format) as out:
+            for rec in iter_vulnerabilities(services, SignatureMatcher(signatures)):
+                out.write(rec)
+        logging.info("Layer 4 output written to %s (%d findings)", args.output, out.count)
     except OSError as exc:  # pragma: no cover
         logging.error("Failed to write output: %s", exc)
 
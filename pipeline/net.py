@@ -0,0 +1,23 @@
+"""Socket helpers shared by the scanning layers.
+
+Layer 2 (``--banners``, on the connection that found a port open) and layer 3 read banners
+the same way; the probe lives here so neither layer has to import the other.
+"""
+
+import asyncio
+import socket
+
+
+async def grab_banner(sock: socket.socket, timeout: float = 2.0, probe: bytes = b"\r\n") -> str:
+    """Send ``probe`` on a connected non-blocking socket and return the first reply, stripped.
+
+    Returns ``""`` when the peer sends nothing within ``timeout`` or resets the connection.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        async with asyncio.timeout(timeout):
+            await loop.sock_sendall(sock, probe)
+            data = await loop.sock_recv(sock, 1024)
+    except (OSError, asyncio.TimeoutError):
+        return ""
+    return data.decode(errors="ignore").strip()
@@ -0,0 +1,201 @@
+"""Shared readers and writers for the per-layer record formats.
+
+Every layer reads and writes either a JSON array (the original format) or NDJSON, one
+record per line. ``-`` means stdin/stdout, so layers can be chained with pipes::
+
+    python layer1.py 10.0.0.0/24 --output - | python layer2.py --input - --output - \\
+        | python layer3.py --input - --output - | python layer4.py --input -
+
+NDJSON input is processed as lines arrive and NDJSON output is flushed per record, so
+downstream layers start work while upstream ones are still scanning.
+
+Layer 2 writes either one record per (host, port) or, with ``--compact``, one record per
+host::
+
+    {"host": "10.0.0.5", "protocol": "tcp", "timestamp": "...",
+     "open": [{"port": 22, "service": "ssh"}], "filtered": [8443], "closed": 998}
+
+``closed`` is a count; open ports carry their service (and any extra fields such as a
+banner), filtered ports are bare port numbers. Downstream layers read both shapes through
+:func:`iter_port_records`.
+"""
+
+import asyncio
+import json
+import logging
+import sys
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, TextIO
+
+
+def load_json(path: str) -> List[Dict[str, object]]:
+    """Load a layer's output (JSON array or NDJSON), logging and returning ``[]`` when it is
+    missing or invalid."""
+    return list(iter_records(path))
+
+
+def iter_records(path: str) -> Iterator[Dict[str, object]]:
+    """Yield records from a JSON array or NDJSON file, detected from the first character.
+
+    ``"-"`` reads stdin. NDJSON is parsed line by line as it arrives; malformed lines are
+    logged and skipped. A JSON array is loaded whole.
+    """
+    try:
+        f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        logging.error("Input file %s not found", path)
+        return
+    except OSError as exc:
+        logging.error("Cannot open %s: %s", path, exc)
+        return
+    try:
+        n, first = 0, ""
+        for n, first in enumerate(f, 1):
+            if first.strip():
+                break
+        if not first.strip():
+            return
+        if first.lstrip().startswith("["):
+            try:
+                data = json.loads(first + f.read())
+            except json.JSONDecodeError as exc:
+                logging.error("Invalid JSON in %s: %s", path, exc)
+                return
+            yield from data
+            return
+        yield from _ndjson_line(first, path, n)
+        for n, line in enumerate(f, n + 1):
+            if line.strip():
+                yield from _ndjson_line(line, path, n)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _ndjson_line(line: str, path: str, n: int) -> Iterator[Dict[str, object]]:
+    try:
+        yield json.loads(line)
+    except json.JSONDecodeError as exc:
+        logging.error("Invalid JSON on line %d of %s: %s", n, path, exc)
+
+
+async def aiter_blocking(iterable: Iterable) -> AsyncIterator:
+    """Iterate a blocking iterable (e.g. stdin records) from a worker thread, one item at a
+    time, so waiting on upstream never stalls the event loop."""
+    it = iter(iterable)
+    done = object()
+    while True:
+        item = await asyncio.to_thread(next, it, done)
+        if item is done:
+            return
+        yield item
+
+
+class RecordWriter:
+    """Write records as a JSON array or as NDJSON, one at a time.
+
+    Args:
+        path: Output file, or ``"-"`` for stdout.
+        fmt: ``"json"`` or ``"ndjson"``; defaults to NDJSON for stdout and JSON otherwise.
+        pretty: Indent JSON-array records as ``json.dump(..., indent=2)`` did; otherwise one
+            record per line.
+    """
+
+    def __init__(self, path: str, fmt: Optional[str] = None, pretty: bool = True):
+        self.path = path
+        self.fmt = fmt or ("ndjson" if path == "-" else "json")
+        if self.fmt not in ("json", "ndjson"):
+            raise ValueError(f"Unknown output format: {self.fmt}")
+        self.pretty = pretty
+        self.count = 0
+        self._f: TextIO = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+
+    def write(self, record: Dict[str, object]) -> None:
+        if self.fmt == "ndjson":
+            self._f.write(json.dumps(record) + "\n")
+            self._f.flush()
+        else:
+            if self.pretty:
+                body = "\n".join("  " + line for line in json.dumps(record, indent=2).splitlines())
+            else:
+                body = json.dumps(record)
+            self._f.write(("[\n" if not self.count else ",\n") + body)
+        self.count += 1
+
+    def close(self) -> None:
+        if self.fmt == "json":
+            self._f.write("\n]\n" if self.count else "[]\n")
+        self._f.flush()
+        if self._f is not sys.stdout:
+            self._f.close()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def add_io_arguments(parser, default_input: Optional[str], default_output: str) -> None:
+    """``--input``/``--output``/``--format`` as every layer's CLI spells them."""
+    if default_input is not None:
+        parser.add_argument(
+            "--input",
+            default=default_input,
+            help="Input JSON array or NDJSON file ('-' for stdin)",
+        )
+    parser.add_argument(
+        "--output",
+        default=default_output,
+        help="Output file ('-' for stdout)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "ndjson"],
+        help="Output format (default: ndjson for stdout, json otherwise)",
+    )
+
+
+def is_compact(entry: Dict[str, object]) -> bool:
+    """True for a per-host compact layer 2 record."""
+    return isinstance(entry.get("open"), list)
+
+
+def compact_host(
+    host: str,
+    open_ports: List[Dict[str, object]],
+    filtered: List[int],
+    closed: int,
+    timestamp: str,
+    protocol: str = "tcp",
+) -> Dict[str, object]:
+    """Build a compact layer 2 record; ports are sorted so output is stable."""
+    return {
+        "host": host,
+        "protocol": protocol,
+        "timestamp": timestamp,
+        "open": sorted(open_ports, key=lambda p: p["port"]),
+        "filtered": sorted(filtered),
+        "closed": closed,
+    }
+
+
+def iter_port_records(entries: Iterable[Dict[str, object]]) -> Iterator[Dict[str, object]]:
+    """Yield one flat per-port record for every entry, expanding compact host records.
+
+    Compact records expand to their open ports (``state`` ``"open"``) and filtered ports
+    (``state`` ``"filtered"``), each carrying the host's timestamp; closed ports only
+    exist as a count and are not expanded. Flat records pass through unchanged.
+    """
+    for entry in entries:
+        if not is_compact(entry):
+            yield entry
+            continue
+        base = {
+            "host": entry.get("host"),
+            "protocol": entry.get("protocol", "tcp"),
+            "timestamp": entry.get("timestamp"),
+        }
+        for p in entry["open"]:
+            yield {**base, "service": "unknown", **p, "state": "open"}
+        for port in entry.get("filtered", []):
+            yield {**base, "port": port, "state": "filtered", "service": "unknown"}
@@ -0,0 +1,375 @@
+"""Run all four layers in one process, connected by bounded queues.
+
+Each stage consumes the previous stage's queue as it fills and has its own worker count:
+
+1. discovery - ``layer1.iter_discovery`` on a thread pool; up hosts go to the scan queue.
+2. scan - ``layer2.iter_scan`` (asyncio connects); open ports go to the banner queue.
+3. banners - ``layer3.iter_services`` (asyncio banner grabs); records go to the match queue.
+4. match - ``layer4.iter_vulnerabilities`` on worker threads; findings are written out.
+
+Queues hold at most ``--queue-size`` items, so a slow stage blocks its upstream ``put``
+and the upstream stage stops pulling new work, all the way back to host discovery; nothing
+is buffered without bound. At the end, per-stage throughput and queue-depth metrics are
+logged (and written as JSON with ``--metrics``).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence
+
+from layer1 import DEFAULT_TCP_PORTS, expand_targets, iter_discovery, read_host_file
+from layer2 import iter_scan, parse_ports, top_ports
+from layer3 import iter_services
+from layer4 import default_matcher, iter_vulnerabilities
+from records import RecordWriter, add_io_arguments, aiter_blocking
+from signatures import SignatureMatcher, load_signatures
+
+_DONE = object()
+
+
+class MeteredQueue(asyncio.Queue):
+    """Bounded queue that records its depth on every put and how long producers blocked."""
+
+    def __init__(self, name: str, maxsize: int):
+        super().__init__(maxsize=maxsize)
+        self.name = name
+        self.max_depth = 0
+        self.blocked_puts = 0
+        self.blocked_seconds = 0.0
+        self._depth_sum = 0
+        self._samples = 0
+
+    async def put(self, item) -> None:
+        if not self.full():
+            self.put_nowait(item)
+            return
+        start = time.perf_counter()
+        await super().put(item)
+        self.blocked_puts += 1
+        self.blocked_seconds += time.perf_counter() - start
+
+    def put_nowait(self, item) -> None:
+        super().put_nowait(item)
+        if item is not _DONE:
+            depth = self.qsize()
+            self.max_depth = max(self.max_depth, depth)
+            self._depth_sum += depth
+            self._samples += 1
+
+    def metrics(self) -> Dict[str, object]:
+        return {
+            "queue": self.name,
+            "capacity": self.maxsize,
+            "max_depth": self.max_depth,
+            "mean_depth": round(self._depth_sum / self._samples, 1) if self._samples else 0.0,
+            "blocked_puts": self.blocked_puts,
+            "blocked_s": round(self.blocked_seconds, 3),
+        }
+
+
+@dataclass
+class StageStats:
+    """Work done by one stage: ``processed`` units of work, ``emitted`` records passed on."""
+
+    name: str
+    workers: int
+    processed: int = 0
+    emitted: int = 0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    queue: Dict[str, object] = field(default_factory=dict)
+
+    def metrics(self) -> Dict[str, object]:
+        elapsed = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        out = asdict(self)
+        del out["started"], out["finished"]
+        out["elapsed_s"] = round(elapsed, 3)
+        out["per_second"] = round(self.processed / elapsed, 1) if elapsed > 0 else 0.0
+        return out
+
+
+async def _drain(queue: asyncio.Queue) -> AsyncIterator:
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            return
+        yield item
+
+
+def _match(rec: Dict[str, object], matcher: SignatureMatcher) -> List[Dict[str, object]]:
+    return list(iter_vulnerabilities([rec], matcher))
+
+
+@dataclass
+class PipelineConfig:
+    """Stage settings; ``*_workers`` are each stage's concurrency."""
+
+    ports: Sequence[int]
+    method: str = "ping"
+    tcp_ports: Sequence[int] = DEFAULT_TCP_PORTS
+    discovery_workers: int = 64
+    discovery_timeout: float = 1.0
+    scan_workers: int = 500
+    scan_per_host: int = 100
+    scan_timeout: float = 1.0
+    scan_min_timeout: float = 0.1
+    banner_workers: int = 100
+    banner_per_host: int = 10
+    banner_timeout: float = 2.0
+    fused_banners: bool = False
+    match_workers: int = 2
+    queue_size: int = 256
+
+
+async def run_pipeline(
+    targets: Iterable[str],
+    config: PipelineConfig,
+    out: RecordWriter,
+    matcher: Optional[SignatureMatcher] = None,
+) -> List[StageStats]:
+    """Run discovery, scan, banner and match stages concurrently and write findings to ``out``.
+
+    Args:
+        targets: Hosts and CIDR ranges; expanded lazily.
+        config: Per-stage worker counts, timeouts and the queue bound.
+        out: Receives one layer 4 record per finding, as it is found.
+        matcher: Compiled signatures; defaults to ``signatures.json``.
+
+    Returns:
+        Per-stage statistics, with each stage's input queue metrics attached.
+    """
+    matcher = matcher or default_matcher()
+    hosts_q = MeteredQueue("hosts", config.queue_size)
+    ports_q = MeteredQueue("open_ports", config.queue_size)
+    banners_q = MeteredQueue("banners", config.queue_size)
+    stats = [
+        StageStats("discovery", config.discovery_workers),
+        StageStats("scan", config.scan_workers),
+        StageStats("banners", config.banner_workers),
+        StageStats("match", config.match_workers),
+    ]
+    discovery, scan, banners, match = stats
+
+    async def discover() -> None:
+        discovery.started = time.perf_counter()
+        results = iter_discovery(
+            expand_targets(targets),
+            concurrency=config.discovery_workers,
+            method=config.method,
+            ports=config.tcp_ports,
+            timeout=config.discovery_timeout,
+        )
+        try:
+            # The generator only submits a probe when asked for a result, so a full queue
+            # stops discovery from running ahead.
+            async for rec in aiter_blocking(results):
+                discovery.processed += 1
+                if rec["status"] == "up":
+                    discovery.emitted += 1
+                    await hosts_q.put(rec["host"])
+        finally:
+            discovery.finished = time.perf_counter()
+        await hosts_q.put(_DONE)
+
+    async def port_scan() -> None:
+        scan.started = time.perf_counter()
+        try:
+            async for rec in iter_scan(
+                _drain(hosts_q),
+                config.ports,
+                concurrency=config.scan_workers,
+                per_host=config.scan_per_host,
+                min_timeout=config.scan_min_timeout,
+                max_timeout=config.scan_timeout,
+                banner_timeout=config.banner_timeout if config.fused_banners else None,
+            ):
+                scan.processed += 1
+                if rec["state"] == "open":
+                    scan.emitted += 1
+                    await ports_q.put(rec)
+        finally:
+            scan.finished = time.perf_counter()
+        await ports_q.put(_DONE)
+
+    async def grab() -> None:
+        banners.started = time.perf_counter()
+        try:
+            async for _, rec in iter_services(
+                _drain(ports_q),
+                concurrency=config.banner_workers,
+                per_host=config.banner_per_host,
+                timeout=config.banner_timeout,
+            ):
+                banners.processed += 1
+                banners.emitted += 1
+                await banners_q.put(rec)
+        finally:
+            banners.finished = time.perf_counter()
+        await banners_q.put(_DONE)
+
+    async def match_worker() -> None:
+        async for rec in _drain(banners_q):
+            found = await asyncio.to_thread(_match, rec, matcher)
+            match.processed += 1
+            for finding in found:
+                match.emitted += 1
+                out.write(finding)
+        banners_q.put_nowait(_DONE)  # let the other match workers see the end too
+
+    async def matching() -> None:
+        match.started = time.perf_counter()
+        try:
+            await asyncio.gather(*(match_worker() for _ in range(max(1, config.match_workers))))
+        finally:
+            match.finished = time.perf_counter()
+
+    # A stage sends _DONE only when it finishes normally: if one fails, the TaskGroup cancels
+    # the rest, and a sentinel put into a full queue whose consumer is gone would never return.
+    async with asyncio.TaskGroup() as tg:
+        for stage in (discover, port_scan, grab, matching):
+            tg.create_task(stage())
+
+    for stage, queue in zip(stats[1:], (hosts_q, ports_q, banners_q)):
+        stage.queue = queue.metrics()
+    return stats
+
+
+def log_metrics(stats: Sequence[StageStats]) -> None:
+    for s in stats:
+        m = s.metrics()
+        q = m["queue"]
+        queue = (
+            f"; input queue max {q['max_depth']}/{q['capacity']}, mean {q['mean_depth']}, "
+            f"{q['blocked_puts']} blocked puts ({q['blocked_s']}s)"
+            if q
+            else ""
+        )
+        logging.info(
+            "Stage %-9s workers=%-4d processed=%-7d emitted=%-7d %.2fs (%.1f/s)%s",
+            s.name,
+            s.workers,
+            s.processed,
+            s.emitted,
+            m["elapsed_s"],
+            m["per_second"],
+            queue,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run layers 1-4 in one process")
+    parser.add_argument("targets", nargs="*", help="Hosts or CIDR ranges to probe")
+    parser.add_argument(
+        "--hosts-file",
+        action="append",
+        default=[],
+        help="File with one host or CIDR range per line, '-' for stdin (repeatable)",
+    )
+    parser.add_argument(
+        "--method",
+        choices=["ping", "tcp"],
+        default="ping",
+        help="Liveness check: ICMP ping or TCP connect",
+    )
+    parser.add_argument(
+        "--tcp-ports",
+        default=",".join(str(p) for p in DEFAULT_TCP_PORTS),
+        help="Comma separated ports tried by --method tcp",
+    )
+    parser.add_argument(
+        "--ports",
+        help="Ports and ranges to scan, e.g. 22,80,8000-8100 (default 80,443,22)",
+    )
+    parser.add_argument("--top-ports", type=int, help="Also scan the N most common TCP ports")
+    parser.add_argument(
+        "--banners",
+        action="store_true",
+        help="Read banners on the scan connection instead of reconnecting in stage 3",
+    )
+    parser.add_argument(
+        "--signatures",
+        help="Signature file (JSON array or NDJSON; default signatures.json)",
+    )
+    parser.add_argument("--discovery-workers", type=int, default=64, help="Probes in flight")
+    parser.add_argument("--scan-workers", type=int, default=500, help="Connects in flight")
+    parser.add_argument("--scan-per-host", type=int, default=100, help="Connects per host")
+    parser.add_argument("--banner-workers", type=int, default=100, help="Banner grabs in flight")
+    parser.add_argument("--banner-per-host", type=int, default=10, help="Banner grabs per host")
+    parser.add_argument("--match-workers", type=int, default=2, help="Signature match threads")
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=256,
+        help="Capacity of each inter-stage queue; a full queue throttles upstream stages",
+    )
+    parser.add_argument("--timeout", type=float, default=1.0, help="Discovery/connect timeout")
+    parser.add_argument("--banner-timeout", type=float, default=2.0, help="Banner read timeout")
+    parser.add_argument("--metrics", help="Also write per-stage metrics as JSON to this file")
+    add_io_arguments(parser, None, "pipeline_output.json")
+    args = parser.parse_args()
+    if not args.targets and not args.hosts_file:
+        parser.error("give targets and/or --hosts-file")
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+
+    try:
+        ports = parse_ports(args.ports or ("" if args.top_ports else "80,443,22"))
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.top_ports:
+        ports = list(dict.fromkeys(top_ports(args.top_ports) + ports))
+    config = PipelineConfig(
+        ports=ports,
+        method=args.method,
+        tcp_ports=[int(p) for p in args.tcp_ports.split(",") if p],
+        discovery_workers=args.discovery_workers,
+        discovery_timeout=args.timeout,
+        scan_workers=args.scan_workers,
+        scan_per_host=args.scan_per_host,
+        scan_timeout=args.timeout,
+        banner_workers=args.banner_workers,
+        banner_per_host=args.banner_per_host,
+        banner_timeout=args.banner_timeout,
+        fused_banners=args.banners,
+        match_workers=args.match_workers,
+        queue_size=max(1, args.queue_size),
+    )
+    try:
+        matcher = SignatureMatcher(load_signatures(args.signatures)) if args.signatures else None
+    except (OSError, ValueError) as exc:
+        logging.error("Cannot load signatures from %s: %s", args.signatures, exc)
+        return
+
+    def targets():
+        yield from args.targets
+        for path in args.hosts_file:
+            yield from read_host_file(path)
+
+    start = time.perf_counter()
+    try:
+        with RecordWriter(args.output, args.format) as out:
+            stats = asyncio.run(run_pipeline(targets(), config, out, matcher))
+    except OSError as exc:  # pragma: no cover
+        logging.error("Failed to write output: %s", exc)
+        return
+    logging.info(
+        "Pipeline wrote %d findings to %s in %.2fs",
+        out.count,
+        args.output,
+        time.perf_counter() - start,
+    )
+    log_metrics(stats)
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            json.dump([s.metrics() for s in stats], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Vulnerability signatures and a single-pass multi-pattern banner matcher.
+
+A signature file is a JSON array (or NDJSON, one object per line) of::
+
+    {"pattern": "OpenSSH_", "version": ">=5.4,<7.2", "vulnerability": "CVE-2016-0777",
+     "severity": "medium", "description": "OpenSSH roaming issue"}
+
+``pattern`` is a literal, case-sensitive substring of the banner. Without ``version`` the
+signature matches wherever the pattern occurs. With ``version``, the version string right
+after the pattern (or the first group of an optional ``regex`` matched there) must satisfy
+every comma-separated constraint (``<``, ``<=``, ``>``, ``>=``, ``==``, ``!=``).
+
+All patterns are compiled into one Aho-Corasick automaton, so a banner is scanned once no
+matter how many signatures are loaded.
+"""
+
+import json
+import logging
+import operator
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+DEFAULT_SIGNATURES = Path(__file__).resolve().parent / "signatures.json"
+
+_VERSION = re.compile(r"\d+(?:[._-]?[0-9A-Za-z]+)*")
+_CONSTRAINT = re.compile(r"^\s*(<=|>=|==|!=|<|>)?\s*(\S+)\s*$")
+_OPS: Dict[str, Callable] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+def version_key(version: str) -> Tuple[int, ...]:
+    """Numeric sort key for a version string: ``"7.2p2"`` -> ``(7, 2, 2)``."""
+    return tuple(int(n) for n in re.findall(r"\d+", version))
+
+
+def _pad(a: Tuple[int, ...], b: Tuple[int, ...]) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    n = max(len(a), len(b))
+    return a + (0,) * (n - len(a)), b + (0,) * (n - len(b))
+
+
+def parse_version_spec(spec: str) -> List[Tuple[Callable, Tuple[int, ...]]]:
+    """Parse ``">=5.4,<7.2"`` into ``[(op, version_key), ...]``.
+
+    Raises:
+        ValueError: On an unparseable constraint.
+    """
+    out = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        m = _CONSTRAINT.match(part)
+        if not m or not version_key(m.group(2)):
+            raise ValueError(f"Invalid version constraint: {part!r}")
+        out.append((_OPS[m.group(1) or "=="], version_key(m.group(2))))
+    return out
+
+
+@dataclass
+class Signature:
+    """One compiled signature; ``fields`` is the original mapping (reported on a match)."""
+
+    pattern: str
+    fields: Dict[str, object]
+    regex: Optional[Pattern] = None
+    constraints: List[Tuple[Callable, Tuple[int, ...]]] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "Signature":
+        pattern = data.get("pattern")
+        if not isinstance(pattern, str) or not pattern:
+            raise ValueError(f"Signature without a pattern: {data!r}")
+        regex = re.compile(data["regex"]) if data.get("regex") else None
+        constraints = parse_version_spec(data["version"]) if data.get("version") else []
+        return cls(pattern=pattern, fields=dict(data), regex=regex, constraints=constraints)
+
+    def version_at(self, banner: str, end: int) -> Optional[str]:
+        """The version following the pattern occurrence that ends at ``end``, if any."""
+        if self.regex is not None:
+            m = self.regex.match(banner, end)
+            return (m.group(1) if m.groups() else m.group(0)) if m else None
+        m = _VERSION.match(banner, end)
+        return m.group(0) if m else None
+
+    def matches_at(self, banner: str, end: int) -> bool:
+        if self.regex is None and not self.constraints:
+            return True
+        version = self.version_at(banner, end)
+        if version is None:
+            return False
+        if not self.constraints:
+            return True
+        key = version_key(version)
+        if not key:
+            return False
+        for op, bound in self.constraints:
+            if not op(*_pad(key, bound)):
+                return False
+        return True
+
+
+def load_signatures(path: Path = DEFAULT_SIGNATURES) -> List[Signature]:
+    """Load signatures from a JSON array or NDJSON file; invalid entries are logged and skipped."""
+    text = Path(path).read_text(encoding="utf-8")
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        raw = json.loads(text)
+    else:
+        raw = [json.loads(line) for line in text.splitlines() if line.strip()]
+    sigs = []
+    for data in raw:
+        try:
+            sigs.append(Signature.from_dict(data))
+        except (ValueError, re.error, TypeError, AttributeError) as exc:
+            logging.error("Skipping signature %r: %s", data, exc)
+    return sigs
+
+
+class SignatureMatcher:
+    """Aho-Corasick automaton over every signature pattern.
+
+    Args:
+        signatures: Compiled signatures; several may share a pattern.
+    """
+
+    def __init__(self, signatures: Sequence[Signature]):
+        self.signatures = list(signatures)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (pattern length, signature ids) for every pattern ending here,
+        # including those reached through failure links.
+        self._out: List[List[Tuple[int, List[int]]]] = [[]]
+        by_pattern: Dict[str, List[int]] = {}
+        for i, sig in enumerate(self.signatures):
+            by_pattern.setdefault(sig.pattern, []).append(i)
+        for pattern, ids in by_pattern.items():
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((len(pattern), ids))
+        self._build_failure_links()
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                if self._out[self._fail[nxt]]:
+                    self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_hits(self, text: str) -> Iterable[Tuple[int, int]]:
+        """Yield ``(signature index, end offset)`` for every pattern occurrence in ``text``."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for _, ids in out[state]:
+                    for sid in ids:
+                        yield sid, i + 1
+
+    def match(self, banner: str) -> List[Signature]:
+        """Every signature matching ``banner``, each once, in signature-file order."""
+        if not banner:
+            return []
+        found = set()
+        for sid, end in self.iter_hits(banner):
+            if sid not in found and self.signatures[sid].matches_at(banner, end):
+                found.add(sid)
+        return [self.signatures[i] for i in sorted(found)]
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The layers are flat scripts that import each other by module name, as the benchmarks do.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,103 @@
+import io
+import itertools
+import socket
+
+import pytest
+
+from layer1 import discover_hosts, expand_targets, iter_discovery, read_host_file, tcp_alive
+
+
+def _listener() -> socket.socket:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    s.listen(16)
+    return s
+
+
+def _closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_expand_targets_expands_ranges_and_drops_repeated_entries():
+    hosts = expand_targets(
+        ["10.0.0.0/30", " host.test ", "", "10.0.0.1/30", "host.test", "10.0.0.9/32", "bad/99"]
+    )
+    assert list(hosts) == ["10.0.0.1", "10.0.0.2", "host.test", "10.0.0.9"]
+    assert list(expand_targets(["2001:db8::1/128", "192.0.2.0/31"])) == [
+        "2001:db8::1",
+        "192.0.2.0",
+        "192.0.2.1",
+    ]
+
+
+def test_expand_targets_is_lazy_for_large_ranges():
+    hosts = expand_targets(["10.0.0.0/8"])
+    assert list(itertools.islice(hosts, 3)) == ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+
+
+def test_read_host_file_strips_comments_and_blank_lines(tmp_path, monkeypatch, caplog):
+    path = tmp_path / "hosts.txt"
+    path.write_text("# targets\n10.0.0.1\n\n  host.test  # web\n10.0.0.0/30\n", encoding="utf-8")
+    assert list(read_host_file(str(path))) == ["10.0.0.1", "host.test", "10.0.0.0/30"]
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("a.test\n#b.test\nc.test\n"))
+    assert list(read_host_file("-")) == ["a.test", "c.test"]
+
+    assert list(read_host_file(str(tmp_path / "missing.txt"))) == []
+    assert "Cannot read host file" in caplog.text
+
+
+def _unreachable(monkeypatch, host: str) -> None:
+    """Make connections to ``host`` time out, as they would for a silent host."""
+    connect = socket.create_connection
+
+    def create_connection(address, *args, **kwargs):
+        if address[0] == host:
+            raise socket.timeout("timed out")
+        return connect(address, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "create_connection", create_connection)
+
+
+def test_tcp_alive_counts_accepted_and_refused_connections_as_up(monkeypatch):
+    _unreachable(monkeypatch, "192.0.2.1")
+    with _listener() as listener:
+        open_port = listener.getsockname()[1]
+        assert tcp_alive("127.0.0.1", [open_port], timeout=1.0)
+        assert tcp_alive("127.0.0.1", [_closed_port()], timeout=1.0)
+        assert tcp_alive("192.0.2.1", [80], timeout=1.0) is False
+        assert tcp_alive("127.0.0.1", [], timeout=1.0) is False
+
+
+def test_iter_discovery_tcp_reports_every_host(monkeypatch):
+    _unreachable(monkeypatch, "192.0.2.1")
+    with _listener() as listener:
+        port = listener.getsockname()[1]
+        recs = discover_hosts(["127.0.0.1", "192.0.2.1"], method="tcp", ports=[port], timeout=0.2)
+    assert sorted((r["host"], r["status"]) for r in recs) == [
+        ("127.0.0.1", "up"),
+        ("192.0.2.1", "down"),
+    ]
+    assert all(r["timestamp"].endswith("Z") for r in recs)
+
+
+def test_iter_discovery_consumes_hosts_lazily():
+    pulled = 0
+
+    def hosts():
+        nonlocal pulled
+        while True:
+            pulled += 1
+            yield "127.0.0.1"
+
+    recs = iter_discovery(hosts(), concurrency=2, method="tcp", ports=[_closed_port()])
+    assert [r["status"] for r in itertools.islice(recs, 3)] == ["up"] * 3
+    assert pulled <= 3 + 2
+    recs.close()
+
+
+def test_iter_discovery_rejects_unknown_method():
+    with pytest.raises(ValueError, match="Unknown discovery method"):
+        next(iter_discovery(["127.0.0.1"], method="arp"))
@@ -0,0 +1,91 @@
+import socket
+
+import pytest
+
+from layer2 import TOP_PORTS, parse_ports, scan_ports, scan_ports_compact, top_ports
+from records import RecordWriter, compact_host, iter_port_records, iter_records
+
+
+def _listener() -> socket.socket:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    s.listen(16)
+    return s
+
+
+def _closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_scan_ports_reports_open_and_closed_ports_in_input_order():
+    with _listener() as listener:
+        open_port, closed = listener.getsockname()[1], _closed_port()
+        hosts = [
+            {"host": "127.0.0.1", "status": "up"},
+            {"host": "192.0.2.1", "status": "down"},
+            {"host": "127.0.0.1", "status": "up"},
+        ]
+        recs = scan_ports(hosts, [closed, open_port], concurrency=4, per_host=2)
+
+    assert [(r["host"], r["port"], r["state"], r["protocol"]) for r in recs] == [
+        ("127.0.0.1", closed, "closed", "tcp"),
+        ("127.0.0.1", open_port, "open", "tcp"),
+    ]
+    assert recs[0]["service"] == "unknown"
+    assert all(r["timestamp"].endswith("Z") for r in recs)
+    assert scan_ports([{"host": "127.0.0.1", "status": "down"}], [open_port]) == []
+
+
+def test_parse_ports_expands_ranges_and_drops_duplicates():
+    assert parse_ports("22,80,8000-8003") == [22, 80, 8000, 8001, 8002, 8003]
+    assert parse_ports(" 443, 80-82,81,443 ,, 1-1") == [443, 80, 81, 82, 1]
+    assert parse_ports("") == []
+    assert len(parse_ports("1-65535")) == 65535
+    for bad in ("0", "65536", "10-5", "http", "80-", "1-2-3"):
+        with pytest.raises(ValueError):
+            parse_ports(bad)
+
+
+def test_top_ports_takes_the_most_common_first():
+    assert top_ports(3) == [80, 23, 443]
+    assert top_ports(0) == []
+    assert top_ports(10_000) == list(TOP_PORTS)
+
+
+def test_compact_records_round_trip_to_per_port_records(tmp_path):
+    with _listener() as listener:
+        open_port, closed = listener.getsockname()[1], _closed_port()
+        hosts = [{"host": "127.0.0.1", "status": "up"}]
+        per_port = scan_ports(hosts, [closed, open_port])
+        compact = scan_ports_compact(hosts, [closed, open_port])
+
+    assert len(compact) == 1
+    rec = compact[0]
+    assert (rec["host"], rec["protocol"], rec["filtered"], rec["closed"]) == (
+        "127.0.0.1",
+        "tcp",
+        [],
+        1,
+    )
+    assert rec["open"] == [{"port": open_port, "service": per_port[1]["service"]}]
+
+    # Through a file and back, compact output expands to the per-port open records.
+    path = tmp_path / "layer2.ndjson"
+    open_ports = [{"port": 443, "service": "https", "banner": "x"}, {"port": 22, "service": "ssh"}]
+    other = compact_host("10.0.0.9", open_ports, [8443, 25], 7, "t")
+    with RecordWriter(str(path), "ndjson") as out:
+        out.write(rec)
+        out.write(other)
+    expanded = list(iter_port_records(iter_records(str(path))))
+    strip = lambda r: {k: v for k, v in r.items() if k != "timestamp"}  # noqa: E731
+    assert strip(expanded[0]) == strip(per_port[1])
+    assert expanded[0]["timestamp"] == rec["timestamp"]
+    assert [(r["port"], r["state"], r["service"]) for r in expanded[1:]] == [
+        (22, "open", "ssh"),
+        (443, "open", "https"),
+        (25, "filtered", "unknown"),
+        (8443, "filtered", "unknown"),
+    ]
+    assert expanded[2]["banner"] == "x" and expanded[1]["timestamp"] == "t"
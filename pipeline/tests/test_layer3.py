@@ -0,0 +1,74 @@
+import socket
+import threading
+
+from layer2 import scan_ports
+from layer3 import enumerate_services, timing_stats
+
+BANNER = b"SSH-2.0-OpenSSH_7.1p2 Debian\r\n"
+
+
+def _banner_server(connections: list) -> socket.socket:
+    """Listener that answers every connection's first read with ``BANNER``."""
+    srv = socket.socket()
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(16)
+
+    def serve() -> None:
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except OSError:
+                return
+            connections.append(1)
+            with conn:
+                conn.settimeout(2)
+                try:
+                    conn.recv(64)
+                    conn.sendall(BANNER)
+                except OSError:
+                    pass
+
+    threading.Thread(target=serve, daemon=True).start()
+    return srv
+
+
+def test_enumerate_services_grabs_banners_in_input_order():
+    connections: list = []
+    with _banner_server(connections) as srv:
+        port = srv.getsockname()[1]
+        entries = [
+            {"host": "127.0.0.1", "port": port, "state": "open", "service": "ssh"},
+            {"host": "127.0.0.1", "port": 1, "state": "closed"},
+            {"host": "127.0.0.1", "port": port, "state": "open"},
+        ]
+        recs = enumerate_services(entries, concurrency=2, per_host=1, timeout=2.0)
+
+    assert [(r["port"], r["service"], r["banner"]) for r in recs] == [
+        (port, "ssh", BANNER.decode().strip()),
+        (port, "unknown", BANNER.decode().strip()),
+    ]
+    assert len(connections) == 2
+    assert all(r["elapsed_ms"] is not None for r in recs)
+    assert timing_stats(r["elapsed_ms"] for r in recs)["count"] == 2
+
+
+def test_layer2_banners_are_reused_without_reconnecting():
+    connections: list = []
+    with _banner_server(connections) as srv:
+        port = srv.getsockname()[1]
+        scanned = scan_ports([{"host": "127.0.0.1", "status": "up"}], [port], banner_timeout=2.0)
+        assert scanned[0]["banner"] == BANNER.decode().strip()
+        assert len(connections) == 1
+        recs = enumerate_services(scanned, timeout=2.0)
+
+    assert len(connections) == 1  # layer 3 took the banner from the layer 2 record
+    assert [(r["port"], r["banner"], r["elapsed_ms"]) for r in recs] == [
+        (port, scanned[0]["banner"], scanned[0]["elapsed_ms"])
+    ]
+
+
+def test_unreachable_ports_are_skipped():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        closed = s.getsockname()[1]
+    assert enumerate_services([{"host": "127.0.0.1", "port": closed, "state": "open"}]) == []
@@ -0,0 +1,73 @@
+import asyncio
+import io
+import json
+import logging
+
+import pytest
+
+from records import RecordWriter, aiter_blocking, iter_records, load_json
+
+RECORDS = [{"host": f"10.0.0.{i}", "status": "up"} for i in range(3)]
+
+
+def test_ndjson_reader_skips_bad_lines_and_a_truncated_tail(tmp_path, caplog):
+    path = tmp_path / "layer1.ndjson"
+    lines = [json.dumps(r) for r in RECORDS]
+    # A blank line, a corrupt line, and a writer killed mid-record at the end.
+    path.write_text(f"\n{lines[0]}\n\n{{not json\n{lines[1]}\r\n{lines[2]}\n" + '{"host": "10.0.')
+
+    with caplog.at_level(logging.ERROR):
+        assert list(iter_records(str(path))) == RECORDS
+    assert [r.getMessage().split(":")[0] for r in caplog.records] == [
+        f"Invalid JSON on line 4 of {path}",
+        f"Invalid JSON on line 7 of {path}",
+    ]
+
+
+def test_reader_handles_arrays_empty_and_missing_input(tmp_path, caplog):
+    array = tmp_path / "a.json"
+    array.write_text("\n  " + json.dumps(RECORDS, indent=2))
+    assert list(iter_records(str(array))) == RECORDS
+    empty = tmp_path / "empty.json"
+    empty.write_text("\n \n")
+    assert load_json(str(empty)) == []
+    truncated = tmp_path / "t.json"
+    truncated.write_text(json.dumps(RECORDS)[:-10])
+    with caplog.at_level(logging.ERROR):
+        assert load_json(str(truncated)) == []
+        assert load_json(str(tmp_path / "missing.json")) == []
+    assert len(caplog.records) == 2
+
+
+def test_reader_streams_stdin(monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("".join(json.dumps(r) + "\n" for r in RECORDS)))
+
+    async def collect():
+        return [r async for r in aiter_blocking(iter_records("-"))]
+
+    assert asyncio.run(collect()) == RECORDS
+
+
+@pytest.mark.parametrize("fmt, pretty", [("json", True), ("json", False), ("ndjson", True)])
+def test_writer_output_reads_back(tmp_path, fmt, pretty):
+    path = tmp_path / "out"
+    with RecordWriter(str(path), fmt, pretty=pretty) as out:
+        for r in RECORDS:
+            out.write(r)
+    assert out.count == 3
+    assert list(iter_records(str(path))) == RECORDS
+    if fmt == "json":
+        assert json.loads(path.read_text()) == RECORDS
+    else:
+        assert path.read_text().splitlines() == [json.dumps(r) for r in RECORDS]
+
+
+def test_writer_without_records_writes_an_empty_array(tmp_path, capsys):
+    path = tmp_path / "out.json"
+    RecordWriter(str(path)).close()
+    assert json.loads(path.read_text()) == []
+    with RecordWriter("-") as out:
+        out.write(RECORDS[0])
+    assert capsys.readouterr().out == json.dumps(RECORDS[0]) + "\n"
+    with pytest.raises(ValueError):
+        RecordWriter(str(path), "csv")
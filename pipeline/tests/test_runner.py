@@ -0,0 +1,107 @@
+import asyncio
+import json
+import socket
+
+import pytest
+
+from records import RecordWriter
+from runner import PipelineConfig, run_pipeline
+from signatures import Signature, SignatureMatcher
+
+MATCHER = SignatureMatcher(
+    [
+        Signature.from_dict(
+            {
+                "pattern": "OpenSSH_",
+                "version": ">=5.4,<7.2",
+                "vulnerability": "CVE-2016-0777",
+                "severity": "medium",
+            }
+        ),
+        Signature.from_dict({"pattern": "vsFTPd 2.3.4", "vulnerability": "CVE-2011-2523"}),
+    ]
+)
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_pipeline_reports_a_vulnerable_banner_end_to_end(tmp_path, fused):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        closed = s.getsockname()[1]
+    path = tmp_path / "findings.ndjson"
+    banner_reads = []
+
+    async def ssh(reader, writer):
+        writer.write(b"SSH-2.0-OpenSSH_7.1p2 Debian-2\r\n")
+        try:
+            # Discovery and scan connects just close; banner grabs send a probe first.
+            if await asyncio.wait_for(reader.read(64), 2):
+                banner_reads.append(1)
+        finally:
+            writer.close()
+
+    async def main():
+        srv = await asyncio.start_server(ssh, "127.0.0.1", 0)
+        port = srv.sockets[0].getsockname()[1]
+        config = PipelineConfig(
+            ports=[closed, port],
+            method="tcp",
+            tcp_ports=[port],
+            discovery_timeout=1.0,
+            scan_timeout=1.0,
+            banner_timeout=1.0,
+            fused_banners=fused,
+            queue_size=1,
+        )
+        async with srv:
+            with RecordWriter(str(path), "ndjson") as out:
+                # 127.0.0.2 refuses the port: up, but nothing open.
+                stats = await run_pipeline(["127.0.0.1", "127.0.0.2/32"], config, out, MATCHER)
+        return port, stats
+
+    port, stats = asyncio.run(main())
+
+    findings = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(f["host"], f["port"], f["vulnerability"], f["severity"]) for f in findings] == [
+        ("127.0.0.1", port, "CVE-2016-0777", "medium")
+    ]
+    counts = {s.name: (s.processed, s.emitted) for s in stats}
+    assert counts == {"discovery": (2, 2), "scan": (4, 1), "banners": (1, 1), "match": (1, 1)}
+    assert len(banner_reads) == 1  # one banner read, on the scan socket when fused
+    assert all(s.queue["max_depth"] <= 1 for s in stats[1:])
+
+
+def test_pipeline_fails_fast_when_a_stage_raises():
+    class BrokenWriter:
+        def write(self, record):
+            raise BrokenPipeError("reader went away")
+
+    async def ssh(reader, writer):
+        writer.write(b"SSH-2.0-OpenSSH_7.1p2 Debian-2\r\n")
+        try:
+            await asyncio.wait_for(reader.read(64), 2)
+        finally:
+            writer.close()
+
+    async def main():
+        servers = [await asyncio.start_server(ssh, "127.0.0.1", 0) for _ in range(20)]
+        ports = [srv.sockets[0].getsockname()[1] for srv in servers]
+        config = PipelineConfig(
+            ports=ports,
+            method="tcp",
+            tcp_ports=ports[:1],
+            discovery_timeout=1.0,
+            scan_timeout=1.0,
+            banner_timeout=1.0,
+            queue_size=1,
+        )
+        try:
+            # A stage failing must not leave the others blocked on full queues.
+            await asyncio.wait_for(run_pipeline(["127.0.0.1"], config, BrokenWriter(), MATCHER), 15)
+        finally:
+            for srv in servers:
+                srv.close()
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        asyncio.run(main())
+    assert excinfo.group_contains(BrokenPipeError)
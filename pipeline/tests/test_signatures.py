@@ -0,0 +1,95 @@
+import json
+import random
+
+import pytest
+
+from signatures import (
+    Signature,
+    SignatureMatcher,
+    load_signatures,
+    parse_version_spec,
+    version_key,
+)
+
+
+def _sig(pattern: str, **fields) -> Signature:
+    return Signature.from_dict({"pattern": pattern, **fields})
+
+
+def test_matcher_agrees_with_substring_search():
+    rnd = random.Random(7)
+    for _ in range(300):
+        # A tiny alphabet makes overlapping, nested and repeated patterns common.
+        n = rnd.randint(1, 12)
+        patterns = ["".join(rnd.choices("ab_", k=rnd.randint(1, 4))) for _ in range(n)]
+        sigs = [_sig(p) for p in patterns]
+        matcher = SignatureMatcher(sigs)
+        for _ in range(20):
+            text = "".join(rnd.choices("ab_c", k=rnd.randint(0, 30)))
+            assert matcher.match(text) == [s for s in sigs if s.pattern in text], (patterns, text)
+            hits = {
+                (i, end)
+                for i, p in enumerate(patterns)
+                for end in range(len(p), len(text) + 1)
+                if text[end - len(p) : end] == p
+            }
+            assert set(matcher.iter_hits(text)) == hits, (patterns, text)
+
+
+def test_version_key_compares_numerically():
+    assert version_key("7.2p2") == (7, 2, 2)
+    assert version_key("7.10") > version_key("7.2")
+    assert version_key("1.0.2k-fips") == (1, 0, 2)
+    assert version_key("beta") == ()
+
+
+@pytest.mark.parametrize(
+    "banner, matches",
+    [
+        ("SSH-2.0-OpenSSH_5.3p1", False),
+        ("SSH-2.0-OpenSSH_5.4", True),
+        ("SSH-2.0-OpenSSH_7.1p2 Debian-2", True),
+        ("SSH-2.0-OpenSSH_7.2", False),
+        ("SSH-2.0-OpenSSH_7.2p2 Ubuntu-4ubuntu2.8", False),
+        ("SSH-2.0-OpenSSH_7.10", False),
+        ("SSH-2.0-OpenSSH_", False),
+        ("SSH-2.0-OpenSSH_x7.1", False),
+    ],
+)
+def test_version_range_boundaries(banner, matches):
+    matcher = SignatureMatcher([_sig("OpenSSH_", version=">=5.4,<7.2")])
+    assert bool(matcher.match(banner)) is matches
+
+
+def test_version_operators_and_regex():
+    assert SignatureMatcher([_sig("nginx/", version="==1.25")]).match("nginx/1.25.0")
+    assert not SignatureMatcher([_sig("nginx/", version="!=1.25")]).match("nginx/1.25")
+    assert SignatureMatcher([_sig("nginx/", version="<=1.25,>1.2")]).match("nginx/1.25")
+    # Any occurrence of the pattern may carry the matching version.
+    assert SignatureMatcher([_sig("v", version=">=2")]).match("v1 v2")
+    sig = _sig("Server: ", regex=r"Apache/(\d+\.\d+\.\d+)", version=">=2.4.49,<=2.4.50")
+    matcher = SignatureMatcher([sig])
+    assert matcher.match("Server: Apache/2.4.49 (Unix)") == [sig]
+    assert matcher.match("Server: Apache/2.4.51") == []
+    assert matcher.match("Server: nginx") == []
+    with pytest.raises(ValueError):
+        parse_version_spec(">=5.4,<beta")
+    with pytest.raises(ValueError):
+        _sig("")
+
+
+def test_load_signatures_reads_json_and_ndjson(tmp_path):
+    entries = [
+        {"pattern": "OpenSSH_", "version": ">=5.4,<7.2", "vulnerability": "CVE-2016-0777"},
+        {"pattern": "", "vulnerability": "no pattern"},
+        {"pattern": "vsFTPd 2.3.4", "vulnerability": "CVE-2011-2523"},
+        {"pattern": "x", "version": "<=latest"},
+    ]
+    as_json = tmp_path / "sigs.json"
+    as_json.write_text(json.dumps(entries))
+    as_ndjson = tmp_path / "sigs.ndjson"
+    as_ndjson.write_text("\n".join(json.dumps(e) for e in entries) + "\n\n")
+    for path in (as_json, as_ndjson):
+        sigs = load_signatures(path)
+        assert [s.fields["vulnerability"] for s in sigs] == ["CVE-2016-0777", "CVE-2011-2523"]
+        assert sigs[0].fields == entries[0]
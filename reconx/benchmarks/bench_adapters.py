@@ -0,0 +1,83 @@
+"""HTTP HEAD probes against a local stand-in server: one ``bash -lc curl`` per probe (the old
+http_enum) vs in-process asyncio probes sharing one loop and keep-alive pool.
+
+    python benchmarks/bench_adapters.py --probes 2000 --shell-probes 100
+"""
+from __future__ import annotations
+import argparse, asyncio, shutil, subprocess, tempfile, threading, time
+from pathlib import Path
+from reconx.adapters import run_action_async
+from reconx.adapters.aio import HttpPool
+from reconx.model import Action
+
+
+async def _serve(reader, writer):
+    try:
+        while await reader.readuntil(b"\r\n\r\n"):
+            writer.write(b"HTTP/1.1 200 OK\r\nServer: bench\r\nContent-Length: 0\r\n\r\n")
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        writer.close()
+
+
+def start_server() -> int:
+    ready, box = threading.Event(), {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        srv = loop.run_until_complete(asyncio.start_server(_serve, "127.0.0.1", 0, backlog=1024))
+        box["port"] = srv.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return box["port"]
+
+
+async def probe_all(acts, out_dir: Path, concurrency: int):
+    pool = HttpPool(per_host=concurrency)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(a):
+        async with sem:
+            return await run_action_async(a, out_dir, 10, pool=pool)
+
+    try:
+        return await asyncio.gather(*(one(a) for a in acts))
+    finally:
+        await pool.close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--probes", type=int, default=2000)
+    ap.add_argument("--shell-probes", type=int, default=100, help="subprocess path is slow; extrapolated as probes/sec")
+    ap.add_argument("--concurrency", type=int, default=64)
+    args = ap.parse_args()
+    port = start_server()
+    url = f"http://127.0.0.1:{port}/"
+
+    if shutil.which("curl"):
+        t0 = time.perf_counter()
+        for _ in range(args.shell_probes):
+            subprocess.run(["bash", "-lc", f"curl -skI --max-time 10 {url}"], capture_output=True)
+        shell = args.shell_probes / (time.perf_counter() - t0)
+        print(f"bash -lc curl  {args.shell_probes:>7} probes  {shell:>9.1f} probes/s")
+    else:
+        shell = None
+        print("curl not found; skipping the subprocess baseline")
+
+    with tempfile.TemporaryDirectory() as d:
+        acts = [Action(tool="http_enum", args={"url_template": url, "port": port, "i": i}, target="127.0.0.1")
+                for i in range(args.probes)]
+        t0 = time.perf_counter()
+        results = asyncio.run(probe_all(acts, Path(d), args.concurrency))
+        rate = len(acts) / (time.perf_counter() - t0)
+        ok = sum(1 for r in results if r.summary.evidence)
+        extra = f"  ({rate / shell:.0f}x)" if shell else ""
+        print(f"asyncio        {len(acts):>7} probes  {rate:>9.0f} probes/s  ok={ok}{extra}")
+
+
+if __name__ == "__main__":
+    main()
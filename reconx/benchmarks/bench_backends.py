@@ -0,0 +1,54 @@
+"""State backends on the read path: ``get_all`` over N tasks (with and without touching every
+row's ``args``) and repeated small ``get_pending`` batches, on the direct sqlite3 backend vs
+SQLAlchemy. Both read the same DB file.
+
+    python benchmarks/bench_backends.py --tasks 100000
+"""
+from __future__ import annotations
+import argparse, gc, tempfile, time
+from pathlib import Path
+from reconx.model import Action
+from reconx.state import init_db, upsert_tasks, get_all, get_pending
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tasks", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--pending-calls", type=int, default=2000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        db = Path(d) / "state.sqlite"
+        upsert_tasks(init_db(db), [Action(tool="http_enum", args={"port": i % 65536, "path": f"/p{i}"},
+                                          target=f"10.0.{i >> 8 & 255}.{i & 255}") for i in range(args.tasks)])
+        results = {}
+        for name in ("sqlalchemy", "sqlite3"):
+            eng = init_db(db, backend=name)
+            get_all(eng)  # warm the page cache and statement caches
+            rows = best_of(lambda: get_all(eng), args.repeat)
+            decoded = best_of(lambda: [r["args"] for r in get_all(eng)], args.repeat)
+            t0 = time.perf_counter()
+            for _ in range(args.pending_calls):
+                get_pending(eng, limit=32)
+            pending = (time.perf_counter() - t0) / args.pending_calls
+            results[name] = (rows, decoded, pending)
+            print(f"{name:<10} get_all {args.tasks} rows {rows * 1000:>8.1f} ms  "
+                  f"+args {decoded * 1000:>8.1f} ms  get_pending(32) {pending * 1e6:>7.1f} us/call")
+            eng.dispose()
+        a, b = results["sqlalchemy"], results["sqlite3"]
+        print(f"speedup    get_all {a[0] / b[0]:.1f}x  +args {a[1] / b[1]:.1f}x  get_pending {a[2] / b[2]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Memory held by N evidence rows: pydantic ``SummaryModel``s, ``model_dump()`` dicts (what rule
+items and report rows used to be) and ``EvidenceColumns``. Each is built from the same summary
+JSON and measured with ``tracemalloc`` (bytes still allocated once it is built, and the peak
+while building). Rule evaluation time over dict rows and columns is printed alongside.
+
+    python benchmarks/bench_memory.py --rows 1000000
+"""
+from __future__ import annotations
+import argparse, gc, json, random, time, tracemalloc
+from pathlib import Path
+from typing import Iterator, List
+from reconx.model import EvidenceColumns, SummaryModel
+from reconx.rules import load_rules
+from reconx.rules.evaluator import compile_rules
+from reconx.rules.index import ItemIndex
+
+SERVICES = [("http", 80, "nginx", "1.25.3"), ("https", 443, "nginx", "1.25.3"), ("ssh", 22, "OpenSSH", "9.6"),
+            ("dns", 53, "bind", "9.18"), ("smb", 445, "samba", "4.19"), ("http", 8080, "jetty", "11.0"),
+            ("rdp", 3389, "ms-wbt-server", None), ("smtp", 25, "postfix", "3.8")]
+
+
+def summary_blobs(rows: int, per_target: int, seed: int = 1) -> List[bytes]:
+    rnd = random.Random(seed)
+    blobs = []
+    for t in range(0, rows, per_target):
+        target = f"10.{t >> 16 & 255}.{t >> 8 & 255}.{t & 255}"
+        evidence = []
+        for j in range(min(per_target, rows - t)):
+            kind = rnd.random()
+            if kind < 0.7:
+                svc, port, product, version = rnd.choice(SERVICES)
+                evidence.append({"type": "service", "port": port, "proto": "tcp", "service": svc,
+                                 "product": product, "version": version})
+            elif kind < 0.9:
+                evidence.append({"type": "path", "url": f"https://{target}/p{j}"})
+            else:
+                evidence.append({"type": "vhost", "name": f"h{j}.example.com"})
+        blobs.append(json.dumps({"layer": 2, "target": target, "evidence": evidence}).encode())
+    return blobs
+
+
+def models(blobs: List[bytes]) -> Iterator[SummaryModel]:
+    for b in blobs:
+        yield SummaryModel.model_validate_json(b)
+
+
+def build_models(blobs):
+    return list(models(blobs))
+
+
+def build_dicts(blobs):
+    return [dict(e.model_dump(), target=s.target) for s in models(blobs) for e in s.evidence]
+
+
+def build_columns(blobs):
+    return EvidenceColumns.from_summaries(models(blobs))
+
+
+def measure(build, blobs):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    obj = build(blobs)
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, held, peak, elapsed
+
+
+def match_time(rules, items) -> float:
+    index = ItemIndex(items)
+    t0 = time.perf_counter()
+    n = 0
+    for _, source, pred in rules:
+        if source != "evidence":
+            continue
+        for pos in index.candidate_positions(pred.constraints):
+            n += pred(items[pos])
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--per-target", type=int, default=100)
+    args = ap.parse_args()
+    blobs = summary_blobs(args.rows, args.per_target)
+    rules = compile_rules(load_rules(Path(__file__).resolve().parents[1] / "examples" / "rules.yaml"))
+    print(f"{args.rows} evidence rows over {len(blobs)} targets ({sum(map(len, blobs)) / 2**20:.0f} MiB JSON)")
+    print(f"{'representation':<16} {'held MiB':>9} {'B/row':>7} {'peak MiB':>9} {'build s':>8} {'rules s':>8}")
+    for name, build in (("SummaryModel", build_models), ("dict rows", build_dicts),
+                        ("EvidenceColumns", build_columns)):
+        obj, held, peak, elapsed = measure(build, blobs)
+        rules_s = "" if name == "SummaryModel" else f"{match_time(rules, obj):>8.2f}"
+        print(f"{name:<16} {held / 2**20:>9.1f} {held / args.rows:>7.0f} {peak / 2**20:>9.1f} "
+              f"{elapsed:>8.2f} {rules_s}")
+        del obj
+
+
+if __name__ == "__main__":
+    main()
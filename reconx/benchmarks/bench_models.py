@@ -0,0 +1,98 @@
+"""Summary load -> rules -> report round trip over a large synthetic fixture set.
+
+``old``: ``jload`` + ``model_validate`` per file, then ``model_dump()`` of every evidence/finding
+for the rule items and again for the report rows. ``new``: bytes through one bulk
+``validate_json``, read-only field views for the rules and ``__dict__`` copies for the report.
+
+    python benchmarks/bench_models.py --files 200 --evidence 500
+"""
+from __future__ import annotations
+import argparse, gc, json, tempfile, time
+from pathlib import Path
+from typing import List
+from reconx.model import SummaryModel, field_view, validate_summaries_json
+from reconx.utils import jload
+
+SERVICES = ["http", "https", "ssh", "dns", "smb", "ftp", "rdp", "smtp"]
+
+
+def write_fixtures(d: Path, files: int, evidence: int) -> List[Path]:
+    paths = []
+    for i in range(files):
+        body = {
+            "layer": i % 4 + 1,
+            "target": f"10.0.{i >> 8 & 255}.{i & 255}",
+            "evidence": [{"type": "service", "port": 1 + j, "proto": "tcp", "service": SERVICES[j % 8],
+                          "product": "nginx", "version": "1.25"} for j in range(evidence)],
+            "findings": [{"id": f"F{j}", "title": "Open port", "severity": "low"}
+                         for j in range(evidence // 10)],
+            "artifacts": [{"kind": "log", "path": f"logs/{i}.txt"}],
+        }
+        p = d / f"summary_{i}.json"
+        p.write_text(json.dumps(body))
+        paths.append(p)
+    return paths
+
+
+def old_path(paths: List[Path]) -> int:
+    summaries = [SummaryModel.model_validate(jload(p)) for p in paths]
+    items = [e.model_dump() for s in summaries for e in s.evidence]
+    items += [f.model_dump() for s in summaries for f in s.findings]
+    rows = 0
+    for s in summaries:
+        for e in s.evidence:
+            d = e.model_dump()
+            d["target"] = s.target
+            rows += 1
+        for f in s.findings:
+            d = f.model_dump()
+            d["target"] = s.target
+            rows += 1
+    return len(items) + rows
+
+
+def new_path(paths: List[Path]) -> int:
+    summaries = validate_summaries_json(p.read_bytes() for p in paths)
+    items = [field_view(e) for s in summaries for e in s.evidence]
+    items += [field_view(f) for s in summaries for f in s.findings]
+    rows = 0
+    for s in summaries:
+        for e in s.evidence:
+            d = {**e.__dict__, "target": s.target}
+            rows += 1
+        for f in s.findings:
+            d = {**f.__dict__, "target": s.target}
+            rows += 1
+    return len(items) + rows
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=200)
+    ap.add_argument("--evidence", type=int, default=500)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as d:
+        paths = write_fixtures(Path(d), args.files, args.evidence)
+        assert old_path(paths) == new_path(paths)
+        old = best_of(lambda: old_path(paths), args.repeat)
+        new = best_of(lambda: new_path(paths), args.repeat)
+        n = args.files * (args.evidence + args.evidence // 10)
+        print(f"{args.files} summaries, {n} evidence+findings")
+        print(f"old  jload+model_validate+model_dump x2  {old * 1000:>8.1f} ms")
+        print(f"new  validate_json (bulk) + views        {new * 1000:>8.1f} ms")
+        print(f"speedup {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Nmap XML parsing on a generated ``-p-`` style scan: wall time and peak RSS per parser.
+
+``ET.parse (old)`` is the previous whole-tree ``parse_nmap_xml``; the others stream hosts with
+``iterparse`` (lxml, and the standard library fallback). Every case runs in a fresh process, so
+peak RSS is the parser's own high-water mark.
+
+    python benchmarks/bench_nmap.py --mb 500
+"""
+from __future__ import annotations
+import argparse, json, os, random, resource, subprocess, sys, tempfile, time
+from pathlib import Path
+from typing import Any, Dict, List
+
+SERVICES = [("ssh", "OpenSSH", "9.6p1"), ("http", "nginx", "1.25.3"), ("https", "nginx", "1.25.3"),
+            ("smtp", "Postfix smtpd", None), ("msrpc", "Microsoft Windows RPC", None), ("mysql", "MySQL", "8.0.36")]
+CASES = ("ET.parse (old)", "hosts stdlib", "hosts lxml", "summaries lxml")
+
+
+def write_scan(path: Path, mb: int, ports_per_host: int = 200, seed: int = 1) -> int:
+    """Write an Nmap-like XML file of about ``mb`` MiB; returns the number of hosts."""
+    rnd = random.Random(seed)
+    target = mb * 2**20
+    hosts = 0
+    with path.open("w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE nmaprun>\n'
+                '<nmaprun scanner="nmap" args="nmap -p- -sV -oX scan.xml 10.0.0.0/16" start="1700000000">\n'
+                '<scaninfo type="syn" protocol="tcp" numservices="65535" services="1-65535"/>\n')
+        while f.tell() < target:
+            ip = f"10.{hosts >> 16 & 255}.{hosts >> 8 & 255}.{hosts & 255}"
+            f.write(f'<host starttime="1700000000" endtime="1700000300"><status state="up" reason="echo-reply" '
+                    f'reason_ttl="63"/>\n<address addr="{ip}" addrtype="ipv4"/>\n<hostnames>'
+                    f'<hostname name="h{hosts}.corp.example" type="PTR"/></hostnames>\n<ports>')
+            for port in sorted(rnd.sample(range(1, 65536), ports_per_host)):
+                if rnd.random() < 0.1:
+                    name, product, version = rnd.choice(SERVICES)
+                    extra = f' product="{product}"' + (f' version="{version}"' if version else "")
+                    f.write(f'<port protocol="tcp" portid="{port}"><state state="open" reason="syn-ack" '
+                            f'reason_ttl="63"/><service name="{name}"{extra} method="probed" conf="10">'
+                            f'<cpe>cpe:/a:{name}:{name}</cpe></service></port>\n')
+                else:
+                    f.write(f'<port protocol="tcp" portid="{port}"><state state="filtered" reason="no-response" '
+                            f'reason_ttl="0"/><service name="unknown" method="table" conf="3"/></port>\n')
+            f.write('</ports>\n<times srtt="1200" rttvar="300" to="100000"/>\n</host>\n')
+            hosts += 1
+        f.write(f'<runstats><finished time="1700003600"/><hosts up="{hosts}" down="0" total="{hosts}"/>'
+                '</runstats>\n</nmaprun>\n')
+    return hosts
+
+
+def legacy_parse(xml_path: Path) -> Dict[str, Any]:
+    from xml.etree import ElementTree as ET
+    root = ET.parse(xml_path).getroot()
+    hosts: List[Dict[str, Any]] = []
+    for host in root.findall("host"):
+        addr_elem = host.find("address[@addrtype='ipv4']")
+        if addr_elem is None:
+            continue
+        host_dict: Dict[str, Any] = {"address": addr_elem.get("addr"), "ports": []}
+        ports_elem = host.find("ports")
+        if ports_elem is not None:
+            for port in ports_elem.findall("port"):
+                port_dict: Dict[str, Any] = {"port": int(port.get("portid", 0)), "proto": port.get("protocol")}
+                state_elem = port.find("state")
+                if state_elem is not None:
+                    port_dict["state"] = state_elem.get("state")
+                service_elem = port.find("service")
+                if service_elem is not None:
+                    for k in ("name", "product", "version"):
+                        if service_elem.get(k):
+                            port_dict["service" if k == "name" else k] = service_elem.get(k)
+                host_dict["ports"].append(port_dict)
+        hosts.append(host_dict)
+    return {"hosts": hosts}
+
+
+def child(case: str, path: Path) -> None:
+    if case == "hosts stdlib":
+        sys.modules["lxml"] = None  # makes ``from lxml import etree`` raise ImportError
+    from reconx.parsers import iter_nmap_hosts, iter_nmap_summaries
+    t0 = time.perf_counter()
+    if case == "ET.parse (old)":
+        hosts = legacy_parse(path)["hosts"]
+        n, ports = len(hosts), sum(len(h["ports"]) for h in hosts)
+    elif case == "summaries lxml":
+        n = ports = 0
+        for s in iter_nmap_summaries(path):
+            n += 1
+            ports += len(s.evidence)
+    else:
+        n = ports = 0
+        for h in iter_nmap_hosts(path):
+            n += 1
+            ports += len(h["ports"])
+    elapsed = time.perf_counter() - t0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+    print(json.dumps({"seconds": elapsed, "rss": rss, "hosts": n, "items": ports}))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=int, default=500)
+    ap.add_argument("--xml", help="Use an existing Nmap XML file instead of generating one")
+    ap.add_argument("--child", nargs=2, metavar=("CASE", "PATH"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        return child(args.child[0], Path(args.child[1]))
+
+    with tempfile.TemporaryDirectory() as d:
+        path = Path(args.xml) if args.xml else Path(d) / "scan.xml"
+        if not args.xml:
+            t0 = time.perf_counter()
+            hosts = write_scan(path, args.mb)
+            print(f"generated {path.stat().st_size / 2**20:.0f} MiB, {hosts} hosts "
+                  f"in {time.perf_counter() - t0:.1f}s")
+        print(f"{'case':<16} {'seconds':>8} {'peak RSS MiB':>13} {'hosts':>7} {'ports/evidence':>15}")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(Path(__file__).resolve().parents[1]),
+                                                                       os.environ.get("PYTHONPATH")])))
+        for case in CASES:
+            p = subprocess.run([sys.executable, __file__, "--child", case, str(path)],
+                               capture_output=True, text=True, env=env)
+            if p.returncode:
+                print(f"{case:<16} failed (exit {p.returncode}; likely out of memory)")
+                continue
+            r = json.loads(p.stdout)
+            print(f"{case:<16} {r['seconds']:>8.1f} {r['rss'] / 2**20:>13.0f} {r['hosts']:>7} {r['items']:>15}")
+
+
+if __name__ == "__main__":
+    main()
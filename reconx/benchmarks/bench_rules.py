@@ -0,0 +1,68 @@
+"""Rule matching over a large synthetic evidence set.
+
+1. per-item parse/compile (the previous evaluator) vs predicates compiled once and cached;
+2. many rules: compiled predicates over a full scan vs over ItemIndex candidates.
+
+    python benchmarks/bench_rules.py --items 50000 --rules 300
+"""
+from __future__ import annotations
+import argparse, ast, time
+from reconx.rules.evaluator import ALLOWED_NODES, compile_predicate, _match_list
+from reconx.rules.index import ItemIndex
+
+EXPRS = [
+    "type=='service' and service in ['http','https'] and port in [80,443,8080,8443]",
+    "type=='service' and service=='ssh'",
+    "type=='service' and service in ['smb'] and port in [139,445]",
+]
+SERVICES = ["http", "https", "ssh", "dns", "smb", "ftp", "rdp", "smtp"]
+
+
+def legacy_eval(expr: str, context: dict) -> bool:
+    tree = ast.parse(expr, mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, tuple(ALLOWED_NODES)):
+            raise ValueError(type(node).__name__)
+        if isinstance(node, ast.Name) and node.id not in context:
+            return False
+    return bool(eval(compile(tree, "<match>", "eval"), {"__builtins__": {}}, context))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=50_000)
+    ap.add_argument("--rules", type=int, default=300)
+    args = ap.parse_args()
+    items = [{"type": "service", "port": (i * 37) % 10000, "proto": "tcp", "service": SERVICES[i % len(SERVICES)],
+              "product": None, "version": None, "name": None, "url": None} for i in range(args.items)]
+
+    t0 = time.perf_counter()
+    legacy = [sum(legacy_eval(e, {k: v for k, v in it.items()}) for it in items) for e in EXPRS]
+    t_legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    preds = [compile_predicate(e) for e in EXPRS]
+    compiled = [sum(p(it) for it in items) for p in preds]
+    t_compiled = time.perf_counter() - t0
+
+    assert legacy == compiled
+    n = args.items * len(EXPRS)
+    print(f"per-item parse  {t_legacy:8.3f}s  {n / t_legacy:>12.0f} evals/s")
+    print(f"compiled/cached {t_compiled:8.3f}s  {n / t_compiled:>12.0f} evals/s  ({t_legacy / t_compiled:.1f}x)")
+
+    many = [compile_predicate(f"type=='service' and service=='{SERVICES[i % len(SERVICES)]}' and port in [{i}, {i + 5000}]")
+            for i in range(args.rules)]
+    t0 = time.perf_counter()
+    scanned = [len(_match_list(p, items)) for p in many]
+    t_scan = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    idx = ItemIndex(items)
+    indexed = [len(_match_list(p, idx.candidates(p.constraints))) for p in many]
+    t_index = time.perf_counter() - t0
+    assert scanned == indexed
+    print(f"{args.rules} rules, full scan {t_scan:8.3f}s")
+    print(f"{args.rules} rules, indexed   {t_index:8.3f}s  ({t_scan / t_index:.0f}x, {sum(indexed)} matches)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Wall-clock of run_scheduler against a sleeping fake adapter at several --max-parallel values.
+
+    python benchmarks/bench_scheduler.py --tasks 40 --sleep 0.25 --parallel 1,2,4,8,16
+"""
+from __future__ import annotations
+import argparse, tempfile, time
+from pathlib import Path
+from reconx.adapters import base
+from reconx.model import Action, Result, SummaryModel
+from reconx.scheduler import run_scheduler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tasks", type=int, default=40)
+    ap.add_argument("--sleep", type=float, default=0.25)
+    ap.add_argument("--parallel", default="1,2,4,8,16")
+    args = ap.parse_args()
+
+    def fake_probe(action, out_dir, timeout):
+        time.sleep(args.sleep)
+        return Result(summary=SummaryModel(layer=97, target=action.target))
+
+    base.HANDLERS["fake_probe"] = fake_probe
+    print(f"{'parallel':>8} {'wall_s':>8} {'tasks/s':>8} {'speedup':>8}")
+    baseline = None
+    for p in [int(x) for x in args.parallel.split(",") if x.strip()]:
+        with tempfile.TemporaryDirectory() as d:
+            out = Path(d)
+            (out / "combined").mkdir()
+            actions = [Action(tool="fake_probe", args={"i": i}, target=f"10.0.0.{i % 250}") for i in range(args.tasks)]
+            t0 = time.perf_counter()
+            run_scheduler(out, actions, time_budget_minutes=60, max_parallel=p,
+                          timeout_per_task=60, rate_per_sec=0.0)
+            wall = time.perf_counter() - t0
+        baseline = baseline or wall
+        print(f"{p:>8} {wall:>8.2f} {args.tasks / wall:>8.1f} {baseline / wall:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
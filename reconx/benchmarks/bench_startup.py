@@ -0,0 +1,66 @@
+"""CLI startup cost per subcommand, from ``python -X importtime``: total import time, wall time and
+which heavy dependencies got loaded. ``eager`` imports everything the CLI used to load up front.
+
+    python benchmarks/bench_startup.py --repeat 5
+"""
+from __future__ import annotations
+import argparse, re, statistics, subprocess, sys, tempfile, time
+from typing import Dict, List, Tuple
+
+HEAVY = ("pydantic", "ruamel", "sqlalchemy", "jinja2", "reconx.state", "reconx.adapters")
+# The pre-series CLI imported SQLAlchemy (state) and Jinja2 (report) at module level; name them so the
+# baseline loads them even now that those modules import them lazily.
+EAGER = ("sqlalchemy", "jinja2", "reconx.parsers", "reconx.rules", "reconx.scheduler.scheduler",
+         "reconx.report", "reconx.model", "reconx.state", "reconx.store", "reconx.cache")
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str) -> Tuple[Dict[str, int], int]:
+    """``({module: cumulative_us}, total_us)``; the total sums the top-level imports."""
+    mods, total = {}, 0
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        cum, depth, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        mods[name] = cum
+        if depth == 1:
+            total += cum
+    return mods, total
+
+
+def run(code: str) -> Tuple[Dict[str, int], int, float]:
+    t0 = time.perf_counter()
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    if p.returncode:
+        raise SystemExit(p.stderr[-2000:])
+    mods, total = parse_importtime(p.stderr)
+    return mods, total, wall
+
+
+def cli(*argv: str) -> str:
+    return f"import sys; sys.argv = ['reconx', *{list(argv)!r}]\nfrom reconx.__main__ import main\ntry: main()\nexcept SystemExit: pass"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as d:
+        cases: List[Tuple[str, str]] = [
+            ("eager (old CLI)", "import " + ", ".join(EAGER)),
+            ("--help", cli("--help")),
+            ("plan", cli("plan", "--target", "1.2.3.4", "--out", d)),
+        ]
+        print(f"{'case':<18} {'imports ms':>10} {'wall ms':>8}  heavy modules loaded")
+        for name, code in cases:
+            runs = [run(code) for _ in range(args.repeat)]
+            imp = statistics.median(r[1] for r in runs) / 1000
+            wall = statistics.median(r[2] for r in runs) * 1000
+            heavy = [h for h in HEAVY if any(m == h or m.startswith(h + ".") for m in runs[0][0])]
+            print(f"{name:<18} {imp:>10.1f} {wall:>8.1f}  {', '.join(heavy) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
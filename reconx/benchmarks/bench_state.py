@@ -0,0 +1,57 @@
+"""Seeding throughput of the state DB: per-row upsert_task on the legacy rollback-journal
+setup vs batched upsert_tasks on the WAL-tuned engine.
+
+    python benchmarks/bench_state.py --tasks 100000 --legacy-tasks 10000
+"""
+from __future__ import annotations
+import argparse, tempfile, time
+from pathlib import Path
+from sqlalchemy import create_engine
+from reconx.model import Action
+from reconx.state import SCHEMA, init_db, upsert_task, upsert_tasks, set_statuses
+
+
+def legacy_engine(db_path: Path):
+    # The pre-WAL setup: default journal and synchronous=FULL, fsync per commit.
+    eng = create_engine(f"sqlite:///{db_path}", future=True)
+    with eng.begin() as con:
+        for stmt in SCHEMA.split(";"):
+            if stmt.strip():
+                con.exec_driver_sql(stmt)
+    return eng
+
+
+def actions(n: int):
+    return [Action(tool="http_enum", args={"port": i % 65536, "i": i}, target=f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}")
+            for i in range(n)]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tasks", type=int, default=100_000)
+    ap.add_argument("--legacy-tasks", type=int, default=10_000, help="per-row path is slow; extrapolated as tasks/sec")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        acts = actions(args.legacy_tasks)
+        eng = legacy_engine(Path(d) / "legacy.sqlite")
+        t0 = time.perf_counter()
+        for a in acts:
+            upsert_task(eng, a.tool, a.args, a.target, priority=a.priority)
+        legacy = len(acts) / (time.perf_counter() - t0)
+        print(f"per-row upsert_task  {len(acts):>8} tasks  {legacy:>10.0f} tasks/s")
+
+        acts = actions(args.tasks)
+        eng = init_db(Path(d) / "batched.sqlite")
+        t0 = time.perf_counter()
+        ids = upsert_tasks(eng, acts)
+        batched = len(acts) / (time.perf_counter() - t0)
+        print(f"batched upsert_tasks {len(acts):>8} tasks  {batched:>10.0f} tasks/s  ({batched / legacy:.0f}x)")
+
+        t0 = time.perf_counter()
+        set_statuses(eng, [(i, "done", None) for i in ids])
+        print(f"batched set_statuses {len(ids):>8} tasks  {len(ids) / (time.perf_counter() - t0):>10.0f} tasks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,17 @@
 from __future__ import annotations
 import argparse, json
+from itertools import chain
 from pathlib import Path
 from .utils import ensure_dirs, append_timeline
-from .parsers import load_summaries_from_layers
-from .rules import load_rules
-from .scheduler import plan_actions, run_scheduler
-from .report import build_combined_model, render_reports
-from .model import Action, SummaryModel
+from .scheduler import DEFAULT_LEASE_SECONDS
+
+# pydantic, ruamel.yaml, SQLAlchemy and Jinja2 dominate startup, so each subcommand imports what it
+# needs when it runs: `plan` never loads the state DB, adapters or report templates.
 
 def cmd_plan(args):
+    from .parsers import load_summaries_from_layers
+    from .rules import load_rules
+    from .scheduler import plan_actions
     out = Path(args.out)
     ensure_dirs(out)
     layers = [int(x) for x in (args.layers.split(",") if args.layers else []) if x.strip()]
@@ -21,51 +24,98 @@ def cmd_plan(args):
     print(f"Planned actions: {len(planned)}")
 
 def _seed_layer_actions(layers, target: str):
+    from .model import Action
     return [Action(tool=f"layer{L}", args={}, target=target, priority=1) for L in layers]
 
+def _parse_tool_limits(specs) -> dict:
+    limits = {}
+    for spec in specs or []:
+        tool, _, n = spec.partition("=")
+        if not tool or not n.strip().isdigit():
+            raise SystemExit(f"--tool-limit expects TOOL=N, got {spec!r}")
+        limits[tool.strip()] = int(n)
+    return limits
+
+def _result_cache(args):
+    # Namespaces built without the cache options (e.g. by callers of cmd_run) get no cache.
+    if not hasattr(args, "no_cache") or args.no_cache:
+        return None
+    from .cache import ResultCache, default_cache_path
+    path = Path(args.cache_db) if getattr(args, "cache_db", None) else default_cache_path(Path(args.out))
+    return ResultCache(path, max_age=getattr(args, "max_age", None))
+
+def _scheduler_kwargs(args) -> dict:
+    return dict(cache=_result_cache(args),
+                time_budget_minutes=int(args.time_budget or 60),
+                max_parallel=int(args.max_parallel or 1),
+                timeout_per_task=int(args.timeout or 600),
+                rate_per_sec=float(args.rate or 0.0),
+                tool_limits=_parse_tool_limits(getattr(args, "tool_limit", None)),
+                per_target_rate=float(getattr(args, "per_target_rate", None) or 0.0),
+                lease_seconds=float(getattr(args, "lease", None) or DEFAULT_LEASE_SECONDS))
+
 def cmd_run(args):
+    from .parsers import iter_summaries, load_summary, summary_files, watermark_key
+    from .report import stream_reports
+    from .rules import load_rules
+    from .scheduler import plan_actions, run_scheduler
+    from .state import init_db, mark_processed, summary_key, unprocessed
+    from .store import iter_stored_summaries, migrate_summary_files
     out = Path(args.out)
     ensure_dirs(out)
     append_timeline(out / "_timeline.txt", "Run start")
     layers = [int(x) for x in (args.layers.split(",") if args.layers else []) if x.strip()]
-    summaries = load_summaries_from_layers(out, layers)
+    # Only summaries not planned by an earlier run (or already by the scheduler) are evaluated.
+    db = init_db(out / "_state.sqlite")
+    migrated = migrate_summary_files(db, out)
+    if migrated:
+        append_timeline(out / "_timeline.txt", f"Moved {migrated} summary files into the summary store")
+    sources = {watermark_key(out, p): p for p in summary_files(out, layers)}
+    fresh = []
+
+    def fresh_summaries():
+        # Consumed once by the rule evaluator, which keeps only compact evidence columns. Only
+        # summaries actually planned are marked processed; unreadable files are retried next run.
+        for k in unprocessed(db, sources):
+            s = load_summary(sources[k])
+            if s is not None:
+                fresh.append(k)
+                yield s
+        for sid, s in iter_stored_summaries(db, unprocessed_only=True):
+            fresh.append(summary_key(sid))
+            yield s
+
     seed = _seed_layer_actions(layers, args.target)
     rules_path = Path(args.rules) if args.rules else Path(__file__).resolve().parents[1] / "examples" / "rules.yaml"
     rules = load_rules(rules_path)
-    planned = seed + plan_actions(out, summaries, rules)
-    # Dedup
-    ded = {}
-    for a in planned:
-        key = (a.tool, json.dumps(a.args, sort_keys=True), a.target)
-        ded[key] = a
-    planned = list(ded.values())
+    # plan_actions already yields each (tool, target, args) once.
+    planned = seed + plan_actions(out, fresh_summaries(), rules)
     with (out / 'next_steps.md').open('w', encoding='utf-8') as f:
         f.write('# Next Steps\n\n')
         for a in planned:
             f.write(f"- [{a.priority}] {a.tool} on {a.target} with {a.args}\n")
 
-    run_scheduler(out, planned, time_budget_minutes=int(args.time_budget or 60),
-
-                  max_parallel=int(args.max_parallel or 1),
-                  timeout_per_task=int(args.timeout or 600),
-                  rate_per_sec=float(args.rate or 0.0))
-    # Build report
-    summaries = load_summaries_from_layers(out, layers)
-    comb_dir = out / "combined"
-    if comb_dir.exists():
-        for p in sorted(comb_dir.glob("summary_*.json")):
-            try:
-                from .utils import jload
-                summaries.append(SummaryModel.model_validate(jload(p)))
-            except Exception:
-                continue
-    model = build_combined_model(out, summaries)
-    render_reports(out, model)
+    run_scheduler(out, planned, rules=rules, **_scheduler_kwargs(args))
+    # Marked after the scheduler has queued their actions; a crash before this just re-plans them.
+    mark_processed(db, fresh)
+    # Build report, streaming summaries from disk rather than holding them all in memory
+    stored = (s for _, s in iter_stored_summaries(db))
+    stream_reports(out, chain(iter_summaries(out, layers), stored),
+                   ndjson=bool(getattr(args, "ndjson_report", False)))
     append_timeline(out / "_timeline.txt", "Run end")
 
 def cmd_resume(args):
+    # run_scheduler reclaims tasks whose worker lease expired (e.g. after a crash) before draining.
     return cmd_run(args)
 
+def cmd_worker(args):
+    # Extra worker process on an existing run's queue: no planning, seeding or reporting.
+    from .scheduler import run_scheduler
+    out = Path(args.out)
+    ensure_dirs(out)
+    stats = run_scheduler(out, [], **_scheduler_kwargs(args))
+    print(json.dumps(stats))
+
 def main():
     parser = argparse.ArgumentParser(prog="reconx", description="Rule-driven recon orchestrator")
     sub = parser.add_subparsers(dest="cmd", required=True)
@@ -75,16 +125,34 @@ def main():
     common.add_argument("--layers", default="1,2,3,4")
     common.add_argument("--plan", default="auto", choices=["auto","manual"])
     common.add_argument("--rules")
-    common.add_argument("--max-parallel", type=int, default=1)
-    common.add_argument("--timeout", type=int, default=600)
-    common.add_argument("--rate", type=float, default=0.0)
-    common.add_argument("--time-budget", type=int)
+    common.add_argument("--ndjson-report", action="store_true",
+                        help="Also write combined/combined_report.ndjson")
+    sched = argparse.ArgumentParser(add_help=False)
+    sched.add_argument("--max-parallel", type=int, default=1)
+    sched.add_argument("--timeout", type=int, default=600)
+    sched.add_argument("--rate", type=float, default=0.0, help="Global task starts per second (0 = unlimited)")
+    sched.add_argument("--per-target-rate", type=float, default=0.0,
+                       help="Task starts per second against any single target (0 = unlimited)")
+    sched.add_argument("--tool-limit", action="append", metavar="TOOL=N",
+                       help="Cap concurrent tasks of one tool (repeatable)")
+    sched.add_argument("--time-budget", type=int)
+    sched.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS,
+                       help="Seconds a claimed task stays leased without a heartbeat")
+    sched.add_argument("--cache-db",
+                       help="Probe result cache file; point several out dirs at one file to share results "
+                            "(default: $RECONX_CACHE or OUT/_cache.sqlite)")
+    sched.add_argument("--no-cache", action="store_true", help="Neither use nor store cached probe results")
+    sched.add_argument("--max-age", type=float,
+                       help="Override every tool's cache TTL in seconds (0 = re-probe, still storing results)")
     p1 = sub.add_parser("plan", parents=[common])
     p1.set_defaults(func=cmd_plan)
-    p2 = sub.add_parser("run", parents=[common])
+    p2 = sub.add_parser("run", parents=[common, sched])
     p2.set_defaults(func=cmd_run)
-    p3 = sub.add_parser("resume", parents=[common])
+    p3 = sub.add_parser("resume", parents=[common, sched])
     p3.set_defaults(func=cmd_resume)
+    p4 = sub.add_parser("worker", parents=[sched])
+    p4.add_argument("--out", required=True)
+    p4.set_defaults(func=cmd_worker)
     args = parser.parse_args()
     args.func(args)
 
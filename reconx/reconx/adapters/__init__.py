@@ -1 +1 @@
-from .base import run_action
+from .base import run_action, run_action_async, ProbeLoop
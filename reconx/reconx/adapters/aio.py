@@ -0,0 +1,408 @@
+from __future__ import annotations
+import asyncio, ipaddress, random, re, ssl, struct
+from functools import lru_cache
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from ..model import Action, Result, SummaryModel, Evidence
+
+# In-process probes: one event loop can drive thousands of these, where each shell-based
+# probe cost a login shell plus a curl/nc/openssl/nslookup process.
+
+_NET_ERRORS = (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError)
+
+@lru_cache(maxsize=1)
+def _insecure_context() -> ssl.SSLContext:
+    # Recon wants whatever certificate the host presents, valid or not (curl -k / s_client).
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+def _sni(host: str) -> Optional[str]:
+    try:
+        ipaddress.ip_address(host)
+        return None
+    except ValueError:
+        return host
+
+def _write_log(layer_dir: str, name: str, out_dir: Path, text: str) -> str:
+    d = out_dir / layer_dir
+    d.mkdir(parents=True, exist_ok=True)
+    p = d / f"{name}.log.txt"
+    p.write_text(text, encoding="utf-8")
+    return str(p)
+
+# --- HTTP ---------------------------------------------------------------------------------
+
+def http_url(action: Action) -> Tuple[str, int]:
+    url_tmpl = action.args.get("url_template", "")
+    port = action.args.get("port")
+    if port is None:
+        # Rules template the evidence port into the URL ("http{s}://{target}:{port}/").
+        m = re.search(r":(\d+)(?:/|$)", url_tmpl)
+        port = int(m.group(1)) if m else 443
+    url = url_tmpl.replace("{s}", "s" if str(port) in ("443", "8443") else "").format(target=action.target, port=port)
+    return url, int(port)
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[str, Dict[str, str]]:
+    raw = await reader.readuntil(b"\r\n\r\n")
+    lines = raw.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        k, sep, v = line.partition(":")
+        if sep:
+            headers[k.strip().lower()] = v.strip()
+    return lines[0], headers
+
+class HttpPool:
+    """Idle keep-alive connections keyed by (host, port, tls), reused across HEAD requests.
+
+    Bound to the event loop that opened the connections; ``close`` before the loop ends.
+    """
+
+    def __init__(self, per_host: int = 4):
+        self.per_host = per_host
+        self.opened = 0
+        self._idle: Dict[Tuple[str, int, bool], List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = {}
+
+    def _take(self, key):
+        conns = self._idle.get(key)
+        while conns:
+            reader, writer = conns.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return None
+
+    def _put(self, key, conn) -> None:
+        conns = self._idle.setdefault(key, [])
+        if len(conns) < self.per_host:
+            conns.append(conn)
+        else:
+            conn[1].close()
+
+    async def head(self, url: str, timeout: float = 10.0) -> Tuple[str, Dict[str, str]]:
+        """HEAD ``url``; returns the status line and lower-cased response headers."""
+        parts = urlsplit(url)
+        tls = parts.scheme == "https"
+        host = parts.hostname or ""
+        port = parts.port or (443 if tls else 80)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        req = (f"HEAD {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUser-Agent: reconx\r\n"
+               "Accept: */*\r\nConnection: keep-alive\r\n\r\n").encode("latin-1")
+        key = (host, port, tls)
+        while True:
+            conn = self._take(key)
+            fresh = conn is None
+            if fresh:
+                conn = await asyncio.wait_for(asyncio.open_connection(
+                    host, port, ssl=_insecure_context() if tls else None,
+                    server_hostname=_sni(host) if tls else None), timeout)
+                self.opened += 1
+            reader, writer = conn
+            try:
+                writer.write(req)
+                await writer.drain()
+                status, headers = await asyncio.wait_for(_read_head(reader), timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if fresh:
+                    raise
+                continue  # the server dropped an idle connection; retry on a new one
+            except BaseException:
+                writer.close()
+                raise
+            # A HEAD response has no body, so the connection is ready for the next request.
+            if status.startswith("HTTP/1.1") and headers.get("connection", "").lower() != "close":
+                self._put(key, conn)
+            else:
+                writer.close()
+            return status, headers
+
+    async def close(self) -> None:
+        conns = [c for cs in self._idle.values() for c in cs]
+        self._idle.clear()
+        for _, writer in conns:
+            writer.close()
+        for _, writer in conns:
+            try:
+                await writer.wait_closed()
+            except _NET_ERRORS:
+                pass
+
+async def http_enum(action: Action, out_dir: Path, timeout: int, pool: Optional[HttpPool] = None) -> Result:
+    url, _ = http_url(action)
+    own = pool is None
+    pool = pool or HttpPool()
+    ev, text = [], ""
+    try:
+        status, headers = await pool.head(url, timeout=min(timeout, 10))
+        text = status + "\n" + "\n".join(f"{k}: {v}" for k, v in headers.items())
+        if status.startswith("HTTP/"):
+            ev.append(Evidence(type="http-head", url=url, product=headers.get("server")))
+    except _NET_ERRORS as ex:
+        text = f"{type(ex).__name__}: {ex}"
+    finally:
+        if own:
+            await pool.close()
+    log = _write_log("layer_web", "http_enum", out_dir, text)
+    return Result(summary=SummaryModel(layer=99, target=action.target, evidence=ev), logs=log)
+
+# --- SSH ----------------------------------------------------------------------------------
+
+_SSH_SOFTWARE = re.compile(r"^SSH-[\d.]+-([A-Za-z][\w.-]*?)(?:_([\w.]+))?(?:\s|$)")
+
+async def read_ssh_banner(host: str, port: int = 22, timeout: float = 5.0) -> str:
+    """Return the server's ``SSH-...`` identification line (RFC 4253 allows lines before it)."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        async def banner():
+            for _ in range(20):
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.startswith(b"SSH-"):
+                    return line.decode("latin-1").strip()
+            return ""
+        return await asyncio.wait_for(banner(), timeout)
+    finally:
+        writer.close()
+
+async def ssh_banner(action: Action, out_dir: Path, timeout: int) -> Result:
+    port = int(action.args.get("port", 22))
+    ev, text = [], ""
+    try:
+        text = await read_ssh_banner(action.target, port, timeout=min(timeout, float(action.args.get("grab_timeout", 5))))
+    except _NET_ERRORS as ex:
+        text = f"{type(ex).__name__}: {ex}"
+    if text.startswith("SSH-"):
+        m = _SSH_SOFTWARE.match(text)
+        ev.append(Evidence(type="service", service="ssh", port=port, proto="tcp",
+                           product=m.group(1) if m else None, version=m.group(2) if m else None))
+    log = _write_log("layer_ssh", "ssh_banner", out_dir, text)
+    return Result(summary=SummaryModel(layer=98, target=action.target, evidence=ev), logs=log)
+
+# --- TLS ----------------------------------------------------------------------------------
+
+_NAME_OIDS = {"2.5.4.3": "CN", "2.5.4.6": "C", "2.5.4.7": "L", "2.5.4.8": "ST", "2.5.4.10": "O",
+              "2.5.4.11": "OU", "2.5.4.5": "serialNumber", "1.2.840.113549.1.9.1": "emailAddress"}
+
+def _der(buf: bytes, i: int) -> Tuple[int, int, int]:
+    """(tag, content start, content end) of the DER element at ``i``."""
+    tag, n = buf[i], buf[i + 1]
+    i += 2
+    if n & 0x80:
+        k = n & 0x7F
+        n = int.from_bytes(buf[i:i + k], "big")
+        i += k
+    return tag, i, i + n
+
+def _der_children(buf: bytes, start: int, end: int) -> List[Tuple[int, int, int]]:
+    out = []
+    while start < end:
+        el = _der(buf, start)
+        out.append(el)
+        start = el[2]
+    return out
+
+def _oid(b: bytes) -> str:
+    parts = [b[0] // 40, b[0] % 40]
+    v = 0
+    for c in b[1:]:
+        v = (v << 7) | (c & 0x7F)
+        if not c & 0x80:
+            parts.append(v)
+            v = 0
+    return ".".join(map(str, parts))
+
+def _der_name(buf: bytes, start: int, end: int) -> str:
+    # Name ::= SEQUENCE OF SET OF SEQUENCE { type OID, value ANY }
+    rdns = []
+    for _, s, e in _der_children(buf, start, end):
+        for _, a, b in _der_children(buf, s, e):
+            (_, os_, oe), (vt, vs, ve) = _der_children(buf, a, b)[:2]
+            oid = _oid(buf[os_:oe])
+            raw = buf[vs:ve]
+            val = raw.decode("utf-16-be", "replace") if vt == 0x1E else raw.decode("utf-8", "replace")
+            rdns.append(f"{_NAME_OIDS.get(oid, oid)} = {val}")
+    return ", ".join(rdns)
+
+def cert_names(der: bytes) -> Tuple[str, str]:
+    """(subject, issuer) of a DER certificate, formatted like ``openssl x509 -subject``."""
+    _, s, e = _der(der, 0)
+    _, s, e = _der(der, s)  # tbsCertificate
+    fields = _der_children(der, s, e)
+    if fields and fields[0][0] == 0xA0:  # explicit [0] version
+        fields = fields[1:]
+    issuer, subject = fields[2], fields[4]
+    return _der_name(der, subject[1], subject[2]), _der_name(der, issuer[1], issuer[2])
+
+async def fetch_certificate(host: str, port: int = 443, timeout: float = 10.0) -> bytes:
+    _, writer = await asyncio.wait_for(asyncio.open_connection(
+        host, port, ssl=_insecure_context(), server_hostname=_sni(host)), timeout)
+    try:
+        return writer.get_extra_info("ssl_object").getpeercert(binary_form=True) or b""
+    finally:
+        writer.close()
+
+async def tls_probe(action: Action, out_dir: Path, timeout: int) -> Result:
+    port = int(action.args.get("port", 443))
+    ev, text = [], ""
+    try:
+        der = await fetch_certificate(action.target, port, timeout=min(timeout, 10))
+        if der:
+            subj, issuer = cert_names(der)
+            text = f"subject={subj}\nissuer={issuer}"
+            ev.append(Evidence(type="tls-cert", service="https", port=port, proto="tcp", name=subj, product=issuer))
+    except (*_NET_ERRORS, IndexError) as ex:
+        text = f"{type(ex).__name__}: {ex}"
+    log = _write_log("layer_tls", "tls_probe", out_dir, text)
+    return Result(summary=SummaryModel(layer=95, target=action.target, evidence=ev), logs=log)
+
+# --- DNS ----------------------------------------------------------------------------------
+
+RR_TYPES = {"A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "PTR": 12, "MX": 15, "TXT": 16, "AAAA": 28, "SRV": 33}
+_RR_NAMES = {v: k for k, v in RR_TYPES.items()}
+
+@lru_cache(maxsize=1)
+def system_nameserver() -> str:
+    try:
+        for line in Path("/etc/resolv.conf").read_text().splitlines():
+            parts = line.split()
+            if len(parts) >= 2 and parts[0] == "nameserver":
+                return parts[1]
+    except OSError:
+        pass
+    return "127.0.0.1"
+
+def build_query(name: str, rtype: str, qid: int) -> bytes:
+    q = struct.pack("!HHHHHH", qid, 0x0100, 1, 0, 0, 0)  # recursion desired, one question
+    for label in name.rstrip(".").split("."):
+        raw = label.encode("idna")
+        q += bytes([len(raw)]) + raw
+    return q + b"\x00" + struct.pack("!HH", RR_TYPES[rtype], 1)
+
+def _read_name(msg: bytes, i: int) -> Tuple[str, int]:
+    labels, end, hops = [], None, 0
+    while True:
+        n = msg[i]
+        if n & 0xC0 == 0xC0:  # compression pointer
+            if end is None:
+                end = i + 2
+            i = ((n & 0x3F) << 8) | msg[i + 1]
+            hops += 1
+            if hops > 64:
+                raise ValueError("DNS name compression loop")
+            continue
+        if n == 0:
+            return ".".join(labels), (end if end is not None else i + 1)
+        labels.append(msg[i + 1:i + 1 + n].decode("ascii", "replace"))
+        i += 1 + n
+
+def _rdata(msg: bytes, rtype: int, s: int, e: int) -> str:
+    if rtype == 1:
+        return str(ipaddress.IPv4Address(msg[s:e]))
+    if rtype == 28:
+        return str(ipaddress.IPv6Address(msg[s:e]))
+    if rtype in (2, 5, 12):
+        return _read_name(msg, s)[0]
+    if rtype == 15:
+        return f"{struct.unpack('!H', msg[s:s + 2])[0]} {_read_name(msg, s + 2)[0]}"
+    if rtype == 16:
+        out, i = [], s
+        while i < e:
+            out.append(msg[i + 1:i + 1 + msg[i]].decode("utf-8", "replace"))
+            i += 1 + msg[i]
+        return "".join(out)
+    if rtype == 6:
+        mname, i = _read_name(msg, s)
+        return f"{mname} {_read_name(msg, i)[0]}"
+    return msg[s:e].hex()
+
+def parse_response(msg: bytes, qid: int) -> Tuple[bool, List[Tuple[str, str]]]:
+    """(truncated, [(type, value)]) from a DNS response; raises ValueError on mismatch/errors."""
+    rid, flags, qd, an = struct.unpack("!HHHH", msg[:8])
+    if rid != qid:
+        raise ValueError("DNS response id mismatch")
+    if flags & 0x000F not in (0, 3):  # NOERROR / NXDOMAIN
+        raise ValueError(f"DNS rcode {flags & 0x000F}")
+    i = 12
+    for _ in range(qd):
+        i = _read_name(msg, i)[1] + 4
+    answers = []
+    for _ in range(an):
+        i = _read_name(msg, i)[1]
+        rtype, _, _, rdlen = struct.unpack("!HHIH", msg[i:i + 10])
+        i += 10
+        answers.append((_RR_NAMES.get(rtype, str(rtype)), _rdata(msg, rtype, i, i + rdlen)))
+        i += rdlen
+    return bool(flags & 0x0200), answers
+
+class _DnsProtocol(asyncio.DatagramProtocol):
+    def __init__(self, fut: asyncio.Future):
+        self.fut = fut
+
+    def datagram_received(self, data, addr):
+        if not self.fut.done():
+            self.fut.set_result(data)
+
+    def error_received(self, exc):
+        if not self.fut.done():
+            self.fut.set_exception(exc)
+
+async def _query_tcp(query: bytes, server: str, port: int, timeout: float) -> bytes:
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(server, port), timeout)
+    try:
+        writer.write(struct.pack("!H", len(query)) + query)
+        await writer.drain()
+        async def read():
+            (n,) = struct.unpack("!H", await reader.readexactly(2))
+            return await reader.readexactly(n)
+        return await asyncio.wait_for(read(), timeout)
+    finally:
+        writer.close()
+
+async def resolve(name: str, rtype: str = "A", server: Optional[str] = None, port: int = 53,
+                  timeout: float = 5.0) -> List[Tuple[str, str]]:
+    """Query ``server`` over UDP (TCP when the answer is truncated); returns [(type, value)]."""
+    server = server or system_nameserver()
+    qid = random.randrange(1 << 16)
+    query = build_query(name, rtype, qid)
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    transport, _ = await loop.create_datagram_endpoint(lambda: _DnsProtocol(fut), remote_addr=(server, port))
+    try:
+        transport.sendto(query)
+        msg = await asyncio.wait_for(fut, timeout)
+    finally:
+        transport.close()
+    truncated, answers = parse_response(msg, qid)
+    if truncated:
+        truncated, answers = parse_response(await _query_tcp(query, server, port, timeout), qid)
+    return answers
+
+async def dns_enum(action: Action, out_dir: Path, timeout: int) -> Result:
+    target = action.target
+    types = [t for t in action.args.get("record_types", ["A", "AAAA", "MX", "TXT", "NS"]) if t in RR_TYPES]
+    server = action.args.get("nameserver")
+    port = int(action.args.get("nameserver_port", 53))
+    per_query = min(timeout, 5)
+    got = await asyncio.gather(*(resolve(target, t, server, port, per_query) for t in types), return_exceptions=True)
+    ev, lines = [], []
+    for t, res in zip(types, got):
+        if isinstance(res, BaseException):
+            lines.append(f"{t}: {type(res).__name__}: {res}")
+            continue
+        for rtype, value in res:
+            lines.append(f"{rtype}: {value}")
+            ev.append(Evidence(type="dns-record", name=target, data=rtype, product=value))
+    log = _write_log("layer_dns", "dns_enum", out_dir, "\n".join(lines))
+    return Result(summary=SummaryModel(layer=96, target=target, evidence=ev), logs=log)
+
+ASYNC_HANDLERS: Dict[str, Callable[..., Awaitable[Result]]] = {
+    "http_enum": http_enum,
+    "ssh_banner": ssh_banner,
+    "dns_enum": dns_enum,
+    "tls_probe": tls_probe,
+}
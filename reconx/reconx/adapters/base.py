@@ -1,15 +1,16 @@
 from __future__ import annotations
 from pathlib import Path
-import os, shlex
-from typing import Dict, Callable
-from ..model import Action, Result, SummaryModel, Evidence, Finding, Artifact
-from ..utils import safe_run, jload
+import asyncio, os, threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Callable, Optional
+from ..model import Action, Result, SummaryModel
+from ..utils import safe_run
+from . import aio
 
 def _read_or_stub_summary(summary_path: Path, layer: int, target: str) -> SummaryModel:
     if summary_path.exists():
         try:
-            data = jload(summary_path)
-            return SummaryModel.model_validate(data)
+            return SummaryModel.model_validate_json(summary_path.read_bytes())
         except Exception:
             pass
     return SummaryModel(layer=layer, target=target, evidence=[], findings=[], artifacts=[])
@@ -27,95 +28,21 @@ def run_layer_script(name: str, script_path: Path, out_dir: Path, target: str, l
     summary = _read_or_stub_summary(summary_path, layer=layer, target=target)
     return Result(summary=summary, artifacts=[], logs=str(log_path))
 
+# The network probes run in-process on asyncio (see ``aio``); these are the blocking entry
+# points for ``run_action`` callers, one short-lived loop per call. The scheduler drives them
+# through ``run_action_async`` on a ``ProbeLoop`` instead.
+
 def http_enum(action: Action, out_dir: Path, timeout: int) -> Result:
-    url_tmpl = action.args.get("url_template", "")
-    target = action.target
-    port = action.args.get("port", 443)
-    url = url_tmpl.replace("{s}", "s" if str(port) in ("443","8443") else "").format(target=target, port=port)
-    layer_dir = out_dir / "layer_web"
-    layer_dir.mkdir(parents=True, exist_ok=True)
-    log_path = layer_dir / "http_enum.log.txt"
-    try:
-        code, out, err = safe_run(["bash","-lc", f"curl -skI --max-time 10 {shlex.quote(url)}"], timeout=min(timeout, 30))
-        log_path.write_text((out or "") + "\n" + (err or ""), encoding="utf-8")
-    except Exception as ex:
-        log_path.write_text(str(ex), encoding="utf-8")
-    ev = []
-    if 'out' in locals() and "HTTP/" in (out or ""):
-        ev.append(Evidence(type="http-head", url=url))
-    summary = SummaryModel(layer=99, target=target, evidence=ev, findings=[], artifacts=[])
-    return Result(summary=summary, artifacts=[], logs=str(log_path))
+    return asyncio.run(aio.http_enum(action, out_dir, timeout))
 
 def ssh_banner(action: Action, out_dir: Path, timeout: int) -> Result:
-    target = action.target
-    port = int(action.args.get("port", 22))
-    layer_dir = out_dir / "layer_ssh"
-    layer_dir.mkdir(parents=True, exist_ok=True)
-    log_path = layer_dir / "ssh_banner.log.txt"
-    try:
-        cmd = ["bash","-lc", f"echo | timeout 5 nc -v {target} {port}"]
-        code, out, err = safe_run(cmd, timeout=min(timeout, 15))
-        log_path.write_text((out or "") + "\n" + (err or ""), encoding="utf-8")
-    except Exception as ex:
-        log_path.write_text(str(ex), encoding="utf-8")
-    ev = []
-    txt = ((out or "") + (err or ""))
-    if "SSH-" in txt:
-        ev.append(Evidence(type="service", service="ssh", port=port, proto="tcp"))
-    summary = SummaryModel(layer=98, target=target, evidence=ev, findings=[], artifacts=[])
-    return Result(summary=summary, artifacts=[], logs=str(log_path))
+    return asyncio.run(aio.ssh_banner(action, out_dir, timeout))
 
 def dns_enum(action: Action, out_dir: Path, timeout: int) -> Result:
-    target = action.target
-    record_types = action.args.get("record_types", ["A", "AAAA", "MX", "TXT", "NS"])
-    layer_dir = out_dir / "layer_dns"
-    layer_dir.mkdir(parents=True, exist_ok=True)
-    log_path = layer_dir / "dns_enum.log.txt"
-    try:
-        cmd = [
-            "bash",
-            "-lc",
-            f"for t in {' '.join(record_types)}; do nslookup -type=$t {shlex.quote(target)}; done",
-        ]
-        code, out, err = safe_run(cmd, timeout=min(timeout, 60))
-        log_path.write_text((out or "") + "\n" + (err or ""), encoding="utf-8")
-    except Exception as ex:
-        log_path.write_text(str(ex), encoding="utf-8")
-    ev = []
-    if 'out' in locals() and target in (out or ""):
-        ev.append(Evidence(type="dns-record", name=target))
-    summary = SummaryModel(layer=96, target=target, evidence=ev, findings=[], artifacts=[])
-    return Result(summary=summary, artifacts=[], logs=str(log_path))
+    return asyncio.run(aio.dns_enum(action, out_dir, timeout))
 
 def tls_probe(action: Action, out_dir: Path, timeout: int) -> Result:
-    target = action.target
-    port = int(action.args.get("port", 443))
-    layer_dir = out_dir / "layer_tls"
-    layer_dir.mkdir(parents=True, exist_ok=True)
-    log_path = layer_dir / "tls_probe.log.txt"
-    try:
-        cmd = [
-            "bash",
-            "-lc",
-            f"echo | timeout 10 openssl s_client -servername {shlex.quote(target)} -connect {shlex.quote(target)}:{port} 2>&1 | head -n 20",
-        ]
-        code, out, err = safe_run(cmd, timeout=min(timeout, 40))
-        log_path.write_text((out or "") + "\n" + (err or ""), encoding="utf-8")
-    except Exception as ex:
-        log_path.write_text(str(ex), encoding="utf-8")
-    ev = []
-    subj = None
-    issuer = None
-    for line in (out or "").splitlines():
-        line = line.strip()
-        if line.startswith("subject="):
-            subj = line.split("subject=")[-1].strip()
-        elif line.startswith("issuer="):
-            issuer = line.split("issuer=")[-1].strip()
-    if subj or issuer:
-        ev.append(Evidence(type="tls-cert", service="https", port=port, proto="tcp", name=subj, product=issuer))
-    summary = SummaryModel(layer=95, target=target, evidence=ev, findings=[], artifacts=[])
-    return Result(summary=summary, artifacts=[], logs=str(log_path))
+    return asyncio.run(aio.tls_probe(action, out_dir, timeout))
 
 HANDLERS: Dict[str, Callable[[Action, Path, int], Result]] = {}
 
@@ -143,3 +70,61 @@ def run_action(action: Action, out_dir: Path, timeout: int) -> Result:
         return Result(summary=SummaryModel(layer=97, target=action.target, evidence=[], findings=[], artifacts=[]),
                       artifacts=[], logs=None)
     return handler(action, out_dir, timeout)
+
+async def run_action_async(action: Action, out_dir: Path, timeout: int,
+                           pool: Optional[aio.HttpPool] = None) -> Result:
+    """Awaitable ``run_action``: network probes run on the caller's loop, anything else
+    (layer scripts, registered handlers) in a worker thread. ``pool`` shares HTTP keep-alive
+    connections between ``http_enum`` calls."""
+    if not HANDLERS:
+        _register_builtin_handlers()
+    probe = aio.ASYNC_HANDLERS.get(action.tool)
+    builtin = probe is not None and HANDLERS.get(action.tool) is globals().get(action.tool)
+    if not builtin:
+        return await asyncio.to_thread(run_action, action, out_dir, timeout)
+    if action.tool == "http_enum":
+        return await aio.http_enum(action, out_dir, timeout, pool=pool)
+    return await probe(action, out_dir, timeout)
+
+class ProbeLoop:
+    """One event loop on a background thread that runs actions for synchronous callers.
+
+    ``submit`` schedules ``run_action_async`` on the loop and returns a
+    ``concurrent.futures.Future``, so the caller waits on it like a thread-pool future. Network
+    probes share the loop and one ``HttpPool``; layer scripts and registered handlers run on the
+    loop's executor, ``workers`` threads wide. Use as a context manager, or call ``close``.
+    """
+
+    def __init__(self, workers: int):
+        self.pool = aio.HttpPool(per_host=max(4, workers))
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reconx-task")
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(self._executor)
+        self._thread = threading.Thread(target=self._loop.run_forever, name="reconx-probes", daemon=True)
+        self._thread.start()
+
+    def submit(self, action: Action, out_dir: Path, timeout: int) -> Future:
+        return asyncio.run_coroutine_threadsafe(run_action_async(action, out_dir, timeout, pool=self.pool),
+                                                self._loop)
+
+    async def _shutdown(self) -> None:
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.pool.close()
+
+    def close(self) -> None:
+        if self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "ProbeLoop":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
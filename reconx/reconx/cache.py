@@ -0,0 +1,70 @@
+from __future__ import annotations
+import os, time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+from .model import Action, Result, SummaryModel
+from .state import init_cache_db, task_hash, get_cached_result, put_cached_results
+
+# Seconds a probe result stays valid. Tools not listed (layer scripts, custom handlers) are
+# never cached: their output lands in the run directory, not only in the Result.
+DEFAULT_TTLS: Dict[str, float] = {
+    "http_enum": 3600.0,
+    "ssh_banner": 6 * 3600.0,
+    "dns_enum": 3600.0,
+    "tls_probe": 24 * 3600.0,
+}
+# Results without evidence or findings (timeouts, refused ports) are retried sooner.
+EMPTY_TTL = 300.0
+
+def default_cache_path(out_dir: Path) -> Path:
+    """``$RECONX_CACHE`` if set, else a cache private to ``out_dir``.
+
+    Results are keyed only by ``(tool, args, target)``, so sharing one cache between engagements
+    has to be asked for (``--cache-db`` or ``$RECONX_CACHE``).
+    """
+    if os.environ.get("RECONX_CACHE"):
+        return Path(os.environ["RECONX_CACHE"])
+    return Path(out_dir) / "_cache.sqlite"
+
+class ResultCache:
+    """Probe summaries keyed by ``task_hash(tool, args, target)``, shared across runs.
+
+    Only the summary's evidence and findings are kept: logs and artifacts belong to the run that
+    produced them, so a hit comes back as a ``Result`` without ``logs`` or artifacts.
+    ``max_age`` overrides every tool's TTL (``0`` ignores cached entries but still stores fresh
+    results).
+    """
+
+    def __init__(self, path: Path, ttls: Optional[Dict[str, float]] = None,
+                 max_age: Optional[float] = None):
+        self.db = init_cache_db(path)
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_age = max_age
+
+    def cacheable(self, tool: str) -> bool:
+        return self.ttls.get(tool, 0) > 0
+
+    def ttl(self, tool: str, empty: bool = False) -> float:
+        ttl = self.ttls.get(tool, 0.0) if self.max_age is None else self.max_age
+        return min(ttl, EMPTY_TTL) if empty else ttl
+
+    def get(self, action: Action, now: Optional[float] = None) -> Optional[Result]:
+        if not self.cacheable(action.tool):
+            return None
+        row = get_cached_result(self.db, task_hash(action.tool, action.args, action.target))
+        if row is None:
+            return None
+        body, stored_at = row
+        try:
+            res = Result(summary=SummaryModel.model_validate_json(body))
+        except Exception:
+            return None
+        empty = not (res.summary.evidence or res.summary.findings)
+        age = (time.time() if now is None else now) - stored_at
+        return res if age < self.ttl(action.tool, empty) else None
+
+    def put_many(self, items: Iterable[Tuple[Action, Result]]) -> None:
+        rows = [(task_hash(a.tool, a.args, a.target), a.tool,
+                 r.summary.model_copy(update={"artifacts": []}).model_dump_json())
+                for a, r in items if self.cacheable(a.tool)]
+        put_cached_results(self.db, rows)
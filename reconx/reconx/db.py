@@ -0,0 +1,128 @@
+from __future__ import annotations
+import os, sqlite3, threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Union
+
+# The state DB is written against this much of SQLAlchemy's Connection API: raw SQL through
+# ``exec_driver_sql`` (a list of parameter tuples means executemany) inside ``begin()`` (one
+# transaction) or ``connect()`` (autocommit), with results offering ``first``, ``scalar``,
+# ``fetchall``, ``keys``, ``rowcount`` and iteration. A SQLAlchemy ``Engine`` satisfies it as is.
+
+class StateBackend(ABC):
+    """Interface of the state DB backends; see ``SQLiteBackend`` and ``SQLAlchemyBackend``."""
+
+    name = "abstract"
+
+    @abstractmethod
+    def begin(self):
+        """Context manager yielding a connection inside a transaction, committed on exit."""
+
+    @abstractmethod
+    def connect(self):
+        """Context manager yielding a connection outside an explicit transaction."""
+
+    def dispose(self) -> None:
+        pass
+
+class _Cursor(sqlite3.Cursor):
+    def first(self):
+        row = self.fetchone()
+        self.close()
+        return row
+
+    def scalar(self):
+        row = self.first()
+        return row[0] if row else None
+
+    def keys(self) -> List[str]:
+        return [d[0] for d in self.description]
+
+class _Connection(sqlite3.Connection):
+    def exec_driver_sql(self, sql: str, params: Union[Sequence, List[Sequence]] = ()) -> _Cursor:
+        cur = self.cursor(_Cursor)
+        if isinstance(params, list):
+            cur.executemany(sql, params)
+        else:
+            cur.execute(sql, params)
+        return cur
+
+class SQLiteBackend(StateBackend):
+    """Direct ``sqlite3``: one connection per thread, opened with ``pragmas`` applied and a large
+    prepared-statement cache, so the fixed set of state queries is compiled once per thread."""
+
+    name = "sqlite3"
+
+    def __init__(self, path: Path, pragmas: Sequence[str] = (), timeout: float = 30.0,
+                 cached_statements: int = 256):
+        self.path = str(path)
+        self.pragmas = tuple(pragmas)
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+
+    def _con(self) -> _Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            # Autocommit mode; begin() issues BEGIN/COMMIT itself.
+            con = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                  factory=_Connection, cached_statements=self.cached_statements)
+            for p in self.pragmas:
+                con.execute(p)
+            self._local.con = con
+        return con
+
+    @contextmanager
+    def begin(self) -> Iterator[_Connection]:
+        con = self._con()
+        con.execute("BEGIN")
+        try:
+            yield con
+            con.execute("COMMIT")
+        except BaseException:
+            # Also after a failed COMMIT (e.g. SQLITE_BUSY), which leaves the transaction open.
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            raise
+
+    @contextmanager
+    def connect(self) -> Iterator[_Connection]:
+        yield self._con()
+
+    def dispose(self) -> None:
+        # Only this thread's connection; others close when their thread exits.
+        con = getattr(self._local, "con", None)
+        if con is not None:
+            con.close()
+            self._local.con = None
+
+class SQLAlchemyBackend(StateBackend):
+    """SQLAlchemy engine for ``url``. The state SQL is SQLite's dialect, so ``url`` must point
+    at SQLite (see ``state.open_backend``). ``on_connect`` runs on every new DBAPI connection."""
+
+    name = "sqlalchemy"
+
+    def __init__(self, url: str, on_connect=None, **engine_kw):
+        from sqlalchemy import create_engine, event
+        self.engine = create_engine(url, future=True, **engine_kw)
+        if on_connect is not None:
+            event.listen(self.engine, "connect", on_connect)
+
+    def begin(self):
+        return self.engine.begin()
+
+    def connect(self):
+        return self.engine.connect()
+
+    def dispose(self) -> None:
+        self.engine.dispose()
+
+BACKENDS = ("sqlite3", "sqlalchemy")
+
+def backend_name(requested: Optional[str] = None) -> str:
+    """``requested``, else ``$RECONX_STATE_BACKEND``, else ``sqlite3``."""
+    name = requested or os.environ.get("RECONX_STATE_BACKEND") or "sqlite3"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown state backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    return name
@@ -1,6 +1,8 @@
 from __future__ import annotations
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Any, Iterable, List, Mapping, Optional
 
 class Evidence(BaseModel):
     type: str
@@ -11,6 +13,7 @@ class Evidence(BaseModel):
     version: Optional[str] = None
     name: Optional[str] = None
     url: Optional[str] = None
+    data: Optional[str] = None  # tool-specific detail, e.g. a DNS record's type
 
 class Finding(BaseModel):
     id: str
@@ -34,8 +37,49 @@ class Action(BaseModel):
     args: dict
     target: str
     priority: int = 5
+    max_parallel: Optional[int] = None
+    # Id of the rule that planned the action; ``max_parallel`` counts running tasks per rule and tool.
+    rule: Optional[str] = None
 
 class Result(BaseModel):
     summary: SummaryModel
     artifacts: list[str] = Field(default_factory=list)
     logs: str | None = None
+
+def field_view(m: BaseModel) -> Mapping[str, Any]:
+    """Read-only view of a flat model's fields, without copying.
+
+    For ``Evidence``/``Finding``/``Artifact`` (scalar fields only) it holds what ``model_dump()``
+    would return, in field order.
+    """
+    return MappingProxyType(m.__dict__)
+
+@lru_cache(maxsize=1)
+def _summary_list() -> TypeAdapter:
+    return TypeAdapter(List[SummaryModel])
+
+def validate_summaries_json(blobs: Iterable[bytes]) -> List[Optional[SummaryModel]]:
+    """Validate many summary JSON documents in one ``validate_json`` call.
+
+    If any document is invalid, each is validated on its own and the bad ones come back as None,
+    so results always line up with ``blobs``. That includes a blob holding several comma-separated
+    objects, which would otherwise shift every later result by one.
+    """
+    blobs = list(blobs)
+    if not blobs:
+        return []
+    try:
+        models = _summary_list().validate_json(b"[" + b",".join(blobs) + b"]")
+        if len(models) == len(blobs):
+            return models
+    except Exception:
+        pass
+    out: List[Optional[SummaryModel]] = []
+    for b in blobs:
+        try:
+            out.append(SummaryModel.model_validate_json(b))
+        except Exception:
+            out.append(None)
+    return out
+
+from .columns import EvidenceColumns, EvidenceRow  # noqa: E402  (needs Evidence/SummaryModel above)
@@ -0,0 +1,161 @@
+from __future__ import annotations
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from . import Evidence, SummaryModel
+
+FIELDS = tuple(Evidence.model_fields)
+_STR_FIELDS = tuple(f for f in FIELDS if f != "port")
+# Per-row port kinds: missing, stored in the int32 ``port`` array, or kept as-is in a side dict
+# (ports outside int32, or non-int values from mapping input).
+_NO_PORT, _INT32_PORT, _WIDE_PORT = 0, 1, 2
+_INT32_MIN, _INT32_MAX = -2**31, 2**31 - 1
+
+class EvidenceColumns(Sequence):
+    """Evidence rows stored column-wise, for engagements with millions of them.
+
+    Every string (field values and each row's owning target) is stored once in a shared table and
+    referenced from a 32-bit code column; ports are an ``array('i')`` plus a byte per row saying
+    whether the port is missing, in the array, or (outside int32) kept in a side dict. Item
+    ``i`` is an ``EvidenceRow``, a read-only mapping equal to that row's ``Evidence.model_dump()``.
+    """
+
+    fields = FIELDS
+
+    def __init__(self):
+        self._strings: List[Optional[str]] = [None]
+        self._ids: Dict[Optional[str], int] = {None: 0}
+        self._cols: Dict[str, array] = {f: array("I") for f in _STR_FIELDS + ("target",)}
+        self.port = array("i")
+        self._port_kind = bytearray()
+        self._wide_ports: Dict[int, Any] = {}
+
+    @classmethod
+    def from_summaries(cls, summaries: Iterable[SummaryModel]) -> "EvidenceColumns":
+        cols = cls()
+        for s in summaries:
+            cols.extend(s.evidence, s.target)
+        return cols
+
+    def _code(self, s: Optional[str]) -> int:
+        code = self._ids.get(s)
+        if code is None:
+            code = self._ids[s] = len(self._strings)
+            self._strings.append(s)
+        return code
+
+    def append(self, e: Union[Evidence, Mapping], target: str) -> None:
+        d = e.__dict__ if isinstance(e, Evidence) else e
+        for f in _STR_FIELDS:
+            self._cols[f].append(self._code(d.get(f)))
+        self._cols["target"].append(self._code(target))
+        port = d.get("port")
+        if port is None:
+            self.port.append(0)
+            self._port_kind.append(_NO_PORT)
+        elif (isinstance(port, int) and not isinstance(port, bool)
+              and _INT32_MIN <= port <= _INT32_MAX):
+            self.port.append(port)
+            self._port_kind.append(_INT32_PORT)
+        else:
+            self._wide_ports[len(self.port)] = port
+            self.port.append(0)
+            self._port_kind.append(_WIDE_PORT)
+
+    def extend(self, evidence: Iterable[Union[Evidence, Mapping]], target: str) -> None:
+        for e in evidence:
+            self.append(e, target)
+
+    def __len__(self) -> int:
+        return len(self.port)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [EvidenceRow(self, j) for j in range(len(self))[i]]
+        return EvidenceRow(self, range(len(self))[i])
+
+    def _port(self, i: int) -> Any:
+        kind = self._port_kind[i]
+        if kind == _INT32_PORT:
+            return self.port[i]
+        return None if kind == _NO_PORT else self._wide_ports[i]
+
+    def value(self, field: str, i: int) -> Any:
+        if field == "port":
+            return self._port(i)
+        return self._strings[self._cols[field][i]]
+
+    def column(self, field: str) -> List[Any]:
+        """Decoded values of ``field`` (an ``Evidence`` field or ``"target"``) for every row."""
+        if field == "port":
+            if not self._wide_ports:
+                return [p if k == _INT32_PORT else None for p, k in zip(self.port, self._port_kind)]
+            return [self._port(i) for i in range(len(self))]
+        strings = self._strings
+        return [strings[c] for c in self._cols[field]]
+
+    def rows(self, positions: Optional[Sequence[int]] = None, with_target: bool = False) -> "RowsView":
+        """Lazy sequence of row views (all rows, or ``positions``); ``with_target`` adds a
+        ``"target"`` key, as the report rows have."""
+        return RowsView(self, range(len(self)) if positions is None else positions,
+                        ReportRow if with_target else EvidenceRow)
+
+class EvidenceRow(Mapping):
+    """Read-only view of one ``EvidenceColumns`` row, keyed by ``Evidence``'s fields."""
+    __slots__ = ("_cols", "_i")
+    _keys = FIELDS
+    _keyset = frozenset(FIELDS)
+
+    def __init__(self, cols: EvidenceColumns, i: int):
+        self._cols = cols
+        self._i = i
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._keyset:
+            raise KeyError(key)
+        cols = self._cols
+        if key == "port":
+            return cols._port(self._i)
+        return cols._strings[cols._cols[key][self._i]]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keyset
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    @property
+    def target(self) -> str:
+        return self._cols.value("target", self._i)
+
+class ReportRow(EvidenceRow):
+    __slots__ = ()
+    _keys = FIELDS + ("target",)
+    _keyset = frozenset(_keys)
+
+class RowsView(Sequence):
+    __slots__ = ("_cols", "_positions", "_row")
+
+    def __init__(self, cols: EvidenceColumns, positions: Sequence[int], row: type = EvidenceRow):
+        self._cols = cols
+        self._positions = positions
+        self._row = row
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._row(self._cols, p) for p in self._positions[i]]
+        return self._row(self._cols, self._positions[i])
+
+    def __iter__(self) -> Iterator[EvidenceRow]:
+        row, cols = self._row, self._cols
+        for p in self._positions:
+            yield row(cols, p)
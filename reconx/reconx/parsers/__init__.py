@@ -1,2 +1,2 @@
-from .summaries import load_summaries_from_layers
-from .nmap import parse_nmap_xml
+from .summaries import load_summaries_from_layers, summary_files, watermark_key, load_summary, iter_summaries
+from .nmap import parse_nmap_xml, iter_nmap_hosts, iter_nmap_summaries
@@ -1,7 +1,139 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, Any, List
-from xml.etree import ElementTree as ET
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from ..model import Artifact, Evidence, SummaryModel
+
+
+def _iter_host_elements(xml_path: Path) -> Iterator[Any]:
+    """Yield each top-level ``<host>`` element as soon as it is complete.
+
+    Uses lxml's ``iterparse`` when lxml is installed, else the standard library's; both skip
+    ``<host>`` elements nested deeper than a direct child of the root. A host is
+    cleared (and detached from ``<nmaprun>``) once the caller moves on, so memory is bounded
+    by the largest single host rather than the file.
+    """
+    try:
+        from lxml import etree
+    except ImportError:
+        etree = None
+    if etree is not None:
+        for _, host in etree.iterparse(str(xml_path), events=("end",), tag="host",
+                                       resolve_entities=False, no_network=True):
+            parent = host.getparent()
+            if parent is None or parent.getparent() is not None:
+                continue  # same rule as below: only children of the root element
+            yield host
+            host.clear(keep_tail=True)
+            while host.getprevious() is not None:
+                del parent[0]
+        return
+
+    from xml.etree import ElementTree as ET
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(str(xml_path), events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+        depth -= 1
+        if elem.tag == "host" and depth == 1:
+            yield elem
+            root.clear()
+
+
+def _ipv4(host: Any) -> Optional[str]:
+    for addr in host.findall("address"):
+        if addr.get("addrtype") == "ipv4":
+            return addr.get("addr")
+    return None
+
+
+def _ports(host: Any) -> Iterator[Tuple[Any, Any, Any]]:
+    """``(port, state, service)`` elements of each ``<ports>/<port>``, in one pass over the
+    children (cheaper than ``find`` per field, notably on lxml)."""
+    ports_elem = host.find("ports")
+    if ports_elem is None:
+        return
+    for port in ports_elem:
+        if port.tag != "port":
+            continue  # <extraports> summaries
+        state_elem = service_elem = None
+        for child in port:
+            if child.tag == "state":
+                state_elem = child
+            elif child.tag == "service":
+                service_elem = child
+        yield port, state_elem, service_elem
+
+
+def _host_dict(host: Any, address: str) -> Dict[str, Any]:
+    host_dict: Dict[str, Any] = {"address": address, "ports": []}
+    for port, state_elem, service_elem in _ports(host):
+        port_dict: Dict[str, Any] = {
+            "port": int(port.get("portid", 0)),
+            "proto": port.get("protocol"),
+        }
+        if state_elem is not None:
+            port_dict["state"] = state_elem.get("state")
+        if service_elem is not None:
+            if service_elem.get("name"):
+                port_dict["service"] = service_elem.get("name")
+            if service_elem.get("product"):
+                port_dict["product"] = service_elem.get("product")
+            if service_elem.get("version"):
+                port_dict["version"] = service_elem.get("version")
+        host_dict["ports"].append(port_dict)
+    return host_dict
+
+
+def iter_nmap_hosts(xml_path: Path) -> Iterator[Dict[str, Any]]:
+    """Stream the hosts of an Nmap XML file, one ``parse_nmap_xml`` host entry at a time.
+
+    Hosts without an IPv4 address are skipped.
+    """
+    for host in _iter_host_elements(xml_path):
+        address = _ipv4(host)
+        if address is not None:
+            yield _host_dict(host, address)
+
+
+def iter_nmap_summaries(xml_path: Path, layer: int = 1, open_only: bool = True) -> Iterator[SummaryModel]:
+    """Stream one :class:`~reconx.model.SummaryModel` per IPv4 host of an Nmap XML file.
+
+    Each port (only ``open`` ones with ``open_only``) becomes a ``service`` ``Evidence`` built
+    straight from the XML attributes, and the XML file is recorded as a ``raw`` artifact. The
+    result can be passed lazily to ``evaluate_rules``.
+
+    Parameters
+    ----------
+    xml_path:
+        Path to the Nmap XML file.
+    layer:
+        Layer number stamped on every summary.
+    open_only:
+        Skip ports whose state is not ``open``.
+    """
+    artifact = Artifact(kind="raw", path=str(xml_path))
+    for host in _iter_host_elements(xml_path):
+        address = _ipv4(host)
+        if address is None:
+            continue
+        evidence: List[Evidence] = []
+        for port, state, svc in _ports(host):
+            if open_only and (state is None or state.get("state") != "open"):
+                continue
+            attrs = svc.attrib if svc is not None else {}
+            evidence.append(Evidence(
+                type="service",
+                port=int(port.get("portid", 0)),
+                proto=port.get("protocol"),
+                service=attrs.get("name") or None,
+                product=attrs.get("product") or None,
+                version=attrs.get("version") or None,
+            ))
+        yield SummaryModel(layer=layer, target=address, evidence=evidence, artifacts=[artifact])
 
 
 def parse_nmap_xml(xml_path: Path) -> Dict[str, Any]:
@@ -12,6 +144,9 @@ def parse_nmap_xml(xml_path: Path) -> Dict[str, Any]:
     service information so that callers can easily convert the results into a
     :class:`~reconx.model.SummaryModel` ``Evidence`` object.
 
+    The whole result is built in memory; for large scans use
+    :func:`iter_nmap_hosts` or :func:`iter_nmap_summaries`, which stream.
+
     Parameters
     ----------
     xml_path:
@@ -22,41 +157,4 @@ def parse_nmap_xml(xml_path: Path) -> Dict[str, Any]:
     Dict[str, Any]
         Structured data describing hosts, ports and services.
     """
-
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
-
-    hosts: List[Dict[str, Any]] = []
-    for host in root.findall("host"):
-        addr_elem = host.find("address[@addrtype='ipv4']")
-        if addr_elem is None:
-            # Skip hosts without an IPv4 address
-            continue
-        host_dict: Dict[str, Any] = {"address": addr_elem.get("addr"), "ports": []}
-
-        ports_elem = host.find("ports")
-        if ports_elem is not None:
-            for port in ports_elem.findall("port"):
-                port_dict: Dict[str, Any] = {
-                    "port": int(port.get("portid", 0)),
-                    "proto": port.get("protocol"),
-                }
-
-                state_elem = port.find("state")
-                if state_elem is not None:
-                    port_dict["state"] = state_elem.get("state")
-
-                service_elem = port.find("service")
-                if service_elem is not None:
-                    if service_elem.get("name"):
-                        port_dict["service"] = service_elem.get("name")
-                    if service_elem.get("product"):
-                        port_dict["product"] = service_elem.get("product")
-                    if service_elem.get("version"):
-                        port_dict["version"] = service_elem.get("version")
-
-                host_dict["ports"].append(port_dict)
-
-        hosts.append(host_dict)
-
-    return {"hosts": hosts}
+    return {"hosts": list(iter_nmap_hosts(xml_path))}
@@ -1,17 +1,37 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import List
-from ..utils import jload
-from ..model import SummaryModel
+from typing import Iterator, List
+from ..model import SummaryModel, validate_summaries_json
 
 def load_summaries_from_layers(out_dir: Path, layers: list[int]) -> List[SummaryModel]:
-    results: list[SummaryModel] = []
-    for L in layers:
-        p = out_dir / f"layer{L}" / "summary.json"
-        if p.exists():
-            try:
-                data = jload(p)
-                results.append(SummaryModel.model_validate(data))
-            except Exception:
-                continue
-    return results
+    # Raw bytes go straight to pydantic's JSON validator, all files in one call.
+    blobs = []
+    for p in summary_files(out_dir, layers):
+        try:
+            blobs.append(p.read_bytes())
+        except OSError:
+            continue
+    return [s for s in validate_summaries_json(blobs) if s is not None]
+
+def summary_files(out_dir: Path, layers: list[int]) -> List[Path]:
+    """Layer summaries on disk; per-task summaries live in the state DB's summary store."""
+    paths = [out_dir / f"layer{L}" / "summary.json" for L in layers]
+    return [p for p in paths if p.exists()]
+
+def watermark_key(out_dir: Path, p: Path) -> str:
+    # Path plus mtime/size: a rewritten summary (e.g. a re-run layer) is planned again.
+    st = p.stat()
+    return f"{p.relative_to(out_dir).as_posix()}@{st.st_mtime_ns}:{st.st_size}"
+
+def load_summary(p: Path) -> SummaryModel | None:
+    try:
+        return SummaryModel.model_validate_json(p.read_bytes())
+    except Exception:
+        return None
+
+def iter_summaries(out_dir: Path, layers: list[int]) -> Iterator[SummaryModel]:
+    """Lazily load the layer summaries; unreadable files are skipped."""
+    for p in summary_files(out_dir, layers):
+        s = load_summary(p)
+        if s is not None:
+            yield s
@@ -1 +1 @@
-from .reporter import build_combined_model, render_reports
+from .reporter import build_combined_model, render_reports, stream_reports, iter_combined_rows
@@ -1,12 +1,23 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import List
-from ..model import SummaryModel
-from ..utils import jdump
-from jinja2 import Template
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Mapping, Tuple
+from functools import lru_cache
+from ..model import SummaryModel, EvidenceColumns
+from jinja2 import Environment
 from datetime import datetime
+from array import array
+import json, tempfile
 
-def build_combined_model(out_dir: Path, summaries: List[SummaryModel]) -> dict:
+SECTIONS = ("artifacts", "evidence", "findings", "services")
+
+# Rows copy the models' field dicts (flat scalars, in field order) rather than model_dump()ing them.
+
+def build_combined_model(out_dir: Path, summaries: List[SummaryModel], columnar: bool = False) -> dict:
+    """In-memory report model for ``render_reports``.
+
+    With ``columnar``, evidence and services are read-only row views over one ``EvidenceColumns``
+    instead of a dict per row (the model is then no longer plain JSON).
+    """
     model = {
         "targets": sorted(list({s.target for s in summaries})),
         "services": [],
@@ -14,23 +25,41 @@ def build_combined_model(out_dir: Path, summaries: List[SummaryModel]) -> dict:
         "artifacts": [],
         "evidence": []
     }
+    if columnar:
+        evidence = EvidenceColumns.from_summaries(summaries)
+        services = array("I", (i for i, t in enumerate(evidence.column("type")) if t == "service"))
+        model["evidence"] = evidence.rows(with_target=True)
+        model["services"] = evidence.rows(services, with_target=True)
     for s in summaries:
-        for e in s.evidence:
-            d = e.model_dump()
-            d["target"] = s.target
-            model["evidence"].append(d)
-            if d.get("type") == "service":
-                model["services"].append(d)
+        if not columnar:
+            for e in s.evidence:
+                d = {**e.__dict__, "target": s.target}
+                model["evidence"].append(d)
+                if d.get("type") == "service":
+                    model["services"].append(d)
         for f in s.findings:
-            d = f.model_dump()
-            d["target"] = s.target
+            d = {**f.__dict__, "target": s.target}
             model["findings"].append(d)
         for a in s.artifacts:
-            d = a.model_dump()
-            d["target"] = s.target
+            d = {**a.__dict__, "target": s.target}
             model["artifacts"].append(d)
     return model
 
+def iter_combined_rows(summaries: Iterable[SummaryModel]) -> Iterator[Tuple[str, dict]]:
+    """Lazily yield ``(section, row)`` pairs in the same order ``build_combined_model`` fills them."""
+    for s in summaries:
+        for e in s.evidence:
+            d = {**e.__dict__, "target": s.target}
+            yield "evidence", d
+            if d.get("type") == "service":
+                yield "services", d
+        for f in s.findings:
+            d = {**f.__dict__, "target": s.target}
+            yield "findings", d
+        for a in s.artifacts:
+            d = {**a.__dict__, "target": s.target}
+            yield "artifacts", d
+
 HTML_TEMPLATE = """
 <!doctype html>
 <html><head><meta charset="utf-8"><title>ReconX Combined Report</title>
@@ -78,9 +107,95 @@ code { background: #f5f5f5; padding: 2px 4px; }
 </body></html>
 """
 
+@lru_cache(maxsize=1)
+def _html_template():
+    return Environment().from_string(HTML_TEMPLATE)
+
+def _dumps(row: Mapping) -> str:
+    return json.dumps(row if isinstance(row, dict) else dict(row), sort_keys=True)
+
+class _SpooledModel:
+    """Template-facing model whose sections are re-read from spool files on each access."""
+
+    def __init__(self, targets: List[str], spools: Dict[str, Path]):
+        self.targets = targets
+        self._spools = spools
+
+    def _rows(self, section: str) -> Iterator[dict]:
+        with self._spools[section].open("r", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    services = property(lambda self: self._rows("services"))
+    findings = property(lambda self: self._rows("findings"))
+    artifacts = property(lambda self: self._rows("artifacts"))
+    evidence = property(lambda self: self._rows("evidence"))
+
+def _write_json(path: Path, targets: List[str], lines: Callable[[str], Iterable[str]]) -> None:
+    # Same top-level layout as jdump(model, sort_keys=True), one row per line.
+    with path.open("w", encoding="utf-8") as f:
+        f.write("{")
+        for i, key in enumerate(sorted(SECTIONS + ("targets",))):
+            f.write(",\n" if i else "\n")
+            f.write(f'  {json.dumps(key)}: [')
+            first = True
+            for line in (map(json.dumps, targets) if key == "targets" else lines(key)):
+                f.write("\n    " if first else ",\n    ")
+                f.write(line)
+                first = False
+            f.write("]" if first else "\n  ]")
+        f.write("\n}\n")
+
+def _write_html(path: Path, model) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        for chunk in _html_template().generate(model=model, generated=datetime.utcnow().isoformat()+"Z"):
+            f.write(chunk)
+
+def stream_reports(out_dir: Path, summaries: Iterable[SummaryModel], ndjson: bool = False) -> Dict[str, int]:
+    """Write the combined JSON/HTML reports from a lazy stream of summaries.
+
+    Rows are spooled to per-section temp files in one pass, so memory stays flat as the
+    dataset grows; with ``ndjson`` a ``combined_report.ndjson`` (one row per line, tagged
+    with its ``section``) is written alongside. Returns row counts per section.
+    """
+    combined_dir = out_dir / "combined"
+    combined_dir.mkdir(parents=True, exist_ok=True)
+    counts = {k: 0 for k in SECTIONS}
+    targets = set()
+    with tempfile.TemporaryDirectory(prefix=".report_", dir=combined_dir) as tmp:
+        spools = {k: Path(tmp) / f"{k}.ndjson" for k in SECTIONS}
+        files: Dict[str, IO[str]] = {k: p.open("w", encoding="utf-8") for k, p in spools.items()}
+        nd = (combined_dir / "combined_report.ndjson").open("w", encoding="utf-8") if ndjson else None
+        def tracked() -> Iterator[SummaryModel]:
+            for s in summaries:
+                targets.add(s.target)
+                yield s
+
+        try:
+            for section, row in iter_combined_rows(tracked()):
+                files[section].write(_dumps(row) + "\n")
+                counts[section] += 1
+                if nd is not None:
+                    nd.write(_dumps({"section": section, **row}) + "\n")
+        finally:
+            for f in files.values():
+                f.close()
+            if nd is not None:
+                nd.close()
+
+        def spool_lines(section: str) -> Iterator[str]:
+            with spools[section].open("r", encoding="utf-8") as f:
+                for line in f:
+                    yield line.rstrip("\n")
+
+        target_list = sorted(targets)
+        _write_json(combined_dir / "combined_report.json", target_list, spool_lines)
+        _write_html(combined_dir / "combined_report.html", _SpooledModel(target_list, spools))
+    return counts
+
 def render_reports(out_dir: Path, model: dict) -> None:
     combined_dir = out_dir / "combined"
     combined_dir.mkdir(parents=True, exist_ok=True)
-    jdump(model, combined_dir / "combined_report.json")
-    html = Template(HTML_TEMPLATE).render(model=model, generated=datetime.utcnow().isoformat()+"Z")
-    (combined_dir / "combined_report.html").write_text(html, encoding="utf-8")
+    _write_json(combined_dir / "combined_report.json", model["targets"],
+                lambda section: map(_dumps, model[section]))
+    _write_html(combined_dir / "combined_report.html", model)
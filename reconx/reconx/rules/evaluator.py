@@ -1,6 +1,9 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Iterable
-from ..model import SummaryModel, Action
+from typing import Any, Dict, List, Iterable, Mapping, Optional, Sequence, Tuple
+from functools import lru_cache
+from ..model import SummaryModel, Action, EvidenceColumns, field_view
+from ..utils import sha256_of
+from .index import ItemIndex
 import ast
 
 ALLOWED_NODES = {
@@ -9,73 +12,190 @@ ALLOWED_NODES = {
     ast.Load, ast.Name
 }
 
-def _safe_eval_expr(expr: str, context: dict) -> bool:
-    tree = ast.parse(expr, mode="eval")
-    for node in ast.walk(tree):
-        if not isinstance(node, tuple(ALLOWED_NODES)):
-            raise ValueError(f"Disallowed expression node: {type(node).__name__}")
-        if isinstance(node, ast.Name):
-            if node.id not in context:
+_EVAL_GLOBALS = {"__builtins__": {}}
+
+class Predicate:
+    """A validated, compiled ``match`` expression evaluated against one item's fields."""
+    __slots__ = ("expr", "names", "code", "constraints")
+
+    def __init__(self, expr: str):
+        tree = ast.parse(expr, mode="eval")
+        names = []
+        for node in ast.walk(tree):
+            if not isinstance(node, tuple(ALLOWED_NODES)):
+                raise ValueError(f"Disallowed expression node: {type(node).__name__}")
+            if isinstance(node, ast.Name) and node.id not in names:
+                names.append(node.id)
+        self.expr = expr
+        self.names = tuple(names)
+        self.code = compile(tree, "<match>", "eval")
+        self.constraints = _equality_constraints(tree.body)
+
+    def __call__(self, item: Mapping) -> bool:
+        # A field the item does not have never matches.
+        for n in self.names:
+            if n not in item:
                 return False
-    code = compile(tree, "<match>", "eval")
-    return bool(eval(code, {"__builtins__": {}}, context))
+        return bool(eval(self.code, _EVAL_GLOBALS, item))
 
-def _match_list(expr: str, items: Iterable[dict]) -> List[dict]:
-    matched = []
-    for it in items:
-        ctx = {k: v for k, v in it.items() if isinstance(k, str)}
+def _const_values(node: ast.AST) -> Optional[Tuple]:
+    # Only literal lists/tuples: ``x in 'abc'`` is a substring test, not membership.
+    if isinstance(node, (ast.List, ast.Tuple)) and all(isinstance(e, ast.Constant) for e in node.elts):
+        return tuple(e.value for e in node.elts)
+    return None
+
+def _equality_constraints(body: ast.AST) -> Dict[str, Tuple]:
+    """Field -> allowed values implied by top-level ``and``-ed ``f == c`` / ``f in [...]`` clauses.
+
+    Any item satisfying the expression has one of those values, so an index lookup on them
+    is a safe pre-filter. Clauses under ``or``/``not`` are ignored.
+    """
+    clauses = body.values if isinstance(body, ast.BoolOp) and isinstance(body.op, ast.And) else [body]
+    out: Dict[str, Tuple] = {}
+    for c in clauses:
+        if not (isinstance(c, ast.Compare) and len(c.ops) == 1):
+            continue
+        left, op, right = c.left, c.ops[0], c.comparators[0]
+        if isinstance(op, ast.Eq) and isinstance(right, ast.Name) and isinstance(left, ast.Constant):
+            left, right = right, left
+        if not isinstance(left, ast.Name):
+            continue
+        if isinstance(op, ast.Eq) and isinstance(right, ast.Constant):
+            values = (right.value,)
+        elif isinstance(op, ast.In):
+            values = _const_values(right)
+        else:
+            values = None
+        if values is None:
+            continue
         try:
-            if _safe_eval_expr(expr, ctx):
-                matched.append(it)
-        except Exception:
+            allowed = set(values)
+        except TypeError:
             continue
-    return matched
+        if left.id in out:
+            values = tuple(v for v in out[left.id] if v in allowed)
+        out[left.id] = values
+    return out
 
-def evaluate_rules(rules: List[dict], summaries: List[SummaryModel]) -> List[Action]:
-    actions: List[Action] = []
-    all_evidence: List[dict] = []
-    all_findings: List[dict] = []
-    targets = set()
-    for s in summaries:
-        targets.add(s.target)
-        all_evidence.extend([e.model_dump() for e in s.evidence])
-        all_findings.extend([f.model_dump() for f in s.findings])
+@lru_cache(maxsize=4096)
+def compile_predicate(expr: str) -> Predicate:
+    return Predicate(expr)
+
+def _safe_eval_expr(expr: str, context: dict) -> bool:
+    return compile_predicate(expr)(context)
+
+def split_match(match: str) -> Optional[Tuple[str, str]]:
+    """``"evidence[expr]"`` -> ``("evidence", "expr")``; None for unsupported sources."""
+    for source in ("evidence", "findings"):
+        if match.startswith(source + "[") and match.endswith("]"):
+            return source, match[len(source) + 1:-1]
+    return None
 
+def rule_id(rule: Mapping) -> str:
+    """Stable id of a rule (a hash of its content), carried on the actions it plans so the
+    scheduler can count a rule's ``max_parallel`` across runs and resumes."""
+    return sha256_of(rule)[:16]
+
+def compile_rules(rules: List[dict]) -> List[Tuple[dict, str, Predicate]]:
+    """Validate and compile every rule's ``match`` once; raises ValueError on a bad expression."""
+    compiled = []
     for rule in rules:
         match = (rule or {}).get("match", "")
         then = (rule or {}).get("then", {}) or {}
-        run_list = then.get("run", []) or []
-        if not match or not run_list:
+        if not match or not (then.get("run") or []):
             continue
-
-        matched_items: List[dict] = []
-        if match.startswith("evidence[") and match.endswith("]"):
-            inner = match[len("evidence["):-1]
-            matched_items = _match_list(inner, all_evidence)
-        elif match.startswith("findings[") and match.endswith("]"):
-            inner = match[len("findings["):-1]
-            matched_items = _match_list(inner, all_findings)
-        else:
+        parts = split_match(match)
+        if parts is None:
             continue
+        source, inner = parts
+        try:
+            pred = compile_predicate(inner)
+        except (SyntaxError, ValueError) as ex:
+            raise ValueError(f"Invalid rule match {match!r}: {ex}") from ex
+        compiled.append((rule, source, pred))
+    return compiled
 
-        if not matched_items:
+def _match_list(pred: Predicate, items: Iterable[Mapping]) -> List[Mapping]:
+    matched = []
+    for it in items:
+        try:
+            if pred(it):
+                matched.append(it)
+        except Exception:
             continue
+    return matched
 
-        for tgt in targets:
-            for run in run_list:
-                tool = run.get("tool")
-                w = run.get("with", {}) or {}
-                if not tool:
+class _Placeholders(dict):
+    # Unknown placeholders stay as-is, e.g. http_enum's own ``{s}`` in url_template.
+    def __missing__(self, key: str) -> str:
+        return "{" + key + "}"
+
+def _template_args(w: Mapping[str, Any], item: Mapping, target: str) -> Dict[str, Any]:
+    ctx = _Placeholders(item)
+    ctx["target"] = target
+    out = {}
+    for k, v in w.items():
+        if isinstance(v, str):
+            try:
+                out[k] = v.format_map(ctx)
+            except Exception:
+                out[k] = v
+        else:
+            out[k] = v
+    return out
+
+def _freeze(v: Any) -> Any:
+    if isinstance(v, dict):
+        return tuple(sorted((k, _freeze(x)) for k, x in v.items()))
+    if isinstance(v, (list, tuple)):
+        return tuple(_freeze(x) for x in v)
+    return v
+
+def evaluate_rules(rules: List[dict], summaries: Iterable[SummaryModel]) -> List[Action]:
+    """Plan one action per distinct (tool, target, templated args).
+
+    Each matched evidence/finding item is templated against its own summary's target,
+    and duplicates are dropped while planning. ``summaries`` is consumed once: evidence is
+    copied into compact ``EvidenceColumns``, so a lazy stream need not stay in memory.
+    """
+    actions: List[Action] = []
+    seen: set = set()
+    evidence = EvidenceColumns()
+    findings: List[Mapping] = []
+    finding_owners: List[str] = []
+    for s in summaries:
+        evidence.extend(s.evidence, s.target)
+        for f in s.findings:
+            findings.append(field_view(f))
+            finding_owners.append(s.target)
+    items: Dict[str, Sequence[Mapping]] = {"evidence": evidence, "findings": findings}
+    owners: Dict[str, Sequence[str]] = {"evidence": evidence.column("target"), "findings": finding_owners}
+
+    indexes = {src: ItemIndex(rows) for src, rows in items.items()}
+    for rule, source, pred in compile_rules(rules):
+        then = rule.get("then", {}) or {}
+        run_list = [r for r in (then.get("run", []) or []) if r.get("tool")]
+        rule_parallel = then.get("max_parallel")
+        rid = rule_id(rule)
+        rows, tgts = items[source], owners[source]
+        for pos in indexes[source].candidate_positions(pred.constraints):
+            it = rows[pos]
+            try:
+                if not pred(it):
                     continue
-                it = matched_items[0]
-                templated_args = {}
-                for k, v in w.items():
-                    if isinstance(v, str):
-                        try:
-                            templated_args[k] = v.format(target=tgt, **it)
-                        except Exception:
-                            templated_args[k] = v
-                    else:
-                        templated_args[k] = v
-                actions.append(Action(tool=tool, args=templated_args, target=tgt, priority=5))
+            except Exception:
+                continue
+            tgt = tgts[pos]
+            for run in run_list:
+                tool = run["tool"]
+                templated_args = _template_args(run.get("with", {}) or {}, it, tgt)
+                try:
+                    key = (tool, tgt, _freeze(templated_args))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                except TypeError:
+                    pass
+                actions.append(Action(tool=tool, args=templated_args, target=tgt, priority=5,
+                                      max_parallel=run.get("max_parallel", rule_parallel), rule=rid))
     return actions
@@ -0,0 +1,68 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Fields rules commonly filter on by equality; postings are built lazily on first use.
+INDEXED_FIELDS = frozenset({"type", "service", "port", "proto", "id", "severity"})
+
+_UNINDEXABLE = object()
+
+class ItemIndex:
+    """Hash index over a list of evidence/finding dicts, keyed by field value.
+
+    ``candidates`` narrows the rows a predicate has to look at using its equality and
+    ``in [...]`` constraints; rows are returned in their original order. Postings for an
+    ``EvidenceColumns`` are built from its columns rather than row by row.
+    """
+
+    def __init__(self, items: Sequence[Mapping]):
+        self.items = items
+        self._postings: Dict[str, Any] = {}
+
+    def _field(self, field: str):
+        post = self._postings.get(field)
+        if post is None:
+            post = {}
+            if hasattr(self.items, "column"):
+                # Columnar rows all have the same scalar fields.
+                for i, v in enumerate(self.items.column(field) if field in self.items.fields else ()):
+                    post.setdefault(v, []).append(i)
+                self._postings[field] = post
+                return post
+            for i, it in enumerate(self.items):
+                if field not in it:
+                    continue
+                try:
+                    post.setdefault(it[field], []).append(i)
+                except TypeError:
+                    # Unhashable value somewhere in this field: fall back to scanning.
+                    post = _UNINDEXABLE
+                    break
+            self._postings[field] = post
+        return post
+
+    def positions(self, field: str, values: Tuple) -> Optional[List[int]]:
+        post = self._field(field)
+        if post is _UNINDEXABLE:
+            return None
+        out: List[int] = []
+        for v in values:
+            out.extend(post.get(v, ()))
+        return out
+
+    def candidate_positions(self, constraints: Mapping[str, Tuple]) -> Sequence[int]:
+        # The predicate re-checks every clause, so the most selective posting list is enough.
+        best: Optional[List[int]] = None
+        for field, values in constraints.items():
+            if field not in INDEXED_FIELDS:
+                continue
+            pos = self.positions(field, values)
+            if pos is not None and (best is None or len(pos) < len(best)):
+                best = pos
+                if not best:
+                    return []
+        if best is None:
+            return range(len(self.items))
+        return sorted(set(best))
+
+    def candidates(self, constraints: Mapping[str, Tuple]) -> Sequence[Mapping]:
+        return [self.items[i] for i in self.candidate_positions(constraints)]
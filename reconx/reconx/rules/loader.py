@@ -2,6 +2,7 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any, List, Dict
 from ruamel.yaml import YAML
+from .evaluator import compile_rules
 
 def load_rules(path: Path) -> List[Dict[str, Any]]:
     yaml = YAML(typ="safe")
@@ -9,4 +10,6 @@ def load_rules(path: Path) -> List[Dict[str, Any]]:
         data = yaml.load(f) or []
     if not isinstance(data, list):
         raise ValueError("rules.yaml must be a list of rule objects")
+    # Fail at load time on bad match expressions; also warms the predicate cache.
+    compile_rules(data)
     return data
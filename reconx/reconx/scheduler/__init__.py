@@ -1 +1,17 @@
-from .scheduler import plan_actions, run_scheduler
+from __future__ import annotations
+import importlib
+
+DEFAULT_LEASE_SECONDS = 120.0
+
+# The scheduler pulls in the state DB, the adapters and the result cache; load it on first use
+# (PEP 562) so planning-only callers don't pay for it.
+_LAZY = {"plan_actions": ".planning", "run_scheduler": ".scheduler"}
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+__all__ = ["DEFAULT_LEASE_SECONDS", *_LAZY]
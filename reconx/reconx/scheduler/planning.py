@@ -0,0 +1,9 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable, List
+from ..model import SummaryModel
+from ..rules import evaluate_rules
+
+def plan_actions(out_dir: Path, summaries: Iterable[SummaryModel], rules: List[dict]):
+    actions = evaluate_rules(rules, summaries)
+    return actions
@@ -0,0 +1,122 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+import threading, time
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate`` tokens per second.
+
+    ``burst`` is the bucket capacity; the default of 1 spaces starts exactly ``1/rate`` apart.
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self._clock = clock
+        self._tokens = self.capacity
+        self._stamp = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until ``tokens`` are available (0.0 if available now)."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+class RateLimiter:
+    """Global bucket plus one bucket per target; a start needs a token from both.
+
+    Either rate may be 0 to disable that level.
+    """
+
+    def __init__(self, rate_per_sec: float = 0.0, per_target_rate: float = 0.0, burst: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._burst = burst
+        self.per_target_rate = per_target_rate
+        self.global_bucket: Optional[TokenBucket] = TokenBucket(rate_per_sec, burst, clock) if rate_per_sec > 0 else None
+        self._targets: Dict[str, TokenBucket] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.global_bucket is not None or self.per_target_rate > 0
+
+    def _target_bucket(self, target: str) -> Optional[TokenBucket]:
+        if self.per_target_rate <= 0:
+            return None
+        with self._lock:
+            b = self._targets.get(target)
+            if b is None:
+                b = self._targets[target] = TokenBucket(self.per_target_rate, self._burst, self._clock)
+            return b
+
+    def global_wait(self) -> float:
+        return self.global_bucket.wait_time() if self.global_bucket else 0.0
+
+    def target_wait(self, target: str) -> float:
+        b = self._target_bucket(target)
+        return b.wait_time() if b else 0.0
+
+    def try_acquire(self, target: str) -> bool:
+        """Take one token from the target and global buckets, or neither."""
+        b = self._target_bucket(target)
+        buckets = [x for x in (b, self.global_bucket) if x is not None]
+        with self._lock:
+            if any(x.wait_time() > 0 for x in buckets):
+                return False
+            for x in buckets:
+                x.try_acquire()
+            return True
+
+class RoundRobin:
+    """Orders pending tasks so targets take turns, least recently served first.
+
+    Priority still wins: targets only interleave within the same priority.
+    """
+
+    def __init__(self, key: str = "target"):
+        self.key = key
+        self._served: "OrderedDict[str, None]" = OrderedDict()
+
+    def order(self, tasks: Iterable[dict]) -> List[dict]:
+        bands: Dict[int, Dict[str, List[dict]]] = {}
+        for t in tasks:
+            bands.setdefault(t.get("priority", 5), {}).setdefault(t[self.key], []).append(t)
+        # Targets never served go first (in queue order), then by how long ago they were served.
+        served_rank = {k: i for i, k in enumerate(self._served)}
+        out: List[dict] = []
+        for prio in sorted(bands):
+            groups = bands[prio]
+            keys = sorted(groups, key=lambda k: served_rank.get(k, -1))
+            depth = max(len(v) for v in groups.values())
+            for i in range(depth):
+                for k in keys:
+                    if i < len(groups[k]):
+                        out.append(groups[k][i])
+        return out
+
+    def mark(self, task: dict) -> None:
+        k = task[self.key]
+        self._served.pop(k, None)
+        self._served[k] = None
+
+    @property
+    def cursor(self) -> Optional[str]:
+        """The most recently served key, where the next scan over all keys should resume."""
+        return next(reversed(self._served), None)
@@ -1,49 +1,220 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Set
+from collections import Counter
 from datetime import datetime, timedelta
-from ..model import SummaryModel, Action, Result
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+import os, socket, time, uuid
+from . import DEFAULT_LEASE_SECONDS
+from .ratelimit import RateLimiter, RoundRobin
+from ..model import Action, Result
 from ..rules import evaluate_rules
-from ..utils import append_ndjson, append_timeline, utcnow_iso, jdump
-from ..state import init_db, upsert_task, get_pending, set_status
-from ..adapters import run_action
+from ..utils import append_ndjson, append_timeline, utcnow_iso
+from ..state import (init_db, upsert_tasks, get_pending_heads, set_statuses, claim_tasks, heartbeat, reclaim_expired,
+                     mark_processed, append_summaries, summary_key, cap_group)
+from ..adapters import ProbeLoop
+from ..cache import ResultCache
 
-def plan_actions(out_dir: Path, summaries: List[SummaryModel], rules: List[dict]):
-    actions = evaluate_rules(rules, summaries)
-    return actions
+def _task_action(t: dict) -> Action:
+    return Action(tool=t["tool"], args=t["args"], target=t["target"], priority=t["priority"])
+
+def _execute_task(probes: ProbeLoop, t: dict, out_dir: Path, timeout_per_task: int,
+                  cached: Optional[Result] = None) -> Future:
+    # Probes run on the shared loop (other tools on its worker threads); planning, state and
+    # log writes stay on the dispatcher thread.
+    if cached is None:
+        return probes.submit(_task_action(t), out_dir, timeout_per_task)
+    fut: Future = Future()
+    fut.set_result(cached)
+    return fut
+
+def _task_group(t: dict) -> Optional[str]:
+    # A task's own max_parallel (from its rule) counts running tasks of its rule and tool only.
+    return cap_group(t) if t.get("max_parallel") else None
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
 
 def run_scheduler(out_dir: Path,
                   planned_actions: List[Action],
                   time_budget_minutes: int,
                   max_parallel: int,
                   timeout_per_task: int,
-                  rate_per_sec: float) -> None:
+                  rate_per_sec: float,
+                  tool_limits: Optional[Dict[str, int]] = None,
+                  per_target_rate: float = 0.0,
+                  lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                  rules: Optional[List[dict]] = None,
+                  cache: Optional[ResultCache] = None) -> dict:
+    """Drain the task queue in ``out_dir/_state.sqlite``.
+
+    Finished tasks' summaries go to the state DB's summary store. With ``rules``, each one is
+    also planned incrementally, the resulting actions are queued in the same run, and the
+    stored summary is recorded as processed.
+
+    Several schedulers (threads or processes) may share one state DB: tasks are claimed
+    atomically under a lease that is renewed while they run, and leases left behind by a
+    crashed worker are reclaimed. Tool caps and rate limits apply per scheduler. ``tool_limits``
+    caps every task of a tool; a task's ``max_parallel`` caps the running tasks planned by the same
+    rule for the same tool, so uncapped tasks of that tool are not held back by it.
+
+    With ``cache``, a probe whose ``(tool, args, target)`` has an unexpired cached ``Result`` is
+    completed from the cache without running its adapter; fresh probe results are stored.
+    """
     db = init_db(out_dir / "_state.sqlite")
-    for a in planned_actions:
-        upsert_task(db, a.tool, a.args, a.target, priority=a.priority)
+    upsert_tasks(db, planned_actions)
+    tool_limits = {k: int(v) for k, v in (tool_limits or {}).items() if v}
+    limiter = RateLimiter(rate_per_sec or 0.0, per_target_rate or 0.0)
+    rr = RoundRobin()
+    me = worker_id()
+    hb_every = max(lease_seconds / 3.0, 0.05)
 
+    max_parallel = max(1, int(max_parallel or 1))
     end_time = datetime.utcnow() + timedelta(minutes=time_budget_minutes)
-    append_timeline(out_dir / "_timeline.txt", f"Scheduler start; budget={time_budget_minutes}m")
+    reclaimed = reclaim_expired(db)
+    append_timeline(out_dir / "_timeline.txt",
+                    f"Scheduler start; worker={me} budget={time_budget_minutes}m parallel={max_parallel} reclaimed={reclaimed}")
     log_path = out_dir / "_master_log.ndjson"
+    in_flight: Dict[Future, dict] = {}
+    running_by_tool: Counter = Counter()
+    # Running tasks per cap group (None for tasks without max_parallel) and each group's cap.
+    running_by_group: Counter = Counter()
+    group_caps: Dict[str, int] = {}
+    # Task id -> monotonic time it was first held back by the rate limiter.
+    throttled_since: Dict[int, float] = {}
+    stats = {"done": 0, "error": 0, "planned": 0, "rate_wait_s": 0.0, "reclaimed": reclaimed}
+    if cache is not None:
+        stats.update(cache_hit=0, cache_miss=0)
+    # Task id -> cached Result (None on a miss), looked up once per task before rate limiting;
+    # hits skip the limiter and the adapter.
+    cached: Dict[int, Optional[Result]] = {}
+    next_beat = time.monotonic() + hb_every
 
-    while datetime.utcnow() < end_time:
-        pending = get_pending(db, limit=max_parallel)
-        if not pending:
-            break
-        for t in pending:
-            set_status(db, t["id"], "running")
-            append_ndjson(log_path, {"ts": utcnow_iso(), "event": "task_start", "task": t})
-            try:
-                action = Action(tool=t["tool"], args=t["args"], target=t["target"], priority=t["priority"])
-                res: Result = run_action(action, out_dir, timeout_per_task)
-                idx_path = out_dir / "combined" / f"summary_{t['id']}_{int(datetime.utcnow().timestamp())}.json"
-                jdump(res.summary.model_dump(), idx_path)
-                set_status(db, t["id"], "done", logs_path=res.logs)
-                append_ndjson(log_path, {"ts": utcnow_iso(), "event":"task_done", "task_id": t["id"], "logs": res.logs})
-            except Exception as ex:
-                set_status(db, t["id"], "error")
-                append_ndjson(log_path, {"ts": utcnow_iso(), "event":"task_error", "task_id": t["id"], "error": str(ex)})
-            if rate_per_sec and rate_per_sec > 0:
-                import time
-                time.sleep(1.0 / rate_per_sec)
-    append_timeline(out_dir / "_timeline.txt", "Scheduler end")
+    with ProbeLoop(max_parallel) as probes:
+        while True:
+            # Refill free slots; claimed tasks are running and no longer returned as pending.
+            # A tool or a rule's cap group at its cap, or a target out of tokens, is excluded from the
+            # next query so other work can take the slot. An empty global bucket stops the refill outright.
+            blocked_tools = {tool for tool, cap in tool_limits.items() if running_by_tool[tool] >= cap}
+            blocked_groups = {g for g, n in running_by_group.items() if g is not None and n >= group_caps[g]}
+            blocked_targets: Set[str] = set()
+            wake: Optional[float] = None
+            throttled = False
+            while not throttled and len(in_flight) < max_parallel and datetime.utcnow() < end_time:
+                # One head task per target, resuming after the last target served, so a target
+                # with a long queue gets one turn per rotation rather than every slot.
+                batch = get_pending_heads(db, limit=max(4 * (max_parallel - len(in_flight)), 32),
+                                          exclude_tools=blocked_tools, exclude_targets=blocked_targets,
+                                          after_target=rr.cursor, exclude_groups=blocked_groups)
+                if not batch:
+                    break
+                selected: List[dict] = []
+                for t in rr.order(batch):
+                    if len(in_flight) + len(selected) >= max_parallel:
+                        break
+                    group = _task_group(t)
+                    if t["tool"] in blocked_tools or t["target"] in blocked_targets or group in blocked_groups:
+                        continue
+                    cap = tool_limits.get(t["tool"])
+                    if cap and running_by_tool[t["tool"]] >= cap:
+                        blocked_tools.add(t["tool"])
+                        continue
+                    if group is not None and running_by_group[group] >= t["max_parallel"]:
+                        blocked_groups.add(group)
+                        continue
+                    if cache is not None and cache.cacheable(t["tool"]) and t["id"] not in cached:
+                        cached[t["id"]] = cache.get(_task_action(t))
+                    hit = cached.get(t["id"]) is not None
+                    if not hit and limiter.enabled and not limiter.try_acquire(t["target"]):
+                        throttled_since.setdefault(t["id"], time.monotonic())
+                        gw = limiter.global_wait()
+                        if gw > 0:
+                            wake, throttled = gw, True
+                            break
+                        blocked_targets.add(t["target"])
+                        tw = limiter.target_wait(t["target"])
+                        wake = tw if wake is None else min(wake, tw)
+                        continue
+                    running_by_tool[t["tool"]] += 1
+                    running_by_group[group] += 1
+                    if group is not None:
+                        group_caps[group] = t["max_parallel"]
+                    selected.append(t)
+                # Another worker may have claimed some of these since the query; skip those.
+                claimed = claim_tasks(db, [t["id"] for t in selected], me, lease_seconds)
+                for t in selected:
+                    if t["id"] not in claimed:
+                        running_by_tool[t["tool"]] -= 1
+                        running_by_group[_task_group(t)] -= 1
+                        cached.pop(t["id"], None)
+                        continue
+                    now = time.monotonic()
+                    waited = now - throttled_since.pop(t["id"], now)
+                    stats["rate_wait_s"] += waited
+                    hit = None
+                    if t["id"] in cached:
+                        hit = cached.pop(t["id"])
+                        t["cached"] = hit is not None
+                        stats["cache_hit" if hit is not None else "cache_miss"] += 1
+                    # dict() of a TaskRow leaves out args until they are decoded.
+                    append_ndjson(log_path, {"ts": utcnow_iso(), "event": "task_start", "task": dict(t, args=t["args"]),
+                                             "worker": me, "rate_wait_s": round(waited, 3)})
+                    in_flight[_execute_task(probes, t, out_dir, timeout_per_task, hit)] = t
+                    rr.mark(t)
+            if time.monotonic() >= next_beat:
+                heartbeat(db, [t["id"] for t in in_flight.values()], me, lease_seconds)
+                stats["reclaimed"] += reclaim_expired(db)
+                next_beat = time.monotonic() + hb_every
+            beat_in = max(next_beat - time.monotonic(), 0.0)
+            if not in_flight:
+                if wake is None:
+                    break
+                time.sleep(min(wake, beat_in))
+                continue
+            done, _ = wait(in_flight, timeout=beat_in if wake is None else min(wake, beat_in),
+                           return_when=FIRST_COMPLETED)
+            finished, follow_ups, results, fresh, planned_ok = [], [], [], [], []
+            for fut in done:
+                t = in_flight.pop(fut)
+                running_by_tool[t["tool"]] -= 1
+                running_by_group[_task_group(t)] -= 1
+                try:
+                    res = fut.result()
+                except Exception as ex:
+                    finished.append((t["id"], "error", None))
+                    stats["error"] += 1
+                    append_ndjson(log_path, {"ts": utcnow_iso(), "event":"task_error", "task_id": t["id"], "error": str(ex)})
+                    continue
+                finished.append((t["id"], "done", res.logs))
+                results.append((t["id"], res.summary))
+                if t.get("cached") is False:
+                    fresh.append((_task_action(t), res))
+                stats["done"] += 1
+                # Only this task's new evidence goes through the rules; matches join the queue right
+                # away. A planning failure leaves the probe done and its summary stored, unprocessed.
+                planned: List[Action] = []
+                if rules:
+                    try:
+                        planned = evaluate_rules(rules, [res.summary])
+                        planned_ok.append(len(results) - 1)
+                    except Exception as ex:
+                        append_ndjson(log_path, {"ts": utcnow_iso(), "event": "plan_error", "task_id": t["id"],
+                                                 "error": str(ex)})
+                follow_ups.extend(planned)
+                append_ndjson(log_path, {"ts": utcnow_iso(), "event":"task_done", "task_id": t["id"], "logs": res.logs,
+                                         "planned": len(planned), "cached": bool(t.get("cached"))})
+            # Follow-ups are queued before the next refill; existing tasks are ignored by hash.
+            upsert_tasks(db, follow_ups)
+            stats["planned"] += len(follow_ups)
+            summary_ids = append_summaries(db, results)
+            if fresh:
+                cache.put_many(fresh)
+            set_statuses(db, finished, worker=me)
+            if rules:
+                mark_processed(db, [summary_key(summary_ids[i]) for i in planned_ok])
+    stats["rate_wait_s"] = round(stats["rate_wait_s"], 3)
+    hits = f" cache_hit={stats['cache_hit']} cache_miss={stats['cache_miss']}" if cache is not None else ""
+    append_timeline(out_dir / "_timeline.txt",
+                    f"Scheduler end; worker={me} done={stats['done']} error={stats['error']} "
+                    f"planned={stats['planned']} rate_wait={stats['rate_wait_s']}s{hits}")
+    return stats
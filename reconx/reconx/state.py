@@ -1,10 +1,10 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Optional, List
+from typing import Iterable, Iterator, Optional, List, Tuple, Union
 from datetime import datetime
-from sqlalchemy import create_engine
-from sqlalchemy.engine import Engine
+import time
 import json
+from .db import StateBackend, SQLiteBackend, SQLAlchemyBackend, backend_name
 from .utils import sha256_of
 
 SCHEMA = """    CREATE TABLE IF NOT EXISTS tasks (
@@ -16,47 +16,299 @@ SCHEMA = """    CREATE TABLE IF NOT EXISTS tasks (
     priority INTEGER NOT NULL,
     status TEXT NOT NULL,
     logs_path TEXT,
+    max_parallel INTEGER,
+    rule TEXT,
+    worker TEXT,
+    lease_expires REAL,
+    heartbeat_at REAL,
     created_at TEXT NOT NULL,
     updated_at TEXT NOT NULL
 );
 CREATE INDEX IF NOT EXISTS idx_tasks_status_priority ON tasks(status, priority);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_priority_target ON tasks(status, priority, target);
+CREATE TABLE IF NOT EXISTS watermarks (
+    key TEXT PRIMARY KEY,
+    processed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS summaries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id INTEGER,
+    layer INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    body TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_summaries_target_layer ON summaries(target, layer);
+CREATE INDEX IF NOT EXISTS idx_summaries_task ON summaries(task_id);
+"""
+
+# Columns added after the first release; older state DBs are upgraded in place.
+ADDED_COLUMNS = {
+    "max_parallel": "INTEGER",
+    "rule": "TEXT",
+    "worker": "TEXT",
+    "lease_expires": "REAL",
+    "heartbeat_at": "REAL",
+}
+
+def _migrate(con) -> None:
+    have = {r[1] for r in con.exec_driver_sql("PRAGMA table_info(tasks)")}
+    for col, decl in ADDED_COLUMNS.items():
+        if col not in have:
+            con.exec_driver_sql(f"ALTER TABLE tasks ADD COLUMN {col} {decl}")
+
+# Applied to every pooled connection. WAL lets readers run alongside the single writer and,
+# with synchronous=NORMAL, fsyncs only at checkpoints instead of on every commit.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=30000",
+)
+
+# SQLite's default host-parameter limit is 999 on older builds.
+_IN_CHUNK = 500
+
+def _apply_pragmas(dbapi_con, _record) -> None:
+    cur = dbapi_con.cursor()
+    for p in PRAGMAS:
+        cur.execute(p)
+    cur.close()
+
+# Probe results shared across runs (see ``reconx.cache``); lives in its own DB file by default.
+CACHE_SCHEMA = """    CREATE TABLE IF NOT EXISTS result_cache (
+    hash TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    body TEXT NOT NULL,
+    stored_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_result_cache_tool ON result_cache(tool);
 """
 
-def init_db(db_path: Path) -> Engine:
-    eng = create_engine(f"sqlite:///{db_path}", future=True)
+def open_backend(db: Union[Path, str], backend: Optional[str] = None) -> StateBackend:
+    """A backend for a SQLite file, or a SQLAlchemy ``sqlite:`` URL (``"sqlite:///state.db"``).
+
+    Files use ``backend`` (``"sqlite3"`` by default, see ``db.backend_name``); URLs always go
+    through SQLAlchemy. The state SQL is SQLite's dialect (``AUTOINCREMENT``, ``PRAGMA``,
+    ``INSERT OR IGNORE``, ``UPDATE ... RETURNING``), so URLs for other databases are rejected.
+    """
+    if isinstance(db, str) and "://" in db:
+        scheme = db.split("://", 1)[0]
+        if scheme.split("+", 1)[0] != "sqlite":
+            raise ValueError(f"Unsupported state DB URL {db!r}: only sqlite: URLs are supported")
+        return SQLAlchemyBackend(db, on_connect=_apply_pragmas)
+    if backend_name(backend) == "sqlalchemy":
+        # Pooled connections may be checked out from worker threads; each carries its own pragmas.
+        return SQLAlchemyBackend(f"sqlite:///{db}", on_connect=_apply_pragmas,
+                                 connect_args={"check_same_thread": False, "timeout": 30})
+    return SQLiteBackend(db, pragmas=PRAGMAS)
+
+def _create(eng: StateBackend, schema: str) -> None:
     with eng.begin() as con:
-        con.exec_driver_sql(SCHEMA)
+        # sqlite3 only executes one statement per call
+        for stmt in schema.split(";"):
+            if stmt.strip():
+                con.exec_driver_sql(stmt)
+
+def init_db(db_path: Union[Path, str], backend: Optional[str] = None) -> StateBackend:
+    eng = open_backend(db_path, backend)
+    _create(eng, SCHEMA)
+    with eng.begin() as con:
+        _migrate(con)
     return eng
 
+def init_cache_db(db_path: Union[Path, str], backend: Optional[str] = None) -> StateBackend:
+    if not (isinstance(db_path, str) and "://" in db_path):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    eng = open_backend(db_path, backend)
+    _create(eng, CACHE_SCHEMA)
+    return eng
+
+class TaskRow(dict):
+    """A ``tasks`` row as a dict. ``args`` is decoded from ``args_json`` on first access, so rows
+    the caller only filters on never pay for ``json.loads``."""
+
+    __slots__ = ("_args_json",)
+
+    def __missing__(self, key):
+        if key != "args":
+            raise KeyError(key)
+        value = self["args"] = json.loads(self._args_json)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return key == "args" or dict.__contains__(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+def _task_rows(res) -> List[TaskRow]:
+    # Queries select args_json last; zip() stops before it.
+    cols = list(res.keys())[:-1]
+    out = []
+    for r in res:
+        row = TaskRow(zip(cols, r))
+        row._args_json = r[-1]
+        out.append(row)
+    return out
+
 def task_hash(tool: str, args: dict, target: str) -> str:
     return sha256_of({"tool": tool, "args": args, "target": target})
 
-def upsert_task(eng: Engine, tool: str, args: dict, target: str, priority: int = 5) -> int | None:
+def upsert_task(eng: StateBackend, tool: str, args: dict, target: str, priority: int = 5,
+                max_parallel: Optional[int] = None, rule: Optional[str] = None) -> int | None:
     h = task_hash(tool, args, target)
     now = datetime.utcnow().isoformat() + "Z"
     args_json = json.dumps(args, sort_keys=True)
     with eng.begin() as con:
         con.exec_driver_sql(
-            "INSERT OR IGNORE INTO tasks(hash, tool, args_json, target, priority, status, created_at, updated_at) "
-            "VALUES (?, ?, ?, ?, ?, 'pending', ?, ?)",
-            (h, tool, args_json, target, priority, now, now)
+            "INSERT OR IGNORE INTO tasks(hash, tool, args_json, target, priority, status, max_parallel, rule, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?)",
+            (h, tool, args_json, target, priority, max_parallel, rule, now, now)
         )
         row = con.exec_driver_sql("SELECT id FROM tasks WHERE hash = ?", (h,)).first()
         return int(row[0]) if row else None
 
-def get_pending(eng: Engine, limit: int = 100) -> List[dict]:
+def _not_in(col: str, values: list) -> Tuple[str, tuple]:
+    # One JSON parameter however many values: the exclusion lists are not bounded by _IN_CHUNK.
+    if not values:
+        return "", ()
+    return f"AND {col} NOT IN (SELECT value FROM json_each(?)) ", (json.dumps(values),)
+
+def upsert_tasks(eng: StateBackend, actions: Iterable) -> List[int | None]:
+    """Insert many ``Action``-like objects in one transaction; returns their ids in input order."""
+    now = datetime.utcnow().isoformat() + "Z"
+    rows, hashes = [], []
+    for a in actions:
+        h = task_hash(a.tool, a.args, a.target)
+        hashes.append(h)
+        rows.append((h, a.tool, json.dumps(a.args, sort_keys=True), a.target, a.priority,
+                     getattr(a, "max_parallel", None), getattr(a, "rule", None), now, now))
+    if not rows:
+        return []
+    ids = {}
+    with eng.begin() as con:
+        con.exec_driver_sql(
+            "INSERT OR IGNORE INTO tasks(hash, tool, args_json, target, priority, status, max_parallel, rule, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?)",
+            rows
+        )
+        uniq = list(dict.fromkeys(hashes))
+        for i in range(0, len(uniq), _IN_CHUNK):
+            chunk = uniq[i:i + _IN_CHUNK]
+            res = con.exec_driver_sql(
+                f"SELECT hash, id FROM tasks WHERE hash IN ({','.join('?' * len(chunk))})", tuple(chunk)
+            )
+            ids.update((h, int(tid)) for h, tid in res)
+    return [ids.get(h) for h in hashes]
+
+def get_pending(eng: StateBackend, limit: int = 100, exclude_tools: Iterable[str] = (),
+                exclude_targets: Iterable[str] = ()) -> List[dict]:
+    (tools, p1), (targets, p2) = _not_in("tool", list(exclude_tools)), _not_in("target", list(exclude_targets))
     with eng.begin() as con:
         res = con.exec_driver_sql(
-            "SELECT id, hash, tool, args_json, target, priority, status FROM tasks "
-            "WHERE status IN ('pending') ORDER BY priority ASC, id ASC LIMIT ?", (limit,)
+            "SELECT id, hash, tool, target, priority, status, max_parallel, rule, args_json FROM tasks "
+            f"WHERE status IN ('pending') {tools}{targets}ORDER BY priority ASC, id ASC LIMIT ?",
+            (*p1, *p2, limit)
         )
-        rows = [dict(r._mapping) for r in res]
-        for r in rows:
-            r["args"] = json.loads(r["args_json"])
-            del r["args_json"]
+        return _task_rows(res)
+
+def cap_group(task: dict) -> str:
+    """Key under which a task's ``max_parallel`` counts running tasks: its rule and tool, or just
+    the tool for a capped task no rule planned (a missing or empty rule)."""
+    return f"{task['rule']}/{task['tool']}" if task.get("rule") else task["tool"]
+
+# SQL form of ``cap_group``; the two must agree or blocked groups are never excluded.
+_CAP_GROUP = "coalesce(nullif(rule, '') || '/', '') || tool"
+
+# Loose index scan over idx_tasks_status_priority_target: each step seeks the next target with a
+# pending task in the band, then that target's oldest such task. ?1-?3 are the JSON exclusion lists
+# (tools, targets, cap groups; the last only applies to capped tasks), ?4 the priority, ?5 the
+# target to start after, ?6 the number of targets.
+_EXCLUDE = ("AND tool NOT IN (SELECT value FROM json_each(?1)) "
+            "AND target NOT IN (SELECT value FROM json_each(?2)) "
+            f"AND (max_parallel IS NULL OR {_CAP_GROUP} NOT IN (SELECT value FROM json_each(?3)))")
+_HEADS_SQL = f"""WITH RECURSIVE heads(target) AS (
+    SELECT (SELECT MIN(target) FROM tasks WHERE status = 'pending' AND priority = ?4 AND target {{op}} ?5 {_EXCLUDE})
+    UNION ALL
+    SELECT (SELECT MIN(target) FROM tasks WHERE status = 'pending' AND priority = ?4 AND target > heads.target {_EXCLUDE})
+    FROM heads WHERE heads.target IS NOT NULL LIMIT ?6)
+SELECT t.id, t.hash, t.tool, t.target, t.priority, t.status, t.max_parallel, t.rule, t.args_json
+FROM heads JOIN tasks t ON t.id = (SELECT id FROM tasks WHERE status = 'pending' AND priority = ?4
+                                   AND target = heads.target {_EXCLUDE} ORDER BY id LIMIT 1)"""
+
+def get_pending_heads(eng: StateBackend, limit: int = 100, exclude_tools: Iterable[str] = (),
+                      exclude_targets: Iterable[str] = (), after_target: Optional[str] = None,
+                      exclude_groups: Iterable[str] = ()) -> List[dict]:
+    """The oldest pending task of up to ``limit`` targets, one task per target.
+
+    Only the best pending priority is considered. Targets are taken in name order starting after
+    ``after_target`` and wrapping around, so a caller passing the last target it served cycles
+    through every target however many tasks each one has queued. ``exclude_groups`` leaves out
+    capped tasks whose ``cap_group`` is listed; uncapped tasks of the same tool still qualify.
+    """
+    excl = (json.dumps(list(exclude_tools)), json.dumps(list(exclude_targets)), json.dumps(list(exclude_groups)))
+    with eng.begin() as con:
+        prio = con.exec_driver_sql(
+            f"SELECT MIN(priority) FROM tasks WHERE status = 'pending' {_EXCLUDE}", excl).scalar()
+        if prio is None:
+            return []
+        if after_target is None:
+            return _task_rows(con.exec_driver_sql(_HEADS_SQL.format(op=">="), (*excl, prio, "", limit)))
+        rows = _task_rows(con.exec_driver_sql(_HEADS_SQL.format(op=">"), (*excl, prio, after_target, limit)))
+        if len(rows) < limit:
+            wrapped = _task_rows(con.exec_driver_sql(_HEADS_SQL.format(op=">="), (*excl, prio, "", limit)))
+            rows += [r for r in wrapped if r["target"] <= after_target][:limit - len(rows)]
         return rows
 
-def set_status(eng: Engine, task_id: int, status: str, logs_path: Optional[str] = None) -> None:
+def claim_tasks(eng: StateBackend, task_ids: Iterable[int], worker: str, lease_seconds: float) -> set[int]:
+    """Atomically move pending tasks to running under ``worker``'s lease.
+
+    Returns the ids actually claimed; ids another worker got first are left out.
+    """
+    task_ids = list(task_ids)
+    if not task_ids:
+        return set()
+    now = time.time()
+    stamp = datetime.utcnow().isoformat() + "Z"
+    claimed: set[int] = set()
+    with eng.begin() as con:
+        for i in range(0, len(task_ids), _IN_CHUNK):
+            chunk = task_ids[i:i + _IN_CHUNK]
+            res = con.exec_driver_sql(
+                "UPDATE tasks SET status = 'running', worker = ?, lease_expires = ?, heartbeat_at = ?, updated_at = ? "
+                f"WHERE status = 'pending' AND id IN ({','.join('?' * len(chunk))}) RETURNING id",
+                (worker, now + lease_seconds, now, stamp, *chunk)
+            )
+            claimed.update(int(r[0]) for r in res)
+    return claimed
+
+def heartbeat(eng: StateBackend, task_ids: Iterable[int], worker: str, lease_seconds: float) -> None:
+    """Extend the lease on running tasks still owned by ``worker``."""
+    now = time.time()
+    rows = [(now + lease_seconds, now, tid, worker) for tid in task_ids]
+    if not rows:
+        return
+    with eng.begin() as con:
+        con.exec_driver_sql(
+            "UPDATE tasks SET lease_expires = ?, heartbeat_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            rows
+        )
+
+def reclaim_expired(eng: StateBackend, now: Optional[float] = None) -> int:
+    """Return running tasks whose lease lapsed (or that predate leases) to pending."""
+    now = time.time() if now is None else now
+    stamp = datetime.utcnow().isoformat() + "Z"
+    with eng.begin() as con:
+        res = con.exec_driver_sql(
+            "UPDATE tasks SET status = 'pending', worker = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)",
+            (stamp, now)
+        )
+        return res.rowcount
+
+def set_status(eng: StateBackend, task_id: int, status: str, logs_path: Optional[str] = None) -> None:
     now = datetime.utcnow().isoformat() + "Z"
     with eng.begin() as con:
         con.exec_driver_sql(
@@ -64,11 +316,135 @@ def set_status(eng: Engine, task_id: int, status: str, logs_path: Optional[str]
             (status, now, logs_path, task_id)
         )
 
-def get_all(eng: Engine) -> list[dict]:
+def set_statuses(eng: StateBackend, updates: Iterable[Tuple[int, str, Optional[str]]],
+                 worker: Optional[str] = None) -> None:
+    """Apply many ``(task_id, status, logs_path)`` transitions in one transaction.
+
+    With ``worker`` set, tasks whose lease was reclaimed by another worker are left alone.
+    """
+    now = datetime.utcnow().isoformat() + "Z"
+    rows = [(status, now, logs_path, task_id) for task_id, status, logs_path in updates]
+    if not rows:
+        return
+    owned = ""
+    if worker is not None:
+        owned = " AND worker = ?"
+        rows = [r + (worker,) for r in rows]
+    with eng.begin() as con:
+        con.exec_driver_sql(
+            "UPDATE tasks SET status = ?, updated_at = ?, logs_path = COALESCE(?, logs_path), lease_expires = NULL "
+            f"WHERE id = ?{owned}",
+            rows
+        )
+
+def get_all(eng: StateBackend) -> list[dict]:
     with eng.begin() as con:
-        res = con.exec_driver_sql("SELECT id, hash, tool, args_json, target, priority, status, logs_path FROM tasks ORDER BY id ASC")
-        rows = [dict(r._mapping) for r in res]
-        for r in rows:
-            r["args"] = json.loads(r["args_json"])
-            del r["args_json"]
-        return rows
+        res = con.exec_driver_sql("SELECT id, hash, tool, target, priority, status, logs_path, args_json FROM tasks ORDER BY id ASC")
+        return _task_rows(res)
+
+def unprocessed(eng: StateBackend, keys: Iterable[str]) -> List[str]:
+    """Keys (summary sources) not yet run through rule planning, in input order."""
+    keys = list(dict.fromkeys(keys))
+    seen: set[str] = set()
+    with eng.begin() as con:
+        for i in range(0, len(keys), _IN_CHUNK):
+            chunk = keys[i:i + _IN_CHUNK]
+            res = con.exec_driver_sql(
+                f"SELECT key FROM watermarks WHERE key IN ({','.join('?' * len(chunk))})", tuple(chunk)
+            )
+            seen.update(r[0] for r in res)
+    return [k for k in keys if k not in seen]
+
+def _insert_watermarks(con, keys: Iterable[str], now: str) -> None:
+    rows = [(k, now) for k in keys]
+    if rows:
+        con.exec_driver_sql("INSERT OR REPLACE INTO watermarks(key, processed_at) VALUES (?, ?)", rows)
+
+def mark_processed(eng: StateBackend, keys: Iterable[str]) -> None:
+    now = datetime.utcnow().isoformat() + "Z"
+    keys = list(keys)
+    if not keys:
+        return
+    with eng.begin() as con:
+        _insert_watermarks(con, keys, now)
+
+def summary_key(summary_id: int) -> str:
+    """Watermark key for a row of the summary store."""
+    return f"summary:{summary_id}"
+
+def _insert_summaries(con, items: Iterable[Tuple[Optional[int], object]], now: str) -> List[int]:
+    ids = []
+    for task_id, s in items:
+        res = con.exec_driver_sql(
+            "INSERT INTO summaries(task_id, layer, target, body, created_at) VALUES (?, ?, ?, ?, ?) RETURNING id",
+            (task_id, s.layer, s.target, s.model_dump_json(), now)
+        )
+        ids.append(int(res.scalar()))
+    return ids
+
+def append_summaries(eng: StateBackend, items: Iterable[Tuple[Optional[int], object]]) -> List[int]:
+    """Store ``(task_id, SummaryModel)`` pairs in one transaction; returns the new row ids."""
+    now = datetime.utcnow().isoformat() + "Z"
+    items = list(items)
+    if not items:
+        return []
+    with eng.begin() as con:
+        return _insert_summaries(con, items, now)
+
+def import_summary(eng: StateBackend, source_key: str, task_id: Optional[int], summary: object,
+                   processed: bool = False) -> Optional[int]:
+    """Store a summary read from elsewhere (e.g. a legacy file) exactly once.
+
+    The row, a ``source_key`` watermark recording the import and, with ``processed``, the row's
+    ``summary_key`` watermark are written in one transaction. Returns the new row id, or None if
+    ``source_key`` was already imported.
+    """
+    now = datetime.utcnow().isoformat() + "Z"
+    with eng.begin() as con:
+        if con.exec_driver_sql("SELECT 1 FROM watermarks WHERE key = ?", (source_key,)).first():
+            return None
+        (sid,) = _insert_summaries(con, [(task_id, summary)], now)
+        _insert_watermarks(con, [source_key] + ([summary_key(sid)] if processed else []), now)
+        return sid
+
+def iter_summary_rows(eng: StateBackend, target: Optional[str] = None, layer: Optional[int] = None,
+                      task_id: Optional[int] = None, unprocessed_only: bool = False,
+                      batch: int = 1000) -> Iterator[Tuple[int, str]]:
+    """Yield ``(id, body_json)`` from the summary store in id order, a page at a time."""
+    where, params = ["s.id > ?"], []
+    for col, val in (("s.target", target), ("s.layer", layer), ("s.task_id", task_id)):
+        if val is not None:
+            where.append(f"{col} = ?")
+            params.append(val)
+    join = ""
+    if unprocessed_only:
+        join = "LEFT JOIN watermarks w ON w.key = 'summary:' || s.id "
+        where.append("w.key IS NULL")
+    sql = f"SELECT s.id, s.body FROM summaries s {join}WHERE {' AND '.join(where)} ORDER BY s.id LIMIT ?"
+    last = 0
+    while True:
+        with eng.begin() as con:
+            page = con.exec_driver_sql(sql, (last, *params, batch)).fetchall()
+        for sid, body in page:
+            yield int(sid), body
+        if len(page) < batch:
+            return
+        last = int(page[-1][0])
+
+def get_cached_result(eng: StateBackend, h: str) -> Optional[Tuple[str, float]]:
+    """``(result_json, stored_at)`` cached under task hash ``h``, or None."""
+    with eng.begin() as con:
+        row = con.exec_driver_sql("SELECT body, stored_at FROM result_cache WHERE hash = ?", (h,)).first()
+    return (row[0], float(row[1])) if row else None
+
+def put_cached_results(eng: StateBackend, items: Iterable[Tuple[str, str, str]],
+                       now: Optional[float] = None) -> None:
+    """Store ``(hash, tool, result_json)`` rows in one transaction, replacing older entries."""
+    now = time.time() if now is None else now
+    rows = [(h, tool, body, now) for h, tool, body in items]
+    if not rows:
+        return
+    with eng.begin() as con:
+        con.exec_driver_sql(
+            "INSERT OR REPLACE INTO result_cache(hash, tool, body, stored_at) VALUES (?, ?, ?, ?)", rows
+        )
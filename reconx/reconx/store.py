@@ -0,0 +1,56 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+import re
+from itertools import islice
+from .db import StateBackend
+from .model import SummaryModel, validate_summaries_json
+from .state import import_summary, iter_summary_rows, unprocessed
+from .parsers import watermark_key
+
+# Per-task summaries written by older schedulers: combined/summary_{task_id}_{ts}.json
+_LEGACY_NAME = re.compile(r"summary_(\d+)_\d+\.json$")
+_PAGE = 1000
+
+def iter_stored_summaries(eng: StateBackend, target: Optional[str] = None, layer: Optional[int] = None,
+                          task_id: Optional[int] = None,
+                          unprocessed_only: bool = False) -> Iterator[Tuple[int, SummaryModel]]:
+    """Yield ``(summary_id, SummaryModel)`` from the summary store, optionally filtered.
+
+    Bodies are validated a page at a time; rows that fail validation are skipped.
+    """
+    rows = iter_summary_rows(eng, target=target, layer=layer, task_id=task_id,
+                             unprocessed_only=unprocessed_only, batch=_PAGE)
+    while True:
+        page = list(islice(rows, _PAGE))
+        if not page:
+            return
+        models = validate_summaries_json(body.encode() for _, body in page)
+        for (sid, _), s in zip(page, models):
+            if s is not None:
+                yield sid, s
+
+def migrate_summary_files(eng: StateBackend, out_dir: Path) -> int:
+    """Move ``combined/summary_*.json`` files into the summary store.
+
+    Files already planned keep their watermark as the matching ``summary:<id>`` key. Each file's
+    row and watermarks (including a ``migrated:`` key for the file itself) are committed
+    together and the file is removed afterwards, so a run interrupted in between removes it on
+    the next run instead of importing it twice. Unreadable files are left in place.
+    """
+    comb = out_dir / "combined"
+    if not comb.exists():
+        return 0
+    moved = 0
+    for p in sorted(comb.glob("summary_*.json")):
+        try:
+            s = SummaryModel.model_validate_json(p.read_bytes())
+        except Exception:
+            continue
+        m = _LEGACY_NAME.search(p.name)
+        key = watermark_key(out_dir, p)
+        planned = not unprocessed(eng, [key])
+        sid = import_summary(eng, f"migrated:{key}", int(m.group(1)) if m else None, s, processed=planned)
+        p.unlink()
+        moved += sid is not None
+    return moved
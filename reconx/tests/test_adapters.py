@@ -23,3 +23,88 @@ echo '{"layer":1,"target":"'$T'","evidence":[{"type":"service","port":80,"servic
         assert res.summary.evidence and res.summary.evidence[0].service == "http"
     finally:
         os.chdir(cwd)
+
+
+def test_async_probes_against_local_servers(tmp_path: Path):
+    import asyncio, struct
+    from reconx.adapters import run_action_async
+    from reconx.adapters.aio import HttpPool
+
+    async def main():
+        conns = []
+
+        async def http(reader, writer):
+            conns.append(1)
+            while await reader.readuntil(b"\r\n\r\n"):
+                writer.write(b"HTTP/1.1 200 OK\r\nServer: stand-in\r\nContent-Length: 5\r\n\r\n")
+                await writer.drain()
+
+        async def ssh(reader, writer):
+            writer.write(b"hello\r\nSSH-2.0-OpenSSH_9.6 Debian\r\n")
+            await writer.drain()
+            writer.close()
+
+        class Dns(asyncio.DatagramProtocol):
+            def connection_made(self, transport):
+                self.transport = transport
+
+            def datagram_received(self, data, addr):
+                # Echo the question and answer with a compressed pointer to it.
+                qid = data[:2]
+                answer = b"\xc0\x0c" + struct.pack("!HHIH", 1, 1, 60, 4) + bytes([10, 0, 0, 7])
+                self.transport.sendto(qid + b"\x81\x80\x00\x01\x00\x01\x00\x00\x00\x00" + data[12:] + answer, addr)
+
+        http_srv = await asyncio.start_server(http, "127.0.0.1", 0)
+        ssh_srv = await asyncio.start_server(ssh, "127.0.0.1", 0)
+        dns_tr, _ = await asyncio.get_running_loop().create_datagram_endpoint(Dns, local_addr=("127.0.0.1", 0))
+        hport = http_srv.sockets[0].getsockname()[1]
+        sport = ssh_srv.sockets[0].getsockname()[1]
+        dport = dns_tr.get_extra_info("sockname")[1]
+
+        pool = HttpPool()
+        heads = [Action(tool="http_enum", args={"url_template": f"http://{{target}}:{hport}/", "i": i},
+                        target="127.0.0.1") for i in range(5)]
+        web = [await run_action_async(a, tmp_path, 10, pool=pool) for a in heads]
+        await pool.close()
+        ssh_res = await run_action_async(Action(tool="ssh_banner", args={"port": sport}, target="127.0.0.1"), tmp_path, 10)
+        dns_res = await run_action_async(Action(tool="dns_enum", args={"record_types": ["A"], "nameserver": "127.0.0.1",
+                                                                      "nameserver_port": dport}, target="example.test"),
+                                         tmp_path, 10)
+        http_srv.close()
+        ssh_srv.close()
+        dns_tr.close()
+        return web, len(conns), ssh_res, dns_res
+
+    web, opened, ssh_res, dns_res = asyncio.run(main())
+    assert all(r.summary.evidence[0].type == "http-head" and r.summary.evidence[0].product == "stand-in" for r in web)
+    assert opened == 1  # keep-alive: every HEAD reused the first connection
+    ev = ssh_res.summary.evidence[0]
+    assert (ev.service, ev.product, ev.version) == ("ssh", "OpenSSH", "9.6")
+    rec = dns_res.summary.evidence[0]
+    assert (rec.type, rec.name, rec.data, rec.product) == ("dns-record", "example.test", "A", "10.0.0.7")
+    assert rec.service is None
+
+
+def test_tls_probe_reads_certificate_names(tmp_path: Path):
+    import shutil, ssl, subprocess, asyncio, pytest
+    from reconx.adapters.aio import tls_probe
+    if not shutil.which("openssl"):
+        pytest.skip("openssl not available to create a test certificate")
+    key, crt = tmp_path / "k.pem", tmp_path / "c.pem"
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-keyout", key,
+                    "-out", crt, "-subj", "/C=US/O=Stand In/CN=tls.test"], check=True, capture_output=True)
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(crt, key)
+
+    async def main():
+        async def handle(reader, writer):
+            await reader.read()
+            writer.close()
+        srv = await asyncio.start_server(handle, "127.0.0.1", 0, ssl=ctx)
+        port = srv.sockets[0].getsockname()[1]
+        res = await tls_probe(Action(tool="tls_probe", args={"port": port}, target="127.0.0.1"), tmp_path, 10)
+        srv.close()
+        return res
+
+    ev = asyncio.run(main()).summary.evidence[0]
+    assert ev.type == "tls-cert" and ev.name == "C = US, O = Stand In, CN = tls.test" and ev.product == ev.name
@@ -1,8 +1,10 @@
 from argparse import Namespace
-import json
+import json, sys
 from pathlib import Path
 
-from reconx.__main__ import cmd_run
+import pytest
+
+from reconx.__main__ import cmd_run, main
 
 
 def test_cmd_run_creates_next_steps(tmp_path: Path, monkeypatch):
@@ -17,13 +19,13 @@ def test_cmd_run_creates_next_steps(tmp_path: Path, monkeypatch):
 
     called = {}
 
-    def fake_run_scheduler(out, planned, time_budget_minutes, max_parallel, timeout_per_task, rate_per_sec):
+    def fake_run_scheduler(out, planned, time_budget_minutes, max_parallel, timeout_per_task, rate_per_sec, **kwargs):
         assert (out / "next_steps.md").exists()
         called["called"] = True
 
     monkeypatch.setenv("AUTH_OK", "1")
-    monkeypatch.setattr("reconx.__main__.run_scheduler", fake_run_scheduler)
-    monkeypatch.setattr("reconx.__main__.plan_actions", lambda *args, **kwargs: [])
+    monkeypatch.setattr("reconx.scheduler.run_scheduler", fake_run_scheduler)
+    monkeypatch.setattr("reconx.scheduler.plan_actions", lambda *args, **kwargs: [])
 
     args = Namespace(
         target="1.2.3.4",
@@ -43,3 +45,43 @@ def test_cmd_run_creates_next_steps(tmp_path: Path, monkeypatch):
     assert (out_dir / "next_steps.md").exists()
     assert called.get("called")
 
+
+
+def test_cmd_run_only_plans_unprocessed_summaries(tmp_path: Path, monkeypatch):
+    out_dir = tmp_path / "out"
+    (out_dir / "layer1").mkdir(parents=True)
+    fx = Path(__file__).resolve().parents[1] / "fixtures" / "layer1_summary.json"
+    (out_dir / "layer1" / "summary.json").write_text(fx.read_text())
+    runs = []
+    monkeypatch.setattr("reconx.scheduler.run_scheduler",
+                        lambda out, planned, **kwargs: runs.append([a.tool for a in planned]))
+    args = Namespace(target="1.2.3.4", out=str(out_dir), layers="1", plan="auto", rules=None,
+                     max_parallel=1, timeout=10, rate=0.0, time_budget=1)
+
+    cmd_run(args)
+    cmd_run(args)
+
+    assert "http_enum" in runs[0] and "ssh_banner" in runs[0]
+    assert runs[1] == ["layer1"]
+
+
+def test_cmd_run_leaves_unreadable_summaries_unprocessed(tmp_path: Path, monkeypatch):
+    from reconx.parsers import watermark_key
+    from reconx.state import init_db, unprocessed
+    out_dir = tmp_path / "out"
+    (out_dir / "layer1").mkdir(parents=True)
+    bad = out_dir / "layer1" / "summary.json"
+    bad.write_text('{"layer": 1')
+    monkeypatch.setattr("reconx.scheduler.run_scheduler", lambda out, planned, **kwargs: None)
+    cmd_run(Namespace(target="1.2.3.4", out=str(out_dir), layers="1", plan="auto", rules=None,
+                      max_parallel=1, timeout=10, rate=0.0, time_budget=1))
+    key = watermark_key(out_dir, bad)
+    assert unprocessed(init_db(out_dir / "_state.sqlite"), [key]) == [key]
+
+
+def test_plan_rejects_scheduler_options(tmp_path: Path, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["reconx", "plan", "--target", "1.2.3.4", "--out", str(tmp_path),
+                                      "--rate", "5"])
+    with pytest.raises(SystemExit) as exc:
+        main()
+    assert exc.value.code == 2 and "--rate" in capsys.readouterr().err
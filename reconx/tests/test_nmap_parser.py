@@ -1,3 +1,4 @@
+import pytest
 from pathlib import Path
 from reconx.parsers import parse_nmap_xml
 
@@ -18,3 +19,70 @@ def test_parse_basic_nmap_xml():
     assert ports[80]["service"] == "http"
     assert ports[80]["product"] == "Apache httpd"
     assert ports[22]["product"] == "OpenSSH"
+
+
+def test_streaming_parsers_match_and_feed_rules(tmp_path: Path, monkeypatch):
+    import builtins
+    from reconx.parsers import iter_nmap_hosts, iter_nmap_summaries
+    from reconx.rules import load_rules, evaluate_rules
+
+    xml_path = tmp_path / "scan.xml"
+    hosts = "".join(
+        f'<host><status state="up"/><address addr="10.0.0.{i}" addrtype="ipv4"/>'
+        f'<address addr="00:11:22:33:44:{i:02x}" addrtype="mac"/><ports><extraports state="closed" count="998"/>'
+        f'<port protocol="tcp" portid="80"><state state="open"/><service name="http" product="nginx"/></port>'
+        f'<port protocol="tcp" portid="25"><state state="closed"/><service name="smtp"/></port>'
+        f'</ports></host>' for i in range(1, 4))
+    xml_path.write_text(f'<?xml version="1.0"?><nmaprun>{hosts}<host><address addr="::1" addrtype="ipv6"/>'
+                        f'</host><runstats/></nmaprun>')
+
+    streamed = list(iter_nmap_hosts(xml_path))
+    assert [h["address"] for h in streamed] == ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+    assert parse_nmap_xml(xml_path)["hosts"] == streamed
+    assert streamed[0]["ports"][1] == {"port": 25, "proto": "tcp", "state": "closed", "service": "smtp"}
+
+    summaries = list(iter_nmap_summaries(xml_path, layer=2))
+    assert [(s.layer, s.target, len(s.evidence)) for s in summaries] == [(2, f"10.0.0.{i}", 1) for i in (1, 2, 3)]
+    assert summaries[0].evidence[0].model_dump(exclude_none=True) == {
+        "type": "service", "port": 80, "proto": "tcp", "service": "http", "product": "nginx"}
+    assert summaries[0].artifacts[0].path == str(xml_path)
+    assert len(list(iter_nmap_summaries(xml_path, open_only=False))[0].evidence) == 2
+    rules = load_rules(Path(__file__).resolve().parent.parent / "examples" / "rules.yaml")
+    assert {a.target for a in evaluate_rules(rules, iter_nmap_summaries(xml_path)) if a.tool == "http_enum"} == {
+        "10.0.0.1", "10.0.0.2", "10.0.0.3"}
+
+    # Same results through the standard library parser when lxml is unavailable.
+    real_import = builtins.__import__
+    def no_lxml(name, *args, **kw):
+        if name.startswith("lxml"):
+            raise ImportError(name)
+        return real_import(name, *args, **kw)
+    monkeypatch.setattr(builtins, "__import__", no_lxml)
+    assert list(iter_nmap_hosts(xml_path)) == streamed
+    assert list(iter_nmap_summaries(xml_path, layer=2)) == summaries
+
+
+def test_lxml_and_stdlib_parsers_take_the_same_hosts(tmp_path: Path, monkeypatch):
+    import builtins
+    from reconx.parsers import iter_nmap_hosts
+    pytest.importorskip("lxml")
+
+    def host(ip):
+        return (f'<host><address addr="{ip}" addrtype="ipv4"/><ports><port protocol="tcp" portid="22">'
+                f'<state state="open"/></port></ports></host>')
+    xml_path = tmp_path / "scan.xml"
+    xml_path.write_text(f'<nmaprun>{host("10.0.0.1")}<prescript>{host("10.9.9.9")}</prescript>'
+                        f'<hosthint>{host("10.9.9.8")}</hosthint>{host("10.0.0.2")}'
+                        f'<runstats><x>{host("10.9.9.7")}</x></runstats></nmaprun>')
+
+    with_lxml = list(iter_nmap_hosts(xml_path))
+    real_import = builtins.__import__
+    def no_lxml(name, *args, **kw):
+        if name.startswith("lxml"):
+            raise ImportError(name)
+        return real_import(name, *args, **kw)
+    monkeypatch.setattr(builtins, "__import__", no_lxml)
+    with_stdlib = list(iter_nmap_hosts(xml_path))
+
+    assert [h["address"] for h in with_lxml] == ["10.0.0.1", "10.0.0.2"]
+    assert with_stdlib == with_lxml
@@ -0,0 +1,44 @@
+from reconx.scheduler.ratelimit import TokenBucket, RateLimiter, RoundRobin
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_at_rate():
+    clk = FakeClock()
+    b = TokenBucket(rate=2.0, clock=clk)
+    assert b.try_acquire()
+    assert not b.try_acquire()
+    assert abs(b.wait_time() - 0.5) < 1e-9
+    clk.now = 0.5
+    assert b.try_acquire()
+
+
+def test_rate_limiter_per_target_and_global():
+    clk = FakeClock()
+    lim = RateLimiter(rate_per_sec=10.0, per_target_rate=1.0, burst=2, clock=clk)
+    assert lim.try_acquire("a") and lim.try_acquire("a")
+    # Target "a" is out of tokens, "b" still has its own bucket.
+    assert not lim.try_acquire("a")
+    assert lim.target_wait("a") > 0
+    assert not lim.try_acquire("b")  # global burst of 2 used up
+    assert lim.global_wait() > 0
+    clk.now = 0.1
+    assert lim.try_acquire("b")
+    # A refused acquire takes no tokens from either bucket.
+    assert abs(lim.target_wait("a") - 0.9) < 1e-9
+
+
+def test_round_robin_interleaves_targets_within_priority():
+    rr = RoundRobin()
+    tasks = [{"id": i, "target": t, "priority": p}
+             for i, (t, p) in enumerate([("a", 5), ("a", 5), ("a", 5), ("b", 5), ("c", 5), ("c", 1)])]
+    order = [(t["target"], t["priority"]) for t in rr.order(tasks)]
+    assert order == [("c", 1), ("a", 5), ("b", 5), ("c", 5), ("a", 5), ("a", 5)]
+    rr.mark({"target": "a"})
+    assert [t["target"] for t in rr.order(tasks[:4])] == ["b", "a", "a", "a"]
@@ -1,6 +1,6 @@
 from pathlib import Path
 import json
-from reconx.report import build_combined_model, render_reports
+from reconx.report import build_combined_model, render_reports, stream_reports
 from reconx.model import SummaryModel
 
 def test_report_generation(tmp_path: Path):
@@ -12,3 +12,32 @@ def test_report_generation(tmp_path: Path):
     html = tmp_path / "combined" / "combined_report.html"
     jsn = tmp_path / "combined" / "combined_report.json"
     assert html.exists() and jsn.exists()
+
+
+def test_stream_reports_matches_in_memory_model(tmp_path: Path):
+    fx = Path(__file__).resolve().parents[1] / "fixtures"
+    summaries = [SummaryModel.model_validate(json.loads((fx / n).read_text()))
+                 for n in ("layer1_summary.json", "layer2_summary.json")]
+    summaries.append(SummaryModel(layer=3, target="5.6.7.8"))
+    expected = build_combined_model(tmp_path, summaries)
+
+    counts = stream_reports(tmp_path, iter(summaries), ndjson=True)
+
+    comb = tmp_path / "combined"
+    assert json.loads((comb / "combined_report.json").read_text()) == json.loads(json.dumps(expected))
+    assert counts == {k: len(expected[k]) for k in ("artifacts", "evidence", "findings", "services")}
+    nd = [json.loads(l) for l in (comb / "combined_report.ndjson").read_text().splitlines()]
+    assert sum(r["section"] == "evidence" for r in nd) == len(expected["evidence"])
+    html = (comb / "combined_report.html").read_text()
+    assert "5.6.7.8" in html and "WEB-TLS-OLD" in html and "nginx" in html
+    assert [p.name for p in comb.iterdir() if p.name.startswith(".report_")] == []
+
+
+def test_columnar_model_renders_same_report(tmp_path: Path):
+    fx = Path(__file__).resolve().parents[1] / "fixtures"
+    summaries = [SummaryModel.model_validate(json.loads((fx / n).read_text()))
+                 for n in ("layer1_summary.json", "layer2_summary.json")]
+    for columnar in (False, True):
+        render_reports(tmp_path / str(columnar), build_combined_model(tmp_path, summaries, columnar=columnar))
+    plain, cols = ((tmp_path / c / "combined" / "combined_report.json").read_text() for c in ("False", "True"))
+    assert plain == cols
@@ -15,3 +15,126 @@ def test_rule_matches():
     assert "dns_enum" in tools
     assert "tls_probe" in tools
     assert "dir_enum" in tools
+
+
+def test_rule_max_parallel_carried_on_action():
+    rules = load_rules(Path(__file__).resolve().parents[1] / "examples" / "rules.yaml")
+    fx = Path(__file__).resolve().parents[1] / "fixtures"
+    s1 = SummaryModel.model_validate(json.loads((fx / "layer1_summary.json").read_text()))
+    actions = evaluate_rules(rules, [s1])
+    assert {a.max_parallel for a in actions if a.tool == "http_enum"} == {2}
+    assert all(a.max_parallel is None for a in actions if a.tool == "ssh_banner")
+    # Each action names the rule that planned it, so the cap is counted per rule.
+    assert len({a.rule for a in actions if a.tool == "http_enum"}) == 1
+    assert {a.rule for a in actions if a.tool == "http_enum"}.isdisjoint(a.rule for a in actions if a.tool == "ssh_banner")
+
+
+def test_match_expressions_compiled_once_and_validated_at_load(tmp_path: Path):
+    import pytest
+    from reconx.rules.evaluator import compile_predicate
+
+    pred = compile_predicate("type=='service' and port in [80, 443]")
+    assert compile_predicate("type=='service' and port in [80, 443]") is pred
+    assert pred({"type": "service", "port": 443})
+    assert not pred({"type": "service"})  # missing field never matches
+
+    bad = tmp_path / "rules.yaml"
+    bad.write_text('- match: "evidence[__import__(\'os\')]"\n  then:\n    run:\n      - tool: x\n')
+    with pytest.raises(ValueError, match="Disallowed"):
+        load_rules(bad)
+
+
+def test_indexed_candidates_match_full_scan():
+    from reconx.rules.evaluator import compile_predicate, _match_list
+    from reconx.rules.index import ItemIndex
+
+    items = [{"type": t, "service": s, "port": p, "name": None}
+             for t in ("service", "vhost") for s in ("http", "ssh", "dns") for p in (22, 53, 80, 443)]
+    idx = ItemIndex(items)
+    for expr in ["type=='service' and service in ['http','https'] and port in [80,443]",
+                 "'ssh'==service and not port==22",
+                 "type=='vhost' or port==53",
+                 "port in [80] and port==443"]:
+        pred = compile_predicate(expr)
+        assert _match_list(pred, idx.candidates(pred.constraints)) == _match_list(pred, items)
+    pred = compile_predicate("type=='service' and service in ['http','https'] and port in [80,443]")
+    assert len(idx.candidates(pred.constraints)) == 8  # the service posting list, not all 24 rows
+    assert idx.candidates(compile_predicate("port==8080").constraints) == []
+
+
+def test_actions_fan_out_per_target_with_own_evidence():
+    rules = load_rules(Path(__file__).resolve().parents[1] / "examples" / "rules.yaml")
+    summaries = [
+        SummaryModel.model_validate({"layer": 2, "target": f"10.0.0.{i}",
+                                     "evidence": [{"type": "service", "service": "http", "port": port, "proto": "tcp"}]})
+        for i, port in enumerate([80, 8080, 443])
+    ]
+    # The same evidence reported twice for one host plans nothing extra.
+    summaries.append(summaries[0].model_copy())
+    actions = evaluate_rules(rules, summaries)
+    http = sorted((a.target, a.args["url_template"]) for a in actions if a.tool == "http_enum")
+    assert http == [("10.0.0.0", "http{s}://10.0.0.0:80/"),
+                    ("10.0.0.1", "http{s}://10.0.0.1:8080/"),
+                    ("10.0.0.2", "http{s}://10.0.0.2:443/")]
+    tls = sorted((a.target, a.args["port"]) for a in actions if a.tool == "tls_probe")
+    assert tls == [("10.0.0.0", "80"), ("10.0.0.1", "8080"), ("10.0.0.2", "443")]
+
+
+def test_summaries_validate_from_bytes_in_bulk_and_rules_see_views(tmp_path: Path):
+    import pytest
+    from reconx.model import field_view, validate_summaries_json
+    from reconx.parsers import load_summaries_from_layers
+
+    fx = Path(__file__).resolve().parents[1] / "fixtures"
+    for L in (1, 2):
+        (tmp_path / f"layer{L}").mkdir()
+        (tmp_path / f"layer{L}" / "summary.json").write_bytes((fx / f"layer{L}_summary.json").read_bytes())
+    (tmp_path / "layer3").mkdir()
+    (tmp_path / "layer3" / "summary.json").write_text('{"layer": "x"}')
+    loaded = load_summaries_from_layers(tmp_path, [1, 2, 3])
+    assert [s.layer for s in loaded] == [1, 2]
+    assert validate_summaries_json([b'{"layer": 1, "target": "a"}', b"{"])[1] is None
+    # A blob holding two objects must not shift the blobs after it.
+    two = b'{"layer": 1, "target": "x"},{"layer": 1, "target": "y"}'
+    got = validate_summaries_json([two, b'{"layer": 2, "target": "b"}'])
+    assert got[0] is None and got[1].target == "b" and len(got) == 2
+
+    e = loaded[0].evidence[0]
+    view = field_view(e)
+    assert dict(view) == e.model_dump()
+    with pytest.raises(TypeError):
+        view["port"] = 1
+    rules = load_rules(Path(__file__).resolve().parents[1] / "examples" / "rules.yaml")
+    assert "http_enum" in {a.tool for a in evaluate_rules(rules, loaded)}
+
+
+def test_evidence_columns_rows_match_model_dump_and_index():
+    import pytest
+    from reconx.model import Evidence, EvidenceColumns
+    from reconx.rules.index import ItemIndex
+
+    fx = Path(__file__).resolve().parents[1] / "fixtures"
+    summaries = [SummaryModel.model_validate_json((fx / n).read_bytes())
+                 for n in ("layer1_summary.json", "layer2_summary.json")]
+    cols = EvidenceColumns.from_summaries(summaries)
+    dumped = [e.model_dump() for s in summaries for e in s.evidence]
+    assert len(cols) == len(dumped) and list(cols) == dumped and cols[-1] == dumped[-1]
+    assert cols.column("target") == [s.target for s in summaries for _ in s.evidence]
+    with pytest.raises(KeyError):
+        cols[0]["target"]
+    assert cols.rows(with_target=True)[0]["target"] == summaries[0].target
+
+    cols.append(Evidence(type="service", port=None, service="http"), "h")
+    cols.append({"type": "service", "port": 8080, "service": "http"}, "h")
+    assert cols[-2]["port"] is None and cols[-1]["proto"] is None
+    # Any port Evidence accepts round-trips, including -1 and values outside int32.
+    for port in (-1, 0, 2**31 - 1, 2**31, -2**40):
+        cols.append(Evidence(type="service", port=port), "h")
+    assert [r["port"] for r in cols[-5:]] == [-1, 0, 2**31 - 1, 2**31, -2**40]
+    assert cols.column("port")[-6:] == [8080, -1, 0, 2**31 - 1, 2**31, -2**40]
+    # bool is an int subclass; mapping input keeps it as-is rather than turning it into 1.
+    flags = EvidenceColumns()
+    flags.append({"type": "service", "port": True}, "h")
+    assert flags[0]["port"] is True
+    cons = {"type": ("service",), "service": ("http",)}
+    assert ItemIndex(cols).candidate_positions(cons) == ItemIndex(list(map(dict, cols))).candidate_positions(cons)
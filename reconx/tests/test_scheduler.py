@@ -21,10 +21,393 @@ echo '{"layer":1,"target":"'$T'"}' > "$OUT/layer1/summary.json"
     try:
         act = [Action(tool="layer1", args={}, target="1.2.3.4", priority=1)]
         run_scheduler(out_dir, act, time_budget_minutes=1, max_parallel=1, timeout_per_task=10, rate_per_sec=0.0)
-        # state db and combined summary should exist
+        # state db and the task's stored summary should exist
+        from reconx.state import init_db
+        from reconx.store import iter_stored_summaries
         assert (out_dir / "_state.sqlite").exists()
-        comb = list((out_dir / "combined").glob("summary_*.json"))
-        assert comb
+        stored = list(iter_stored_summaries(init_db(out_dir / "_state.sqlite"), target="1.2.3.4"))
+        assert stored and stored[0][1].layer == 1
     finally:
         os.chdir(cwd)
 
+
+
+def test_scheduler_keeps_max_parallel_in_flight(tmp_path: Path, monkeypatch):
+    import threading, time
+    from reconx.adapters import base
+    from reconx.model import Result, SummaryModel
+
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+    order = []
+
+    def slow_tool(action, out_dir, timeout):
+        i = action.args["i"]
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            order.append(("start", i))
+        # Task 0 holds its slot far longer than the rest.
+        time.sleep(0.8 if i == 0 else 0.05)
+        with lock:
+            state["running"] -= 1
+            order.append(("done", i))
+        return Result(summary=SummaryModel(layer=97, target=action.target))
+
+    monkeypatch.setitem(base.HANDLERS, "slow_tool", slow_tool)
+    out_dir = tmp_path / "OUT"
+    (out_dir / "combined").mkdir(parents=True)
+    act = [Action(tool="slow_tool", args={"i": i}, target="1.2.3.4") for i in range(8)]
+    run_scheduler(out_dir, act, time_budget_minutes=1, max_parallel=4, timeout_per_task=10, rate_per_sec=0.0)
+
+    assert state["peak"] == 4
+    # Freed slots are refilled at once rather than after the whole batch: everything else
+    # starts (and finishes) while the slow task is still running.
+    assert order[-1] == ("done", 0)
+    assert sum(e == "start" for e, _ in order) == 8
+    events = [json.loads(l)["event"] for l in (out_dir / "_master_log.ndjson").read_text().splitlines()]
+    assert events.count("task_start") == 8 and events.count("task_done") == 8
+    from reconx.state import init_db, iter_summary_rows
+    assert len(list(iter_summary_rows(init_db(out_dir / "_state.sqlite"), layer=97))) == 8
+
+
+def test_scheduler_gives_every_target_a_turn(tmp_path: Path, monkeypatch):
+    import threading
+    from reconx.adapters import base
+    from reconx.model import Result, SummaryModel
+
+    lock = threading.Lock()
+    started = []
+
+    def probe(action, out_dir, timeout):
+        with lock:
+            started.append(action.target)
+        return Result(summary=SummaryModel(layer=97, target=action.target))
+
+    monkeypatch.setitem(base.HANDLERS, "probe", probe)
+    out_dir = tmp_path / "OUT"
+    (out_dir / "combined").mkdir(parents=True)
+    # 60 tasks for one target are queued (and numbered) before anyone else's.
+    acts = [Action(tool="probe", args={"i": i}, target="hog") for i in range(60)]
+    acts += [Action(tool="probe", args={}, target=t) for t in ("a", "b", "c")]
+    run_scheduler(out_dir, acts, time_budget_minutes=1, max_parallel=2, timeout_per_task=10, rate_per_sec=0.0)
+    assert len(started) == 63
+    assert set(started[:4]) == {"hog", "a", "b", "c"}
+
+
+def test_scheduler_honors_rule_and_tool_caps(tmp_path: Path, monkeypatch):
+    import threading, time
+    from collections import Counter
+    from reconx.adapters import base
+    from reconx.model import Result, SummaryModel
+
+    lock = threading.Lock()
+    running, peak, finished = Counter(), Counter(), []
+
+    def make(name, delay):
+        def handler(action, out_dir, timeout):
+            with lock:
+                running[name] += 1
+                peak[name] = max(peak[name], running[name])
+            time.sleep(delay)
+            with lock:
+                running[name] -= 1
+                finished.append(name)
+            return Result(summary=SummaryModel(layer=97, target=action.target))
+        return handler
+
+    monkeypatch.setitem(base.HANDLERS, "slow_web", make("slow_web", 0.3))
+    monkeypatch.setitem(base.HANDLERS, "fast_dns", make("fast_dns", 0.01))
+    monkeypatch.setitem(base.HANDLERS, "capped", make("capped", 0.05))
+    out_dir = tmp_path / "OUT"
+    (out_dir / "combined").mkdir(parents=True)
+    act = [Action(tool="slow_web", args={"i": i}, target="h", priority=1, max_parallel=2) for i in range(4)]
+    act += [Action(tool="fast_dns", args={"i": i}, target="h", priority=2) for i in range(6)]
+    act += [Action(tool="capped", args={"i": i}, target="h", priority=3) for i in range(4)]
+    run_scheduler(out_dir, act, time_budget_minutes=1, max_parallel=4, timeout_per_task=10,
+                  rate_per_sec=0.0, tool_limits={"capped": 1})
+
+    assert peak["slow_web"] == 2
+    assert peak["capped"] == 1
+    # Fast tasks use the free slots instead of queueing behind the slow tool.
+    assert finished.index("slow_web") > finished.index("fast_dns")
+    assert len(finished) == 14
+
+
+def test_rule_cap_does_not_hold_back_other_tasks_of_the_tool(tmp_path: Path, monkeypatch):
+    import threading, time
+    from collections import Counter
+    from reconx.adapters import base
+    from reconx.model import Result, SummaryModel
+
+    lock = threading.Lock()
+    running, peak, started = Counter(), Counter(), []
+
+    def handler(action, out_dir, timeout):
+        kind = action.args["kind"]
+        with lock:
+            started.append(kind)
+            running[kind] += 1
+            peak[kind] = max(peak[kind], running[kind])
+        time.sleep(0.1)
+        with lock:
+            running[kind] -= 1
+        return Result(summary=SummaryModel(layer=97, target=action.target))
+
+    monkeypatch.setitem(base.HANDLERS, "web", handler)
+    out_dir = tmp_path / "OUT"
+    (out_dir / "combined").mkdir(parents=True)
+    # The capped rules' tasks are older, so they head the queue.
+    act = [Action(tool="web", args={"kind": "r1", "i": i}, target="h", max_parallel=1, rule="r1") for i in range(3)]
+    act += [Action(tool="web", args={"kind": "r2", "i": i}, target="h", max_parallel=1, rule="r2") for i in range(3)]
+    act += [Action(tool="web", args={"kind": "free", "i": i}, target="h") for i in range(4)]
+    stats = run_scheduler(out_dir, act, time_budget_minutes=1, max_parallel=4, timeout_per_task=10, rate_per_sec=0.0)
+
+    assert stats["done"] == 10
+    assert peak["r1"] == 1 and peak["r2"] == 1
+    # The first refill fills every slot: one task per capped rule, uncapped tasks of the same tool after them.
+    assert Counter(started[:4]) == {"r1": 1, "r2": 1, "free": 2}
+
+
+def test_scheduler_runs_probes_on_one_loop_sharing_connections(tmp_path: Path):
+    import asyncio, threading
+    conns, ready, box = [], threading.Event(), {}
+
+    async def http(reader, writer):
+        conns.append(1)
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                writer.write(b"HTTP/1.1 200 OK\r\nServer: stand-in\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        srv = loop.run_until_complete(asyncio.start_server(http, "127.0.0.1", 0))
+        box.update(port=srv.sockets[0].getsockname()[1], loop=loop)
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    out_dir = tmp_path / "OUT"
+    (out_dir / "combined").mkdir(parents=True)
+    act = [Action(tool="http_enum", args={"url_template": f"http://{{target}}:{box['port']}/", "i": i},
+                  target="127.0.0.1") for i in range(6)]
+    try:
+        stats = run_scheduler(out_dir, act, time_budget_minutes=1, max_parallel=1, timeout_per_task=10,
+                              rate_per_sec=0.0)
+    finally:
+        box["loop"].call_soon_threadsafe(box["loop"].stop)
+
+    assert stats["done"] == 6
+    assert len(conns) == 1  # one loop and keep-alive pool for the whole run
+    # Never throttled: exactly zero wait, not a tiny negative one printed as -0.0.
+    starts = [json.loads(l) for l in (out_dir / "_master_log.ndjson").read_text().splitlines()]
+    assert {repr(r["rate_wait_s"]) for r in starts if r["event"] == "task_start"} == {"0.0"}
+    assert "rate_wait=0.0s" in (out_dir / "_timeline.txt").read_text()
+
+
+def test_scheduler_rate_limit_overlaps_long_tasks(tmp_path: Path, monkeypatch):
+    import threading, time
+    from reconx.adapters import base
+    from reconx.model import Result, SummaryModel
+
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def long_probe(action, out_dir, timeout):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.4)
+        with lock:
+            state["running"] -= 1
+        return Result(summary=SummaryModel(layer=97, target=action.target))
+
+    monkeypatch.setitem(base.HANDLERS, "long_probe", long_probe)
+    out_dir = tmp_path / "OUT"
+    (out_dir / "combined").mkdir(parents=True)
+    act = [Action(tool="long_probe", args={"i": i}, target=f"h{i % 2}") for i in range(6)]
+    stats = run_scheduler(out_dir, act, time_budget_minutes=1, max_parallel=6, timeout_per_task=10,
+                          rate_per_sec=20.0, per_target_rate=5.0)
+
+    # Starts are spaced by the per-target bucket (0.2s), not by task duration, so probes on the
+    # same target overlap while the limiter holds back the next start.
+    assert stats["done"] == 6 and stats["rate_wait_s"] > 0
+    assert state["peak"] >= 3
+    starts = [json.loads(l) for l in (out_dir / "_master_log.ndjson").read_text().splitlines()
+              if json.loads(l)["event"] == "task_start"]
+    assert [s["task"]["target"] for s in starts[:2]] == ["h0", "h1"]
+    assert all("rate_wait_s" in s for s in starts)
+
+
+def test_schedulers_sharing_a_db_run_each_task_once(tmp_path: Path, monkeypatch):
+    import threading, time
+    from collections import Counter
+    from reconx.adapters import base
+    from reconx.model import Result, SummaryModel
+    from reconx.state import init_db, upsert_tasks, get_all
+
+    runs = Counter()
+    lock = threading.Lock()
+
+    def probe(action, out_dir, timeout):
+        time.sleep(0.02)
+        with lock:
+            runs[action.args["i"]] += 1
+        return Result(summary=SummaryModel(layer=97, target=action.target))
+
+    monkeypatch.setitem(base.HANDLERS, "probe", probe)
+    out_dir = tmp_path / "OUT"
+    (out_dir / "combined").mkdir(parents=True)
+    upsert_tasks(init_db(out_dir / "_state.sqlite"),
+                 [Action(tool="probe", args={"i": i}, target=f"h{i % 3}") for i in range(30)])
+    workers = [threading.Thread(target=run_scheduler, args=(out_dir, []),
+                                kwargs=dict(time_budget_minutes=1, max_parallel=3, timeout_per_task=10,
+                                            rate_per_sec=0.0))
+               for _ in range(3)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert sorted(runs) == list(range(30)) and set(runs.values()) == {1}
+    assert {r["status"] for r in get_all(init_db(out_dir / "_state.sqlite"))} == {"done"}
+
+
+def test_scheduler_reclaims_tasks_stuck_running(tmp_path: Path, monkeypatch):
+    from reconx.adapters import base
+    from reconx.model import Result, SummaryModel
+    from reconx.state import init_db, upsert_tasks, claim_tasks, heartbeat, get_all
+
+    monkeypatch.setitem(base.HANDLERS, "probe",
+                        lambda action, out_dir, timeout: Result(summary=SummaryModel(layer=97, target=action.target)))
+    out_dir = tmp_path / "OUT"
+    (out_dir / "combined").mkdir(parents=True)
+    eng = init_db(out_dir / "_state.sqlite")
+    ids = upsert_tasks(eng, [Action(tool="probe", args={}, target="h")])
+    claim_tasks(eng, ids, "crashed-worker", lease_seconds=60)
+    heartbeat(eng, ids, "crashed-worker", lease_seconds=-1)
+    stats = run_scheduler(out_dir, [], time_budget_minutes=1, max_parallel=1, timeout_per_task=10, rate_per_sec=0.0)
+    assert stats["reclaimed"] == 1 and stats["done"] == 1
+    assert get_all(eng)[0]["status"] == "done"
+
+
+def test_scheduler_plans_follow_ups_from_new_evidence(tmp_path: Path, monkeypatch):
+    from reconx.adapters import base
+    from reconx.model import Result, SummaryModel
+    from reconx.rules import load_rules
+    from reconx.state import init_db, get_all, iter_summary_rows, summary_key, unprocessed
+
+    def crawler(action, out_dir, timeout):
+        return Result(summary=SummaryModel.model_validate(
+            {"layer": 99, "target": action.target,
+             "findings": [{"id": "EXPOSED-PATH", "title": "Interesting path"}]}))
+
+    monkeypatch.setitem(base.HANDLERS, "crawler", crawler)
+    out_dir = tmp_path / "OUT"
+    (out_dir / "combined").mkdir(parents=True)
+    rules = load_rules(Path(__file__).resolve().parents[1] / "examples" / "rules.yaml")
+    stats = run_scheduler(out_dir, [Action(tool="crawler", args={}, target="1.2.3.4")], time_budget_minutes=1,
+                          max_parallel=2, timeout_per_task=10, rate_per_sec=0.0, rules=rules)
+
+    rows = {r["tool"]: r for r in get_all(init_db(out_dir / "_state.sqlite"))}
+    assert rows["dir_enum"]["status"] == "done" and rows["dir_enum"]["target"] == "1.2.3.4"
+    assert stats["planned"] == 1 and stats["done"] == 2
+    db = init_db(out_dir / "_state.sqlite")
+    keys = [summary_key(sid) for sid, _ in iter_summary_rows(db)]
+    assert len(keys) == 2 and unprocessed(db, keys) == []
+
+
+def test_scheduler_keeps_probe_results_when_planning_fails(tmp_path: Path, monkeypatch):
+    from reconx.adapters import base
+    from reconx.model import Result, SummaryModel
+    from reconx.state import init_db, get_all, iter_summary_rows, summary_key, unprocessed
+
+    monkeypatch.setitem(base.HANDLERS, "probe", lambda action, out_dir, timeout: Result(
+        summary=SummaryModel(layer=97, target=action.target)))
+    out_dir = tmp_path / "OUT"
+    (out_dir / "combined").mkdir(parents=True)
+    bad_rules = [{"match": "evidence[__import__('os')]", "then": {"run": [{"tool": "x"}]}}]
+    stats = run_scheduler(out_dir, [Action(tool="probe", args={}, target="h")], time_budget_minutes=1,
+                          max_parallel=1, timeout_per_task=10, rate_per_sec=0.0, rules=bad_rules)
+    assert stats["done"] == 1 and stats["error"] == 0
+    db = init_db(out_dir / "_state.sqlite")
+    assert [r["status"] for r in get_all(db)] == ["done"]
+    keys = [summary_key(sid) for sid, _ in iter_summary_rows(db)]
+    assert len(keys) == 1 and unprocessed(db, keys) == keys
+    events = [json.loads(l)["event"] for l in (out_dir / "_master_log.ndjson").read_text().splitlines()]
+    assert "plan_error" in events and "task_error" not in events
+
+
+def test_scheduler_serves_repeat_probes_from_result_cache(tmp_path: Path, monkeypatch):
+    from reconx.adapters import base
+    from reconx.cache import ResultCache
+    from reconx.model import Result, SummaryModel
+
+    calls = []
+
+    def http_enum(action, out_dir, timeout):
+        calls.append(action.args["port"])
+        log = out_dir / f"http_{action.args['port']}.log"
+        log.write_text("probe")
+        return Result(logs=str(log), summary=SummaryModel.model_validate(
+            {"layer": 98, "target": action.target, "evidence": [{"type": "http", "port": action.args["port"]}],
+             "artifacts": [{"kind": "raw", "path": str(log)}]}))
+
+    monkeypatch.setitem(base.HANDLERS, "http_enum", http_enum)
+    cache_db = tmp_path / "cache.sqlite"
+    acts = [Action(tool="http_enum", args={"port": p}, target="1.2.3.4") for p in (80, 443)]
+
+    def run(name, **cache_kw):
+        out = tmp_path / name
+        (out / "combined").mkdir(parents=True)
+        return run_scheduler(out, acts, time_budget_minutes=1, max_parallel=2, timeout_per_task=10,
+                             rate_per_sec=0.5, cache=ResultCache(cache_db, **cache_kw))
+
+    first = run("run1")
+    assert sorted(calls) == [80, 443] and first["cache_miss"] == 2 and first["cache_hit"] == 0
+    second = run("run2")
+    # Hits skip both the adapter and the rate limiter (0.5/s would otherwise wait ~2s).
+    assert len(calls) == 2 and second["cache_hit"] == 2 and second["done"] == 2
+    assert second["rate_wait_s"] == 0
+    from reconx.store import iter_stored_summaries
+    from reconx.state import init_db, get_all
+    stored = list(iter_stored_summaries(init_db(tmp_path / "run2" / "_state.sqlite")))
+    assert sorted(s.evidence[0].port for _, s in stored) == [80, 443]
+    # Nothing from run1's out dir is carried over: no log path, no artifacts.
+    assert all(not s.artifacts for _, s in stored)
+    assert [r["logs_path"] for r in get_all(init_db(tmp_path / "run2" / "_state.sqlite"))] == [None, None]
+    third = run("run3", max_age=0)
+    assert len(calls) == 4 and third["cache_miss"] == 2
+
+
+def test_result_cache_ttls(tmp_path: Path):
+    import time
+    from reconx.cache import ResultCache, EMPTY_TTL
+    from reconx.model import Result, SummaryModel
+
+    cache = ResultCache(tmp_path / "cache.sqlite", ttls={"tls_probe": 3600})
+    full = Action(tool="tls_probe", args={"port": 443}, target="a")
+    empty = Action(tool="tls_probe", args={"port": 8443}, target="a")
+    layer = Action(tool="layer1", args={}, target="a")
+    cache.put_many([
+        (full, Result(summary=SummaryModel.model_validate({"layer": 98, "target": "a", "evidence": [{"type": "tls"}]}))),
+        (empty, Result(summary=SummaryModel(layer=98, target="a"))),
+        (layer, Result(summary=SummaryModel(layer=1, target="a"))),
+    ])
+    now = time.time()
+    assert cache.get(full, now=now + 3000).summary.evidence[0].type == "tls"
+    assert cache.get(full, now=now + 3700) is None
+    assert cache.get(empty, now=now + 10) is not None
+    assert cache.get(empty, now=now + EMPTY_TTL + 1) is None
+    assert cache.get(layer) is None and not cache.cacheable("layer1")
+
+
+def test_result_cache_defaults_to_the_out_dir(tmp_path: Path, monkeypatch):
+    from reconx.cache import default_cache_path
+    monkeypatch.delenv("RECONX_CACHE", raising=False)
+    assert default_cache_path(tmp_path / "a") == tmp_path / "a" / "_cache.sqlite"
+    monkeypatch.setenv("RECONX_CACHE", str(tmp_path / "shared.sqlite"))
+    assert default_cache_path(tmp_path / "a") == tmp_path / "shared.sqlite"
@@ -0,0 +1,28 @@
+import re, subprocess, sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _imported(tmp_path: Path, *argv: str) -> set:
+    code = (f"import sys; sys.argv = ['reconx', *{list(argv)!r}]\n"
+            "from reconx.__main__ import main\ntry: main()\nexcept SystemExit: pass")
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert p.returncode == 0, p.stderr[-2000:]
+    return {m.group(1) for m in re.finditer(r"^import time:\s+\d+ \|\s+\d+ \| *(\S+)$", p.stderr, re.M)}
+
+
+def _top(mods: set) -> set:
+    return {m.split(".")[0] for m in mods}
+
+
+def test_plan_does_not_import_db_adapters_or_templates(tmp_path: Path):
+    mods = _imported(tmp_path, "plan", "--target", "1.2.3.4", "--out", str(tmp_path / "out"))
+    assert "reconx.rules.loader" in mods and "reconx.parsers.summaries" in mods
+    assert not {"sqlalchemy", "jinja2"} & _top(mods)
+    assert not {"reconx.state", "reconx.adapters", "reconx.report", "reconx.scheduler.scheduler"} & mods
+
+
+def test_help_imports_no_heavy_dependencies(tmp_path: Path):
+    mods = _imported(tmp_path, "--help")
+    assert not {"pydantic", "ruamel", "sqlalchemy", "jinja2"} & _top(mods)
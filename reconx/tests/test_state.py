@@ -0,0 +1,234 @@
+from pathlib import Path
+import sqlite3
+from reconx.model import Action
+from reconx.state import init_db, upsert_task, upsert_tasks, set_statuses, get_all, get_pending
+
+
+def test_upsert_tasks_returns_ids_in_input_order(tmp_path: Path):
+    eng = init_db(tmp_path / "s.sqlite")
+    existing = upsert_task(eng, "dns_enum", {"r": 1}, "h")
+    acts = [Action(tool="dns_enum", args={"r": 1}, target="h"),
+            Action(tool="http_enum", args={"p": 80}, target="h", max_parallel=2),
+            Action(tool="http_enum", args={"p": 80}, target="h")]
+    ids = upsert_tasks(eng, acts)
+    assert ids[0] == existing and ids[1] == ids[2] and ids[1] != existing
+    assert len(get_all(eng)) == 2
+    assert upsert_tasks(eng, []) == []
+
+
+def test_set_statuses_batches_transitions(tmp_path: Path):
+    eng = init_db(tmp_path / "s.sqlite")
+    ids = upsert_tasks(eng, [Action(tool="t", args={"i": i}, target="h") for i in range(3)])
+    set_statuses(eng, [(ids[0], "done", "log.txt"), (ids[1], "error", None)])
+    rows = {r["id"]: r for r in get_all(eng)}
+    assert rows[ids[0]]["status"] == "done" and rows[ids[0]]["logs_path"] == "log.txt"
+    assert rows[ids[1]]["status"] == "error"
+    assert [r["id"] for r in get_pending(eng)] == [ids[2]]
+
+
+def test_init_db_enables_wal_and_upgrades_old_schema(tmp_path: Path):
+    db = tmp_path / "old.sqlite"
+    con = sqlite3.connect(db)
+    con.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, hash TEXT UNIQUE NOT NULL, "
+                "tool TEXT NOT NULL, args_json TEXT NOT NULL, target TEXT NOT NULL, priority INTEGER NOT NULL, "
+                "status TEXT NOT NULL, logs_path TEXT, created_at TEXT NOT NULL, updated_at TEXT NOT NULL)")
+    con.commit()
+    con.close()
+    eng = init_db(db)
+    with eng.connect() as c:
+        assert c.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+    upsert_tasks(eng, [Action(tool="t", args={}, target="h", max_parallel=3)])
+    assert get_pending(eng)[0]["max_parallel"] == 3
+
+
+def test_claim_is_exclusive_and_leases_expire(tmp_path: Path):
+    from reconx.state import claim_tasks, heartbeat, reclaim_expired
+    import time
+    eng = init_db(tmp_path / "s.sqlite")
+    other = init_db(tmp_path / "s.sqlite")
+    ids = upsert_tasks(eng, [Action(tool="t", args={"i": i}, target="h") for i in range(3)])
+    assert claim_tasks(eng, ids[:2], "w1", lease_seconds=60) == set(ids[:2])
+    assert claim_tasks(other, ids, "w2", lease_seconds=60) == {ids[2]}
+    assert get_pending(eng) == []
+    # Nothing has expired yet; once w1's lease lapses its tasks go back to pending.
+    assert reclaim_expired(eng) == 0
+    heartbeat(eng, ids[:2], "w1", lease_seconds=-1)
+    assert reclaim_expired(eng, now=time.time()) == 2
+    assert {r["id"] for r in get_pending(eng)} == set(ids[:2])
+    # A late completion from w1 does not clobber the re-queued task.
+    set_statuses(eng, [(ids[0], "done", None)], worker="w1")
+    assert {r["id"] for r in get_pending(eng)} == set(ids[:2])
+
+
+def test_summary_store_filters_and_migrates_legacy_files(tmp_path: Path):
+    from reconx.model import SummaryModel
+    from reconx.parsers import watermark_key
+    from reconx.state import append_summaries, iter_summary_rows, mark_processed, summary_key, unprocessed
+    from reconx.store import iter_stored_summaries, migrate_summary_files
+
+    eng = init_db(tmp_path / "s.sqlite")
+    ids = append_summaries(eng, [(1, SummaryModel(layer=2, target="a")),
+                                 (2, SummaryModel(layer=3, target="a")),
+                                 (3, SummaryModel(layer=2, target="b"))])
+    assert ids == sorted(ids) and len(ids) == 3
+    assert [s.target for _, s in iter_stored_summaries(eng, layer=2)] == ["a", "b"]
+    assert [sid for sid, _ in iter_summary_rows(eng, target="a", layer=3)] == [ids[1]]
+    assert [sid for sid, _ in iter_summary_rows(eng, task_id=3)] == [ids[2]]
+    mark_processed(eng, [summary_key(ids[0])])
+    assert [sid for sid, _ in iter_summary_rows(eng, unprocessed_only=True)] == ids[1:]
+
+    comb = tmp_path / "combined"
+    comb.mkdir()
+    old = comb / "summary_7_100.json"
+    old.write_text(SummaryModel(layer=99, target="c").model_dump_json())
+    (comb / "summary_8_100.json").write_text(SummaryModel(layer=99, target="d").model_dump_json())
+    mark_processed(eng, [watermark_key(tmp_path, old)])
+    assert migrate_summary_files(eng, tmp_path) == 2
+    assert not list(comb.glob("summary_*.json"))
+    fresh = [s.target for _, s in iter_stored_summaries(eng, layer=99, unprocessed_only=True)]
+    assert fresh == ["d"]
+    assert [sid for sid, _ in iter_summary_rows(eng, task_id=7)]
+    assert unprocessed(eng, [summary_key(ids[0])]) == []
+
+
+def test_interrupted_migration_never_duplicates_summaries(tmp_path: Path, monkeypatch):
+    import pytest
+    from reconx import state
+    from reconx.model import SummaryModel
+    from reconx.parsers import watermark_key
+    from reconx.state import mark_processed, summary_key, unprocessed
+    from reconx.store import iter_stored_summaries, migrate_summary_files
+
+    eng = init_db(tmp_path / "s.sqlite")
+    comb = tmp_path / "combined"
+    comb.mkdir()
+    legacy = comb / "summary_7_100.json"
+    legacy.write_text(SummaryModel(layer=99, target="c").model_dump_json())
+    mark_processed(eng, [watermark_key(tmp_path, legacy)])
+
+    # A failure before the commit leaves nothing behind.
+    real = state._insert_watermarks
+    def fail(*a, **kw):
+        raise OSError("disk full")
+    monkeypatch.setattr(state, "_insert_watermarks", fail)
+    with pytest.raises(OSError):
+        migrate_summary_files(eng, tmp_path)
+    assert list(iter_stored_summaries(eng)) == [] and legacy.exists()
+    monkeypatch.setattr(state, "_insert_watermarks", real)
+
+    # A crash after the commit but before the unlink: the next run only removes the file.
+    real_unlink = Path.unlink
+    monkeypatch.setattr(Path, "unlink", fail)
+    with pytest.raises(OSError):
+        migrate_summary_files(eng, tmp_path)
+    monkeypatch.setattr(Path, "unlink", real_unlink)
+    assert migrate_summary_files(eng, tmp_path) == 0
+    assert not legacy.exists()
+    stored = list(iter_stored_summaries(eng))
+    assert [s.target for _, s in stored] == ["c"]
+    assert unprocessed(eng, [summary_key(stored[0][0])]) == []
+
+
+def test_backends_agree_and_decode_args_lazily(tmp_path: Path):
+    import json
+    from reconx.db import SQLiteBackend, SQLAlchemyBackend
+    from reconx.state import claim_tasks, TaskRow
+
+    rows = {}
+    for name, db in (("sqlite3", tmp_path / "a.sqlite"), ("sqlalchemy", tmp_path / "b.sqlite"),
+                     ("url", f"sqlite:///{tmp_path / 'c.sqlite'}")):
+        eng = init_db(db, backend=None if name == "url" else name)
+        assert isinstance(eng, SQLiteBackend if name == "sqlite3" else SQLAlchemyBackend)
+        ids = upsert_tasks(eng, [Action(tool="t", args={"i": i}, target="h") for i in range(4)])
+        assert claim_tasks(eng, ids[:1], "w", lease_seconds=60) == {ids[0]}
+        pending = get_pending(eng, exclude_tools=["x"])
+        assert isinstance(pending[0], TaskRow) and not dict.__contains__(pending[0], "args")
+        assert pending[0]["args"] == {"i": 1} and pending[0].get("args") == {"i": 1} and "args" in pending[1]
+        assert json.loads(json.dumps(pending[0]))["args"] == {"i": 1}
+        rows[name] = [(r["id"], r["tool"], r["args"], r["status"]) for r in get_all(eng)]
+        eng.dispose()
+    assert rows["sqlite3"] == rows["sqlalchemy"] == rows["url"]
+    assert [r[3] for r in rows["sqlite3"]] == ["running", "pending", "pending", "pending"]
+
+
+def test_sqlite_backend_rolls_back_failed_transactions(tmp_path: Path):
+    import pytest
+    eng = init_db(tmp_path / "s.sqlite")
+    with pytest.raises(RuntimeError):
+        with eng.begin() as con:
+            con.exec_driver_sql("INSERT INTO watermarks(key, processed_at) VALUES (?, ?)", ("k", "now"))
+            raise RuntimeError
+    with eng.connect() as con:
+        assert con.exec_driver_sql("SELECT COUNT(*) FROM watermarks").scalar() == 0
+
+
+def test_sqlite_backend_rolls_back_failed_commit_and_rejects_other_databases(tmp_path: Path):
+    import pytest
+    eng = init_db(tmp_path / "s.sqlite")
+    with eng.connect() as con:
+        con.exec_driver_sql("PRAGMA foreign_keys=ON")
+        con.exec_driver_sql("CREATE TABLE p (id INTEGER PRIMARY KEY)")
+        con.exec_driver_sql("CREATE TABLE c (pid INTEGER REFERENCES p(id) DEFERRABLE INITIALLY DEFERRED)")
+    # The deferred foreign key only fails at COMMIT.
+    with pytest.raises(sqlite3.IntegrityError):
+        with eng.begin() as con:
+            con.exec_driver_sql("INSERT INTO c(pid) VALUES (1)")
+    with eng.connect() as con:
+        assert not con.in_transaction
+        assert con.exec_driver_sql("SELECT COUNT(*) FROM c").scalar() == 0
+    upsert_tasks(eng, [Action(tool="t", args={}, target="h")])
+    assert len(get_all(eng)) == 1
+
+    with pytest.raises(ValueError, match="sqlite"):
+        init_db("postgresql://u@localhost/reconx")
+
+
+def test_state_backend_is_abstract():
+    import pytest
+    from reconx.db import StateBackend
+
+    class BeginOnly(StateBackend):
+        def begin(self):
+            return None
+
+    for cls in (StateBackend, BeginOnly):
+        with pytest.raises(TypeError, match="abstract"):
+            cls()
+
+
+def test_pending_heads_take_targets_in_turn(tmp_path: Path):
+    from reconx.state import get_pending_heads
+    eng = init_db(tmp_path / "s.sqlite")
+    hog = upsert_tasks(eng, [Action(tool="t", args={"i": i}, target="hog") for i in range(50)])
+    small = upsert_tasks(eng, [Action(tool="t", args={}, target=t) for t in ("a", "b", "c")])
+    urgent = upsert_tasks(eng, [Action(tool="u", args={}, target="z", priority=1)])
+
+    # The best priority band first, then one (oldest) task per target.
+    assert [r["id"] for r in get_pending_heads(eng)] == urgent
+    assert [(r["target"], r["id"]) for r in get_pending_heads(eng, exclude_tools=["u"])] == [
+        ("a", small[0]), ("b", small[1]), ("c", small[2]), ("hog", hog[0])]
+    # Rotation resumes after the last served target and wraps around.
+    heads = get_pending_heads(eng, limit=3, exclude_tools=["u"], after_target="b")
+    assert [r["target"] for r in heads] == ["c", "hog", "a"]
+    assert [r["target"] for r in get_pending_heads(eng, exclude_targets=["a", "z"], after_target="hog")] == [
+        "b", "c", "hog"]
+
+    # Exclusion lists are a single JSON parameter, so thousands of blocked targets are fine.
+    many = [f"x{i}" for i in range(2000)] + ["a", "b", "c", "z"]
+    assert {r["target"] for r in get_pending(eng, exclude_targets=many)} == {"hog"}
+    assert [r["target"] for r in get_pending_heads(eng, exclude_targets=many, exclude_tools=["y"] * 1500)] == ["hog"]
+
+
+def test_cap_group_exclusion_matches_cap_group(tmp_path: Path):
+    from reconx.state import cap_group, get_pending_heads
+    eng = init_db(tmp_path / "s.sqlite")
+    upsert_tasks(eng, [Action(tool="web", args={"i": 1}, target="a", max_parallel=1, rule="r1"),
+                       Action(tool="web", args={"i": 2}, target="b", max_parallel=1, rule=""),
+                       Action(tool="web", args={"i": 3}, target="c", max_parallel=1),
+                       Action(tool="web", args={"i": 4}, target="d")])
+    rows = {r["target"]: r for r in get_pending_heads(eng)}
+    assert [cap_group(rows[t]) for t in "abc"] == ["r1/web", "web", "web"]
+    # Excluding a row's cap_group leaves out exactly the capped rows in that group.
+    for t in "abc":
+        left = {r["target"] for r in get_pending_heads(eng, exclude_groups=[cap_group(rows[t])])}
+        assert left == ({"a", "b", "c", "d"} - ({"a"} if t == "a" else {"b", "c"}))